@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Time to fetch N parties one get_party call at a time versus a single get_parties
+batch call, against a local stand-in server with per-request latency.
+
+The batch sends comma-separated ids, MAX_IDS_PER_REQUEST per request, with the
+requests in flight concurrently. A second batch for the same ids is answered from
+the entity cache. A few ids that do not exist are mixed in to check they are
+reported as missing and that results keep the input order.
+
+Usage:
+    python benchmarks/bench_batch.py [--ids 50] [--latency 0.05]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+def run(mock: MockCapsule, n: int):
+    from api.entity_cache import get_entity_cache
+    from api.parties import get_party, get_parties, get_parties_async
+
+    ids = random.Random(1).sample(range(1, mock.counts["parties"] + 1), n)
+    absent = [mock.counts["parties"] + 1, mock.counts["parties"] + 2]
+    wanted = ids[:n // 2] + absent + ids[n // 2:]
+
+    cache = get_entity_cache()
+    cache.invalidate()
+    requests = mock.requests
+    start = time.perf_counter()
+    one_by_one = [get_party(i) for i in ids]
+    print(f"{n} x get_party:          {(time.perf_counter() - start) * 1000:8.1f} ms ({mock.requests - requests} requests)")
+
+    for label, fetch in (("get_parties", get_parties), ("get_parties_async", lambda i: asyncio.run(get_parties_async(i)))):
+        cache.invalidate()
+        requests = mock.requests
+        start = time.perf_counter()
+        result = fetch(wanted)
+        print(f"{label + ':':24s} {(time.perf_counter() - start) * 1000:8.1f} ms ({mock.requests - requests} requests)")
+        assert [party.id for party in result["parties"]] == ids, "results out of input order"
+        assert result["missing"] == absent, result["missing"]
+        assert [party.model_dump() for party in result["parties"]] == [party.model_dump() for party in one_by_one]
+
+    # Ids that do not exist are not cached and would be asked for again
+    requests = mock.requests
+    start = time.perf_counter()
+    get_parties(ids)
+    print(f"{'get_parties (cached):':24s} {(time.perf_counter() - start) * 1000:8.1f} ms ({mock.requests - requests} requests)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with MockCapsule(latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        run(mock, args.ids)
+
+
+if __name__ == "__main__":
+    main()
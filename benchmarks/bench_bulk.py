@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Throughput in items per second of creating N tasks one create_task call at a time
+versus one bulk_create_tasks call, against a local stand-in server with
+per-request latency.
+
+A second run against a server that sheds every fifth request with a 429 shows
+items that succeed on a retry being reported as 'retried', and a bulk update mixing in
+ids that do not exist shows per-item errors and stop_on_error.
+
+Usage:
+    python benchmarks/bench_bulk.py [--items 200] [--latency 0.05] [--concurrency 8]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+def _tasks(n: int):
+    from api.models import Task
+    return [Task(id=i + 1, description=f"Follow up with contact {i + 1}", dueOn="2026-01-15") for i in range(n)]
+
+
+def _line(label: str, n: int, elapsed: float, report: dict = None):
+    summary = ""
+    if report is not None:
+        summary = "  " + ", ".join(f"{status}: {report[status]}" for status in ("success", "retried", "error", "skipped"))
+    print(f"{label:32s} {elapsed:7.2f} s {n / elapsed:8.1f} items/s{summary}")
+
+
+def run(mock: MockCapsule, n: int, concurrency: int):
+    from api.tasks import create_task, bulk_create_tasks, bulk_create_tasks_async, bulk_update_tasks
+
+    tasks = _tasks(n)
+    start = time.perf_counter()
+    for task in tasks:
+        create_task(task)
+    _line("sequential create_task", n, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    report = bulk_create_tasks(tasks, concurrency=concurrency)
+    _line("bulk_create_tasks", n, time.perf_counter() - start, report)
+    assert report["success"] == n and [item["index"] for item in report["items"]] == list(range(n))
+
+    start = time.perf_counter()
+    report = asyncio.run(bulk_create_tasks_async(tasks, concurrency=concurrency))
+    _line("bulk_create_tasks_async", n, time.perf_counter() - start, report)
+    assert report["success"] == n
+
+    # Every tenth id does not exist
+    updates = [task.model_copy(update={"id": task.id if i % 10 else mock.counts["tasks"] + i + 1})
+               for i, task in enumerate(tasks)]
+    start = time.perf_counter()
+    report = bulk_update_tasks(updates, concurrency=concurrency)
+    _line("bulk_update_tasks (10% missing)", n, time.perf_counter() - start, report)
+    assert report["error"] == len(range(0, n, 10))
+
+    report = bulk_update_tasks(updates, stop_on_error=True, concurrency=concurrency)
+    print(f"{'  with stop_on_error':32s} {report['error']} error(s), {report['skipped']} skipped")
+
+
+def run_throttled(mock: MockCapsule, n: int, concurrency: int):
+    from api.tasks import bulk_create_tasks
+
+    mock.throttle_every = 5
+    start = time.perf_counter()
+    report = bulk_create_tasks(_tasks(n), concurrency=concurrency)
+    _line("bulk_create_tasks (throttled)", n, time.perf_counter() - start, report)
+    print(f"{'':32s} server answered {mock.throttled} request(s) with 429")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Artificial server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with MockCapsule(latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        run(mock, args.items, args.concurrency)
+        run_throttled(mock, args.items, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
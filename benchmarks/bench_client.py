@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of api.utils.request() with a fresh client per call (the old
+behaviour) versus the shared keep-alive connection pool.
+
+Usage:
+    python benchmarks/bench_client.py [--calls 200] [--latency 0.0]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+def summarize(label: str, samples: list) -> dict:
+    samples = sorted(samples)
+    result = {
+        "label": label,
+        "calls": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+    }
+    print(f"{label:<28} mean {result['mean_ms']:7.3f} ms   p50 {result['p50_ms']:7.3f} ms   p99 {result['p99_ms']:7.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with MockCapsule(latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+
+        import httpx
+        from api import utils
+
+        def fresh_client_call():
+            # Equivalent to the previous implementation of request()
+            with httpx.Client(timeout=30) as client:
+                resp = client.request("GET", f"{utils.BASE_URL}/parties/1", headers=utils.get_headers())
+                return resp.json()
+
+        def pooled_call():
+            return utils.request("GET", "/parties/1")
+
+        results = []
+        for label, call in (("fresh client per call", fresh_client_call), ("shared pooled client", pooled_call)):
+            call()  # warm up
+            connections_before = mock.connections
+            samples = []
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - start)
+            result = summarize(label, samples)
+            result["connections_opened"] = mock.connections - connections_before
+            print(f"{'':<28} {result['connections_opened']} TCP connections opened")
+            results.append(result)
+
+        utils.close_clients()
+        speedup = results[0]["mean_ms"] / results[1]["mean_ms"]
+        print(f"\nShared pool is {speedup:.1f}x faster per call")
+
+
+if __name__ == "__main__":
+    main()
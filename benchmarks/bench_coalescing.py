@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Upstream requests and wall-clock time of N overlapping identical tool calls with
+and without in-flight request coalescing, against a slow local stand-in server.
+
+With coalescing, calls that arrive while an identical GET is in flight share its
+response, so N overlapping get_party_tool calls for one party cost one request.
+
+Usage:
+    python benchmarks/bench_coalescing.py [--parallel 20] [--latency 0.2]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+async def run(mock: MockCapsule, parallel: int):
+    from main import mcp
+    import api.utils
+    from api.entity_cache import get_entity_cache
+    from api.reference import invalidate_reference_data
+
+    call_tool = mcp._mcp_call_tool
+    calls = [
+        ("get_party_tool", {"party_id": 7}),
+        ("list_milestones_tool", {}),
+        ("list_parties_tool", {"page": 2, "per_page": 50}),
+    ]
+    for enabled in (False, True):
+        api.utils._singleflight.enabled = enabled
+        for name, arguments in calls:
+            get_entity_cache().invalidate()
+            invalidate_reference_data()
+            requests = mock.requests
+            start = time.perf_counter()
+            await asyncio.gather(*(call_tool(name, arguments) for _ in range(parallel)))
+            elapsed = time.perf_counter() - start
+            print(f"coalescing {'on ' if enabled else 'off'}  {parallel} x {name:22s} "
+                  f"{elapsed * 1000:7.1f} ms  {mock.requests - requests:3d} requests")
+    print(api.utils.get_coalescing_stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parallel", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with MockCapsule(latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        asyncio.run(run(mock, args.parallel))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Wall-clock time of N overlapping MCP tool calls against a slow local stand-in
+server. With async tools the calls overlap, so the total stays close to a
+single round trip instead of growing linearly with N.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--parallel 10] [--latency 0.2]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+async def run(parallel: int, latency: float):
+    from main import mcp
+
+    # Call the server's MCP tools/call handler directly; an in-process client would add
+    # its own output-schema validation cost to every call.
+    call_tool = mcp._mcp_call_tool
+    await call_tool("get_party_tool", {"party_id": 1})  # warm up
+
+    start = time.perf_counter()
+    for i in range(parallel):
+        await call_tool("get_party_tool", {"party_id": i + 1})
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Different ids than above so the entity cache cannot answer them
+    await asyncio.gather(*(call_tool("get_party_tool", {"party_id": parallel + i + 1}) for i in range(parallel)))
+    overlapped = time.perf_counter() - start
+
+    print(f"{parallel} calls one after another: {sequential * 1000:8.1f} ms")
+    print(f"{parallel} calls sent in parallel:  {overlapped * 1000:8.1f} ms")
+    print(f"server latency per call:      {latency * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parallel", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with MockCapsule(latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        asyncio.run(run(args.parallel, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Records per second and peak memory of turning decoded API JSON into models:
+full Pydantic validation, the default, versus the trusted construct path
+(CAPSULECRM_TRUSTED_DECODE=1), for parties and tasks (which embed a party).
+
+Both paths are checked to produce identical model dumps.
+
+Usage:
+    python benchmarks/bench_decode.py [--records 10000]
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import make_party, make_task
+
+
+def measure(label: str, convert, records: list) -> list:
+    convert(records[:100])  # warm up
+    start = time.perf_counter()
+    result = convert(records)
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = convert(records)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:22s} {len(records) / elapsed:10,.0f} records/s   peak {peak / 1024 / 1024:7.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000)
+    args = parser.parse_args()
+
+    from api.models import Person, Organisation, Task
+    from api.decode import construct
+
+    def validate_party(record):
+        return Person(**record) if record["type"] == "person" else Organisation(**record)
+
+    def construct_party(record):
+        return construct(Person if record["type"] == "person" else Organisation, record)
+
+    for entity, factory, validate, fast in (
+        ("parties", make_party, validate_party, construct_party),
+        ("tasks", make_task, lambda record: Task(**record), lambda record: construct(Task, record)),
+    ):
+        records = [factory(i) for i in range(1, args.records + 1)]
+        strict = measure(f"{entity} validated", lambda rs: [validate(r) for r in rs], records)
+        trusted = measure(f"{entity} constructed", lambda rs: [fast(r) for r in rs], records)
+        assert [m.model_dump() for m in strict] == [m.model_dump() for m in trusted], f"{entity} differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+On-disk response cache across restarts, against the local stand-in server: runs the
+same workload (reference data, then N parties and a few pages of the party list) in
+a fresh server process without the cache, on a first start with it and after a
+restart, and reports for each the time until reference data is available, the
+total time, requests, 304 Not Modified answers and bytes downloaded. Then checks
+that an edit made between restarts is picked up and that the size cap holds.
+
+Usage:
+    python benchmarks/bench_disk_cache.py [--parties 200] [--latency 0.02]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_capsule import MockCapsule
+
+SERVER = Path(__file__).parent.parent / "server"
+REFERENCE_KINDS = ("milestones", "pipelines", "categories", "users")
+
+
+def worker(parties: int, pages: int):
+    """One server process's workload; prints its figures as JSON."""
+    sys.path.insert(0, str(SERVER))
+    from api.reference import get_reference_cache
+    from api.parties import get_party, list_parties
+    from api.metrics import get_metrics
+    from api.utils import get_disk_cache
+
+    start = time.perf_counter()
+    cache = get_reference_cache()
+    milestones = cache.get("milestones")
+    reference_ms = (time.perf_counter() - start) * 1000
+    for kind in REFERENCE_KINDS[1:]:
+        cache.get(kind)
+    for i in range(1, parties + 1):
+        get_party(i)
+    for page in range(1, pages + 1):
+        list_parties(page, 100)
+    endpoints = get_metrics().snapshot()["endpoints"].values()
+    disk = get_disk_cache()
+    print(json.dumps({
+        "reference_ms": reference_ms,
+        "milestones": len(milestones.records),
+        "total_ms": (time.perf_counter() - start) * 1000,
+        "requests": sum(stats["count"] for stats in endpoints),
+        "not_modified": sum(stats["statuses"].get("304", stats["statuses"].get(304, 0)) for stats in endpoints),
+        "bytes": sum(stats["response_bytes"] for stats in endpoints),
+        "organisation": get_party(3).name,
+        "disk": disk.stats() if disk else None,
+    }))
+
+
+def run(mock, parties: int, pages: int, **env) -> dict:
+    env = {**os.environ, "CAPSULECRM_ACCESS_TOKEN": "benchmark-token", "CAPSULECRM_API_URL": mock.base_url, **env}
+    result = subprocess.run([sys.executable, __file__, "--worker", "--parties", str(parties), "--pages", str(pages)],
+                            env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(label: str, result: dict):
+    print(f"  {label:22s} reference data after {result['reference_ms']:7.1f} ms  total {result['total_ms']:7.0f} ms  "
+          f"{result['requests']:4d} requests  {result['not_modified']:4d} x 304  {result['bytes'] / 1024:8.1f} KiB downloaded")
+
+
+def check(label: str, passed: bool) -> bool:
+    print(f"  {'ok  ' if passed else 'FAIL'} {label}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parties", type=int, default=200, help="parties fetched one by one")
+    parser.add_argument("--pages", type=int, default=5, help="pages of 100 parties listed")
+    parser.add_argument("--latency", type=float, default=0.02, help="server-side delay per request in seconds")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.parties, args.pages)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="capsulecrm-disk-cache-"), "responses.db")
+    with MockCapsule(latency=args.latency, list_etags=True) as mock:
+        print(f"{args.parties} parties, {args.pages} pages of the party list and all reference data per process, "
+              f"stand-in latency {args.latency * 1000:.0f} ms")
+        report("no disk cache", run(mock, args.parties, args.pages))
+        first = run(mock, args.parties, args.pages, CAPSULECRM_DISK_CACHE_PATH=path)
+        report("first start", first)
+        restart = run(mock, args.parties, args.pages, CAPSULECRM_DISK_CACHE_PATH=path)
+        report("restart", restart)
+        disk = restart["disk"]
+        print(f"  stored: {disk['entries']} responses, {disk['bytes'] / 1024:.0f} KiB compressed "
+              f"from {disk['uncompressed_bytes'] / 1024:.0f} KiB, file {os.path.getsize(path) / 1024:.0f} KiB")
+
+        mock.modify("parties", 3, name="Renamed between restarts")
+        edited = run(mock, args.parties, args.pages, CAPSULECRM_DISK_CACHE_PATH=path)
+        capped = run(mock, args.parties, args.pages, CAPSULECRM_DISK_CACHE_PATH=path + ".small",
+                     CAPSULECRM_DISK_CACHE_BYTES=str(64 * 1024))
+        results = [
+            check("reference data answered from disk after a restart", restart["reference_ms"] < first["reference_ms"] / 2),
+            check("nothing downloaded again after a restart", restart["not_modified"] >= args.parties and restart["bytes"] < first["bytes"] / 10),
+            check("an edit made between restarts is picked up", edited["organisation"] == "Renamed between restarts"),
+            check("the size cap holds", capped["disk"]["bytes"] <= 64 * 1024 and capped["disk"]["evictions"] > 0),
+        ]
+        if not all(results):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Load test of the HTTP transport: starts the server with CAPSULECRM_TRANSPORT=http
+against the local stand-in server, keeps N client sessions (spread over a few
+client processes) calling a mix of tools for a while, and reports throughput, tool
+latency percentiles as the clients and as the server see them, and the upstream
+requests and connections all sessions shared. Then sends SIGTERM while calls are
+running and reports whether they completed (graceful drain); exits with 1 if any
+did not.
+
+Usage:
+    python benchmarks/bench_http.py [--sessions 50] [--duration 10] [--latency 0.02] [--transport http] [--processes N]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import random
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_capsule import MockCapsule
+
+SERVER = Path(__file__).parent.parent / "server" / "main.py"
+TOKEN = "benchmark-http-token"
+
+CALLS = [
+    ("get_party_tool", lambda: {"party_id": random.randint(1, 1000), "compact": True}),
+    ("get_opportunity_tool", lambda: {"opportunity_id": random.randint(1, 1000)}),
+    ("find_tasks_tool", lambda: {"user_input": {"status": "open", "per_page": 20}, "compact": True}),
+    ("search_parties_tool", lambda: {"q": f"Example{random.randint(1, 999)}", "per_page": 10, "compact": True}),
+    ("list_milestones_tool", lambda: {}),
+]
+
+
+def skip_client_validation():
+    """
+    The Python MCP client checks every structured result against the tool's output
+    schema with jsonschema, which takes tens of milliseconds for a party and about a
+    second for 500 tasks. The server's results are serialized from the same types
+    their schemas come from, so the load generator skips the check and the latencies
+    are the server's rather than the client's.
+    """
+    import mcp.client.session
+    mcp.client.session.validate = lambda instance, schema: None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def percentile(samples: list, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else float("nan")
+
+
+async def session(url: str, start_at: float, stop_at: float, latencies: list, errors: list):
+    from fastmcp import Client
+    async with Client(url, auth=TOKEN, timeout=60) as client:
+        while time.time() < stop_at:
+            name, arguments = random.choice(CALLS)
+            start = time.perf_counter()
+            try:
+                await client.call_tool(name, arguments())
+                if time.time() >= start_at:
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors.append(f"{name}: {type(e).__name__}: {e}")
+
+
+def client_process(url: str, sessions: int, start_at: float, stop_at: float) -> tuple:
+    """One client process: `sessions` sessions calling tools until stop_at; returns (latencies from start_at on, errors)."""
+    skip_client_validation()
+    latencies, errors = [], []
+
+    async def run():
+        await asyncio.gather(*(session(url, start_at, stop_at, latencies, errors) for _ in range(sessions)))
+
+    asyncio.run(run())
+    return latencies, errors
+
+
+async def server_latencies(url: str) -> dict:
+    """Per tool (count, p50, p99) as the server measured them, without the load generator's own overhead."""
+    from fastmcp import Client
+    async with Client(url, auth=TOKEN) as client:
+        result = await client.call_tool("server_stats_tool", {})
+    tools = json.loads(result.content[0].text)["tools"]
+    return {name: (stats["count"], stats["p50_ms"], stats["p99_ms"]) for name, stats in tools.items() if name != "server_stats_tool"}
+
+
+async def drain_check(url: str, server: subprocess.Popen, mock, sessions: int) -> tuple:
+    """Start one call per session, SIGTERM the server while they wait on the API; returns (completed, failed, exit code, seconds)."""
+    from fastmcp import Client
+    clients = [Client(url, auth=TOKEN, timeout=60) for _ in range(sessions)]
+    for client in clients:
+        await client.__aenter__()
+
+    async def call(client, index):
+        try:
+            # Searches nobody made before, so none is answered from a cache
+            await client.call_tool("search_parties_tool", {"q": f"Drain{index}", "per_page": 10})
+            return True
+        except Exception:
+            return False
+
+    mock.latency = 1.0
+    requests = mock.requests
+    calls = [asyncio.create_task(call(client, i)) for i, client in enumerate(clients)]
+    while mock.requests < requests + sessions:
+        await asyncio.sleep(0.005)
+    start = time.perf_counter()
+    server.send_signal(signal.SIGTERM)
+    results = await asyncio.gather(*calls)
+    code = await asyncio.to_thread(server.wait, 60)
+    for client in clients:
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception:
+            pass
+    return sum(results), len(results) - sum(results), code, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent client sessions")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of sustained load")
+    parser.add_argument("--latency", type=float, default=0.02, help="server-side delay per request in seconds")
+    parser.add_argument("--transport", choices=["http", "sse"], default="http")
+    parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1), help="client processes the sessions are spread over")
+    args = parser.parse_args()
+
+    skip_client_validation()
+    with MockCapsule(latency=args.latency) as mock:
+        port = free_port()
+        env = {
+            **os.environ,
+            "CAPSULECRM_ACCESS_TOKEN": "benchmark-token",
+            "CAPSULECRM_API_URL": mock.base_url,
+            "CAPSULECRM_TRANSPORT": args.transport,
+            "CAPSULECRM_HTTP_PORT": str(port),
+            "CAPSULECRM_HTTP_AUTH_TOKEN": TOKEN,
+            "CAPSULECRM_DRAIN_TIMEOUT": "20",
+        }
+        server = subprocess.Popen([sys.executable, str(SERVER)], env=env, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            url = f"http://127.0.0.1:{port}/{'mcp' if args.transport == 'http' else 'sse'}/"
+
+            # Client processes start, connect and warm the server up before start_at
+            start_at = time.time() + 5.0
+            stop_at = start_at + args.duration
+            shares = [args.sessions // args.processes + (i < args.sessions % args.processes) for i in range(args.processes)]
+            with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(client_process, url, share, start_at, stop_at) for share in shares if share]
+                time.sleep(max(0.0, start_at - time.time()))
+                requests, connections = mock.requests, mock.connections
+                time.sleep(max(0.0, stop_at - time.time()))
+                requests, connections = mock.requests - requests, mock.connections - connections
+                latencies, errors = [], []
+                for future in futures:
+                    process_latencies, process_errors = future.result()
+                    latencies += process_latencies
+                    errors += process_errors
+
+            calls = len(latencies)
+            print(f"{args.sessions} sessions over {args.transport} for {args.duration:.1f}s in {len(futures)} client processes, "
+                  f"stand-in latency {args.latency * 1000:.0f} ms")
+            print(f"  {calls} tool calls, {calls / args.duration:.0f} calls/s, {len(errors)} errors")
+            print(f"  latency ms: p50 {percentile(latencies, 0.5):.1f}  p95 {percentile(latencies, 0.95):.1f}  "
+                  f"p99 {percentile(latencies, 0.99):.1f}  max {max(latencies, default=float('nan')):.1f}")
+            print(f"  upstream: {requests} requests on {connections} new connections shared by all sessions")
+            for error in errors[:5]:
+                print(f"  error: {error}")
+
+            async def server_side():
+                print("  server-side tool latency ms (including the warm-up):")
+                for name, (count, p50, p99) in sorted((await server_latencies(url)).items()):
+                    print(f"    {name:24s} {count:6d} calls  p50 {p50:7.1f}  p99 {p99:7.1f}")
+                completed, failed, code, seconds = await drain_check(url, server, mock, min(args.sessions, 20))
+                print(f"SIGTERM with {completed + failed} calls running: {completed} completed, {failed} failed, "
+                      f"server exited with {code} after {seconds:.1f}s")
+                return failed
+
+            if asyncio.run(server_side()):
+                sys.exit(1)
+        finally:
+            if server.poll() is None:
+                server.kill()
+
+
+if __name__ == "__main__":
+    main()
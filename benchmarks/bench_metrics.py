@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Cost of recording metrics: per-call time of the Metrics recording methods in a
+tight loop, and of api.utils.request() against the local stand-in server with
+metrics on and off (interleaved, so drift affects both alike). Also times
+rendering server_stats and the Prometheus dump.
+
+Usage:
+    python benchmarks/bench_metrics.py [--calls 200000] [--requests 2000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+def per_call(fn, calls: int) -> float:
+    """Microseconds per call of fn(i)."""
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with MockCapsule() as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+
+        from api.metrics import Metrics, get_metrics
+        from api import utils
+
+        metrics = Metrics()
+        endpoints = [f"/parties/{i}" for i in range(1, 501)] + ["/parties", "/tasks", "/opportunities/filters/results"]
+        baseline = per_call(lambda i: None, args.calls)
+        for label, fn in (
+            ("record_request", lambda i: metrics.record_request("GET", endpoints[i % len(endpoints)], 200, 0.012, 1500)),
+            ("record_retry", lambda i: metrics.record_retry("GET", endpoints[i % len(endpoints)])),
+            ("record_tool", lambda i: metrics.record_tool("get_party_tool", 0.02)),
+        ):
+            print(f"{label:28s} {per_call(fn, args.calls) - baseline:6.2f} us per call")
+
+        start = time.perf_counter()
+        metrics.snapshot()
+        print(f"{'snapshot':28s} {(time.perf_counter() - start) * 1000:6.2f} ms")
+        start = time.perf_counter()
+        text = metrics.prometheus()
+        print(f"{'prometheus dump':28s} {(time.perf_counter() - start) * 1000:6.2f} ms ({len(text.splitlines())} lines)")
+
+        # request() with the process-wide registry on and off, alternating in rounds
+        samples = {True: [], False: []}
+        utils.request("GET", "/parties/1")
+        for _ in range(10):
+            for enabled in (True, False):
+                get_metrics().enabled = enabled
+                start = time.perf_counter()
+                for i in range(args.requests // 10):
+                    utils.request("GET", f"/parties/{i % 50 + 1}")
+                samples[enabled].append((time.perf_counter() - start) / (args.requests // 10) * 1e6)
+        on, off = statistics.median(samples[True]), statistics.median(samples[False])
+        print(f"{'request() metrics off':28s} {off:8.1f} us per call")
+        print(f"{'request() metrics on':28s} {on:8.1f} us per call ({on - off:+.1f} us; "
+              f"stdev between rounds {statistics.stdev(samples[False]):.1f} us)")
+        utils.close_clients()
+
+
+if __name__ == "__main__":
+    main()
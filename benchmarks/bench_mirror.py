@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Time to answer analytical find_* queries from the live filter API versus the
+local SQLite mirror, against a local stand-in server with per-request latency.
+
+Each query pages through every match (100 per page), as the *_all tools do.
+The mirror is built once with a full sync and then answers from indexed
+queries without any request. Then checks that a deleted task, which only a full
+sync removes, cannot be served from the mirror for longer than
+CAPSULECRM_MIRROR_MAX_STALENESS.
+
+Usage:
+    python benchmarks/bench_mirror.py [--parties 5000] [--latency 0.05]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+QUERIES = [
+    ("parties in Zurich", "parties", {"city": "Zurich"}),
+    ("organisations owned by user 1", "parties", {"type": "organisation", "owner": "1"}),
+    ("opportunities at milestone 3", "opportunities", {"milestone": "3"}),
+]
+
+
+def check(label: str, passed: bool) -> bool:
+    print(f"  {'ok  ' if passed else 'FAIL'} {label}")
+    return passed
+
+
+def deleted_tasks(mock: MockCapsule) -> list:
+    """Incremental syncs do not see deleted tasks, so the tasks table goes stale with its last full sync."""
+    from api.mirror import get_mirror
+    mirror = get_mirror()
+    def stored_ids():
+        return {task["id"] for task in mirror.query("tasks", [], 1, 100_000) or []}
+
+    task_id = min(stored_ids())
+    mock.delete("tasks", task_id)
+    mirror.sync()
+    kept = task_id in stored_ids()
+
+    # As if the last full sync were older than max_staleness, with recent incremental syncs since
+    with mirror._lock, mirror._conn:
+        mirror._conn.execute("UPDATE sync_state SET full_synced_at = ? WHERE entity IN ('tasks', 'parties')",
+                             (time.time() - mirror.max_staleness - 1,))
+    stale = not mirror.is_fresh("tasks") and mirror.query("tasks", []) is None
+    parties_fresh = mirror.is_fresh("parties")
+    mirror.sync()
+    gone = mirror.is_fresh("tasks") and task_id not in stored_ids()
+    print("\ndeleted tasks")
+    return [
+        check("an incremental sync keeps a deleted task", kept),
+        check("tasks are stale once the last full sync is older than max_staleness", stale),
+        check("entities with deletion tracking stay fresh with incremental syncs", parties_fresh),
+        check("the next sync re-syncs tasks in full and drops the deleted task", gone),
+    ]
+
+
+def run(mock: MockCapsule):
+    from api.mirror import get_mirror, MIRROR_TABLES
+    from api.models import Filter
+    from api.query import compile_query
+    from api.utils import filter_entities
+
+    mirror = get_mirror()
+
+    start = time.perf_counter()
+    mirror.sync(full=True)
+    print(f"full sync: {time.perf_counter() - start:.2f} s, {mock.requests} requests")
+
+    for label, entity, user_input in QUERIES:
+        built = compile_query(entity, user_input).conditions
+
+        requests = mock.requests
+        start = time.perf_counter()
+        live, page = [], 1
+        while True:
+            records = filter_entities(entity, Filter(conditions=built), page, 100)[entity]
+            live.extend(records)
+            if len(records) < 100:
+                break
+            page += 1
+        live_time = time.perf_counter() - start
+        live_requests = mock.requests - requests
+
+        start = time.perf_counter()
+        local, page = [], 1
+        while True:
+            records = mirror.query(entity, built, page, 100)
+            local.extend(records)
+            if len(records) < 100:
+                break
+            page += 1
+        mirror_time = time.perf_counter() - start
+
+        print(f"{label:32s} live: {live_time * 1000:8.1f} ms ({live_requests} requests)   "
+              f"mirror: {mirror_time * 1000:6.1f} ms ({len(local)} records)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parties", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockCapsule(counts={"parties": args.parties, "opportunities": args.parties}, latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        os.environ["CAPSULECRM_MIRROR_PATH"] = str(Path(tmp) / "mirror.db")
+        run(mock)
+        if not all(deleted_tasks(mock)):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
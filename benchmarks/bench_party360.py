@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Party 360: the tool calls an assistant makes to learn about one organisation
+(search by name, get the party, find its opportunities and open tasks, get each
+opportunity in turn) against one party_360_tool call, with wall time, tool
+calls and upstream requests, against the local stand-in server.
+
+Usage:
+    python benchmarks/bench_party360.py [--latency 0.05] [--rounds 5]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+PARTY_ID = 3
+PARTY_NAME = "Organisation 3 AG"
+
+
+def text(result) -> str:
+    """The text a tool call hands back to the model; tools with an output schema also return structured content."""
+    contents = result[0] if isinstance(result, tuple) else result
+    return "".join(content.text for content in contents)
+
+
+async def tool_chain(call) -> tuple:
+    """One tool call after the other, as an assistant without party_360_tool would make them; returns (calls, bytes)."""
+    calls, size = 0, 0
+
+    async def tool(name, arguments):
+        nonlocal calls, size
+        calls += 1
+        result = await call(name, arguments)
+        size += len(text(result))
+        return json.loads(text(result))
+
+    await tool("search_parties_tool", {"q": PARTY_NAME, "per_page": 6})
+    await tool("get_party_tool", {"party_id": PARTY_ID})
+    opportunities = await tool("find_opportunities_tool", {"user_input": {"party": PARTY_ID}})
+    await tool("find_tasks_tool", {"user_input": {"party": PARTY_ID, "status": "open"}})
+    for opportunity in opportunities[:3]:
+        await tool("get_opportunity_tool", {"opportunity_id": opportunity["id"]})
+    return calls, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="server-side delay per request in seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with MockCapsule(latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        # Every round should reach the API, as the first question about a party would
+        os.environ["CAPSULECRM_ENTITY_CACHE_SIZE"] = "0"
+
+        import main as server
+        from api.utils import close_clients, aclose_clients
+        server.lazy_tools.load()
+        call = server.mcp._mcp_call_tool
+
+        async def session():
+            # One event loop throughout, as in the server: the async connection pool belongs to it
+            await call("get_party_tool", {"party_id": 1})
+            for label, run in (("tool chain", lambda: tool_chain(call)),
+                               ("party_360_tool by id", lambda: one_call(call, PARTY_ID)),
+                               ("party_360_tool by name", lambda: one_call(call, PARTY_NAME))):
+                times, requests = [], []
+                for _ in range(args.rounds):
+                    before = mock.requests
+                    start = time.perf_counter()
+                    calls, size = await run()
+                    times.append((time.perf_counter() - start) * 1000)
+                    requests.append(mock.requests - before)
+                print(f"{label:24s} {statistics.median(times):8.1f} ms  {calls:2d} tool calls  "
+                      f"{statistics.median(requests):4.0f} requests  {size:8d} bytes")
+            await aclose_clients()
+
+        asyncio.run(session())
+        close_clients()
+
+
+async def one_call(call, party) -> tuple:
+    result = await call("party_360_tool", {"party": party})
+    return 1, len(text(result))
+
+
+if __name__ == "__main__":
+    main()
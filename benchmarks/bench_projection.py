@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Size of the JSON a read tool returns to the client with full records, compact
+mode, a field projection, and both, on realistic generated fixtures, plus the
+time the server spends turning one page of records into that output.
+
+Tasks are the worst case: every task embeds its complete party.
+
+Usage:
+    python benchmarks/bench_projection.py [--per-page 100]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+CASES = [
+    ("list_parties_tool", ["firstName", "lastName", "name", "emailAddresses.address"]),
+    ("list_opportunities_tool", ["name", "value", "milestone.name", "expectedCloseOn"]),
+    ("list_tasks_tool", ["description", "dueOn", "party.name", "owner.name"]),
+]
+
+MODES = [
+    ("full", {}),
+    ("compact", {"compact": True}),
+    ("fields", None),
+    ("fields+compact", None),
+]
+
+
+def _payload_size(result) -> int:
+    content = result[0] if isinstance(result, tuple) else result
+    return sum(len(block.text.encode()) for block in content if hasattr(block, "text"))
+
+
+async def run(per_page: int, repeat: int):
+    from main import mcp
+    from api.entity_cache import get_entity_cache
+
+    call_tool = mcp._mcp_call_tool
+    for name, fields in CASES:
+        baseline = None
+        for mode, arguments in MODES:
+            if arguments is None:
+                arguments = {"fields": fields, "compact": mode.endswith("compact")}
+            arguments = {"page": 1, "per_page": per_page, **arguments}
+            await call_tool(name, arguments)  # warm up, also fills the coalescing/reference caches
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = await call_tool(name, arguments)
+            elapsed = (time.perf_counter() - start) / repeat
+            size = _payload_size(result)
+            baseline = baseline or size
+            print(f"{name:24s} {mode:15s} {size / 1024:8.1f} KiB  {size / baseline:6.1%}  {elapsed * 1000:7.1f} ms/call")
+        get_entity_cache().invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with MockCapsule() as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        asyncio.run(run(args.per_page, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Query planner: for a set of find_* queries, the plan chosen, the upstream requests
+it cost and its latency against the local stand-in server, first before and then
+after the SQLite mirror's first full sync.
+
+Usage:
+    python benchmarks/bench_query.py [--records 2000] [--latency 0.02]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+QUERIES = [
+    ("open tasks", "tasks", {}),
+    ("tasks due before 2026, 250 per page", "tasks", {"dueOn_before": "2026-01-01", "per_page": 250}),
+    ("parties added after 2024-01-01 (suffix)", "parties", {"addedOn_after": "2024-01-01"}),
+    ("people or organisations named Org, newest first", "parties",
+     {"any": [{"type": "person"}, {"name_contains": "Org"}], "order_by": "-addedOn"}),
+    ("opportunities at milestone 1 or 2", "opportunities", {"milestone": [1, 2], "page": 2}),
+    ("opportunities at milestone 1, embedded tags", "opportunities", {"milestone": 1, "embed": "tags"}),
+    ("party free text", "parties", {"q": "Example"}),
+]
+
+
+def run(label: str):
+    from api.parties import find_parties
+    from api.opportunities import find_opportunities
+    from api.tasks import find_tasks
+
+    find = {"parties": find_parties, "opportunities": find_opportunities, "tasks": find_tasks}
+    print(label)
+    for name, entity, user_input in QUERIES:
+        start = time.perf_counter()
+        explain = find[entity](dict(user_input), explain=True)["explain"]
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"  {name:50s} {explain['plan']:13s} {explain['upstream_requests']:3d} requests "
+              f"{explain['results']:4d} results {elapsed:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000, help="records per entity on the stand-in server")
+    parser.add_argument("--latency", type=float, default=0.02, help="server-side delay per request in seconds")
+    args = parser.parse_args()
+
+    counts = {"parties": args.records, "opportunities": args.records, "tasks": args.records}
+    with MockCapsule(counts=counts, latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        os.environ["CAPSULECRM_MIRROR_PATH"] = os.path.join(tempfile.mkdtemp(prefix="capsulecrm-query-"), "mirror.db")
+
+        from api.mirror import get_mirror
+        from api.utils import close_clients
+
+        # Until its first sync the mirror counts as stale and every query falls through to the API
+        run("mirror not synced yet (live API)")
+        get_mirror().sync(full=True)
+        run("\nwith a synced mirror")
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
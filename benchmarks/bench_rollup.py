@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Pipeline value rollup over many opportunities: ingest and grouping time of the
+columnar engine, its memory next to keeping the decoded records, and a
+correctness check of every group against OpportunityCreate.total_value and
+OpportunityCreate.current_value.
+
+Usage:
+    python benchmarks/bench_rollup.py [--opportunities 100000] [--http]
+
+With --http the opportunities are streamed from a local stand-in server
+through the API layer instead of being generated in memory.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule, make_opportunity
+
+
+def make_records(count: int) -> list:
+    records = [make_opportunity(i) for i in range(1, count + 1)]
+    # Edge cases the value semantics must get right
+    for i, record in enumerate(records):
+        if i % 7 == 0:
+            record["probability"] = None
+        if i % 11 == 0:
+            record["durationBasis"], record["duration"] = "MONTH", None
+        if i % 13 == 0:
+            record["durationBasis"], record["duration"] = "FIXED", 5
+        if i % 17 == 0:
+            record["closedOn"] = "2025-01-31"
+    return records
+
+
+def expected_rollup(records: list, group_by: list) -> dict:
+    """Reference result computed one record at a time with the OpportunityCreate model."""
+    from api.models import OpportunityCreate
+
+    groups = defaultdict(lambda: [0, 0.0, 0.0])
+    for record in records:
+        if record.get("closedOn"):
+            continue
+        model = OpportunityCreate(
+            name=record["name"], party=record["party"], milestone=record["milestone"], value=record["value"],
+            value_type="per_unit", probability=record["probability"],
+            durationBasis=record["durationBasis"], duration=record["duration"],
+        )
+        keys = {
+            "milestone": record["milestone"]["id"],
+            "owner": record["owner"]["id"],
+            "currency": record["value"]["currency"],
+            "close_month": record["expectedCloseOn"][:7],
+        }
+        group = groups[tuple(keys[field] for field in group_by)]
+        group[0] += 1
+        group[1] += model.total_value or 0.0
+        group[2] += model.current_value or 0.0
+    return groups
+
+
+def check(result: dict, records: list, group_by: list):
+    expected = expected_rollup(records, group_by)
+    assert len(result["groups"]) == len(expected), (len(result["groups"]), len(expected))
+    for group in result["groups"]:
+        count, total, weighted = expected[tuple(group[field] for field in group_by)]
+        assert group["count"] == count, (group, count)
+        assert abs(group["total_value"] - total) < 0.01, (group, total)
+        assert abs(group["weighted_value"] - weighted) < 0.01, (group, weighted)
+    print(f"  matches OpportunityCreate.current_value for group_by={group_by} ({len(expected)} groups)")
+
+
+def run(count: int, http: bool):
+    from api.rollup import OpportunityColumns, load_opportunity_columns_async
+
+    records = make_records(count)
+
+    start = time.perf_counter()
+    if http:
+        columns = asyncio.run(load_opportunity_columns_async())
+    else:
+        columns = OpportunityColumns()
+        columns.extend(records)
+    ingest = time.perf_counter() - start
+    print(f"ingest {len(columns)} opportunities{' over HTTP' if http else ''}: {ingest * 1000:.0f} ms")
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    measured = OpportunityColumns()
+    measured.extend(records[:10000])
+    columnar = tracemalloc.get_traced_memory()[0] - before
+    decoded = [make_opportunity(i) for i in range(1, 10001)]
+    as_dicts = tracemalloc.get_traced_memory()[0] - before - columnar
+    tracemalloc.stop()
+    del decoded
+    print(f"memory per 10k opportunities: columns {columnar / 2 ** 20:.2f} MiB, decoded records {as_dicts / 2 ** 20:.1f} MiB")
+
+    for group_by in (["milestone", "currency"], ["owner"], ["close_month", "currency"], []):
+        start = time.perf_counter()
+        result = columns.rollup(group_by)
+        elapsed = time.perf_counter() - start
+        print(f"rollup by {group_by or 'nothing'}: {elapsed * 1000:.1f} ms, {len(result['groups'])} groups")
+        if not http:
+            check(result, records, group_by)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--opportunities", type=int, default=100000)
+    parser.add_argument("--http", action="store_true", help="Stream opportunities from the local stand-in server")
+    args = parser.parse_args()
+
+    with MockCapsule(counts={"opportunities": args.opportunities}) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        run(args.opportunities, args.http)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Build time, memory and query latency of the in-process party search index,
+compared with a /parties/search round trip to a local stand-in server.
+
+Usage:
+    python benchmarks/bench_search_index.py [--parties 10000] [--latency 0.2]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule, make_party
+
+QUERIES = [
+    ("exact name", "Example4243"),
+    ("first + last name", "John Example4243"),
+    ("name prefix", "Example424"),
+    ("misspelled name", "Exmaple4243"),
+    ("email address", "contact4243@example43.com"),
+    ("phone, no country code", "44 243 43 72"),
+    ("city", "Zurich"),
+]
+
+
+def timed(fn, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(count: int):
+    from api.parties import _to_party, search_parties
+    from api.search_index import PartyIndex, get_party_search
+
+    parties = [_to_party(make_party(i)) for i in range(1, count + 1)]
+
+    start = time.perf_counter()
+    index = PartyIndex()
+    index.add(parties)
+    build = time.perf_counter() - start
+    index.complete = True
+
+    # Measured on a second build, tracing allocations slows it down considerably
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    measured = PartyIndex()
+    measured.add(parties)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"build: {build * 1000:.0f} ms for {count} parties ({build * 1e6 / count:.1f} us per party)")
+    print(f"index memory (excluding the Party objects): {memory / 2 ** 20:.1f} MiB, "
+          f"{memory / count * 10000 / 2 ** 20:.1f} MiB per 10k parties")
+    print(index.stats())
+    print()
+
+    search = get_party_search()
+    for label, q in QUERIES:
+        search.enabled, search.index = False, PartyIndex()
+        live = timed(lambda: search_parties(q), repeat=5)
+        search.enabled, search.index = True, index
+        hits = search_parties(q)
+        local = timed(lambda: search_parties(q))
+        print(f"{label:24s} {q!r:30s} hits: {len(hits):3d}   index: {local * 1000:7.3f} ms   API: {live * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parties", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Artificial server latency in seconds")
+    args = parser.parse_args()
+
+    with MockCapsule(counts={"parties": args.parties}, latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        run(args.parties)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Cold start cost of the MCP server, as a desktop client sees it when it spawns
+a fresh server process per session.
+
+1. Import time of server/main.py from `python -X importtime`, with the largest
+   direct imports.
+2. Time from spawning `python server/main.py` to the responses to initialize,
+   tools/list and a first tools/call, speaking MCP over stdio against a local
+   stand-in server. Measured with tools registered on first use (default) and at
+   import (CAPSULECRM_LAZY_TOOLS=0).
+
+With --budget the script exits non-zero when the median time to the first tool
+response with lazy registration exceeds it, so it can guard startup time in CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--budget 3.0]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_capsule import MockCapsule
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+
+
+def import_times(env: dict) -> tuple:
+    """Return the cumulative import time of main and its largest direct imports, in seconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total, children = 0.0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[12:]:
+            continue
+        _, cumulative, name = line[12:].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        seconds = int(cumulative) / 1e6
+        if name.strip() == "main" and depth == 0:
+            total = seconds
+        elif depth == 1:
+            children.append((seconds, name.strip()))
+    return total, sorted(children, reverse=True)[:5]
+
+
+class StdioSession:
+    """A minimal MCP client speaking newline-delimited JSON-RPC to a server subprocess."""
+
+    def __init__(self, env: dict):
+        self.start = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, str(SERVER_DIR / "main.py")],
+            env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        self.next_id = 0
+
+    def send(self, method: str, params: dict = None, notify: bool = False):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        if not notify:
+            self.next_id += 1
+            message["id"] = self.next_id
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def call(self, method: str, params: dict = None) -> float:
+        """Send a request, wait for its response and return seconds since the process was spawned."""
+        self.send(method, params)
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"Server exited before answering {method}")
+            response = json.loads(line)
+            if response.get("id") == self.next_id:
+                if "error" in response or response.get("result", {}).get("isError"):
+                    raise RuntimeError(f"{method} failed: {response}")
+                return time.perf_counter() - self.start
+
+    def close(self):
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def time_to_first_response(env: dict) -> dict:
+    session = StdioSession(env)
+    try:
+        initialized = session.call("initialize", {
+            "protocolVersion": "2025-06-18",
+            "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "1.0"},
+        })
+        session.send("notifications/initialized", notify=True)
+        listed = session.call("tools/list", {})
+        called = session.call("tools/call", {"name": "list_parties_tool", "arguments": {"per_page": 1}})
+    finally:
+        session.close()
+    return {"initialize": initialized, "tools/list": listed, "tools/call": called}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Fail if the median seconds to the first tool response (lazy) exceed this")
+    args = parser.parse_args()
+
+    with MockCapsule() as mock:
+        env = {**os.environ, "CAPSULECRM_ACCESS_TOKEN": os.environ.get("CAPSULECRM_ACCESS_TOKEN", "benchmark-token"),
+               "CAPSULECRM_API_URL": mock.base_url}
+
+        for label, mode_env in (("lazy tools", {}), ("eager tools", {"CAPSULECRM_LAZY_TOOLS": "0"})):
+            total, children = import_times({**env, **mode_env})
+            print(f"import main ({label}): {total:.3f} s")
+            for seconds, name in children:
+                print(f"    {name:28s} {seconds:.3f} s")
+
+        medians = {}
+        for label, mode_env in (("lazy tools", {}), ("eager tools", {"CAPSULECRM_LAZY_TOOLS": "0"})):
+            runs = [time_to_first_response({**env, **mode_env}) for _ in range(args.runs)]
+            medians[label] = {step: statistics.median(run[step] for run in runs) for step in runs[0]}
+            print(f"{label:12s} " + "   ".join(f"{step} {seconds:.3f} s" for step, seconds in medians[label].items()))
+
+    if args.budget is not None and medians["lazy tools"]["tools/call"] > args.budget:
+        print(f"First tool response took {medians['lazy tools']['tools/call']:.3f} s, over the {args.budget:.3f} s budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for the API and tool layers, run against the local
+stand-in server so results only depend on this code.
+
+Measures:
+- request.*      per-call cost of api.utils.request()/request_async() next to a
+                 bare pooled httpx call, i.e. the overhead of pacing, retries,
+                 coalescing and error handling
+- decode.*       per-record cost of building Person, Organisation and Task from
+                 API JSON, validated (the default) and constructed (CAPSULECRM_TRUSTED_DECODE)
+- conditions.*   compiling the find_parties/find_tasks user_input into a query
+- tool.*         end-to-end latency of every registered MCP tool through the
+                 server's tools/call handler
+
+All timings are in microseconds (mean, p50, p99 over --repeat samples). With
+--output the results are written as JSON together with the commit, Python
+version and settings, so runs can be stored and compared over time; --compare
+prints the change against such a file and exits non-zero if any p50 got slower
+by more than --threshold.
+
+Usage:
+    python benchmarks/bench_suite.py [--repeat 20] [--latency 0.0] [--pages 3]
+                                     [--only tool.] [--output results.json]
+                                     [--compare baseline.json] [--threshold 0.25]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule, make_party, make_task
+
+# Filters exercising the operator and value handling of find_parties/find_tasks
+PARTY_FILTER = {"name": "Example", "city": "Zurich", "tag": "VIP", "owner": 2, "hasEmailAddress": True,
+                "addedOn": {"operator": "is after", "value": "2025-01-01"}}
+TASK_FILTER = {"status": "open", "owner": 1, "category": 2, "description": "Follow up",
+               "dueOn": {"operator": "is before", "value": "2026-01-01"}}
+
+_OPPORTUNITY = {"name": "Benchmark deal", "party": {"id": 1}, "milestone": {"id": 1},
+                "value": {"amount": 12000, "currency": "CHF"}, "value_type": "total"}
+_PERSON = {"id": 1, "type": "person", "firstName": "Maria", "lastName": "Benchmark"}
+_TASK = {"id": 1, "description": "Benchmark follow up", "dueOn": "2026-01-15"}
+
+# Arguments each registered tool is called with
+TOOL_ARGUMENTS = {
+    "list_parties_tool": {"per_page": 50},
+    "get_party_tool": {"party_id": 1},
+    "get_parties_tool": {"party_ids": list(range(1, 21))},
+    "create_party_tool": {"party": _PERSON},
+    "update_party_tool": {"party_id": 1, "party": _PERSON},
+    "bulk_create_parties_tool": {"parties": [_PERSON] * 5},
+    "bulk_update_parties_tool": {"parties": [_PERSON] * 5},
+    "search_parties_tool": {"q": "Example"},
+    "find_parties_tool": {"user_input": {"city": "Zurich"}},
+    "list_parties_all_tool": {},
+    "find_parties_all_tool": {"user_input": {"city": "Zurich"}},
+    "party_360_tool": {"party": 3},
+    "list_opportunities_tool": {"per_page": 50},
+    "get_opportunity_tool": {"opportunity_id": 1},
+    "get_opportunities_tool": {"opportunity_ids": list(range(1, 21))},
+    "create_opportunity_tool": {"opportunity": _OPPORTUNITY},
+    "update_opportunity_tool": {"opportunity_id": 1, "opportunity": _OPPORTUNITY},
+    "bulk_create_opportunities_tool": {"opportunities": [_OPPORTUNITY] * 5},
+    "bulk_update_opportunities_tool": {"updates": [{"id": 1, "opportunity": _OPPORTUNITY}] * 5},
+    "search_opportunities_tool": {"q": "Deal"},
+    "find_opportunities_tool": {"user_input": {"milestone": 1}},
+    "list_opportunities_all_tool": {},
+    "find_opportunities_all_tool": {"user_input": {"milestone": 1}},
+    "pipeline_value_rollup_tool": {"group_by": ["milestone"]},
+    "list_tasks_tool": {"per_page": 50},
+    "get_task_tool": {"task_id": 1},
+    "get_tasks_tool": {"task_ids": list(range(1, 21))},
+    "create_task_tool": {"task": _TASK},
+    "update_task_tool": {"task_id": 1, "task": _TASK},
+    "bulk_create_tasks_tool": {"tasks": [_TASK] * 5},
+    "bulk_update_tasks_tool": {"tasks": [_TASK] * 5},
+    "search_tasks_tool": {"q": "Follow"},
+    "find_tasks_tool": {"user_input": {"status": "open"}},
+    "list_tasks_all_tool": {},
+    "find_tasks_all_tool": {"user_input": {"status": "open"}},
+    "list_milestones_tool": {},
+    "get_rate_limit_tool": {},
+    "refresh_reference_data_tool": {},
+    "get_entity_cache_stats_tool": {},
+    "server_stats_tool": {},
+    "profile_next_calls_tool": {"calls": 0},
+    "get_mirror_status_tool": {},
+    "sync_mirror_tool": {},
+    "export_records_tool": {"entity": "parties", "format": "csv", "user_input": {"city": "Zurich"}, "filename": "bench-suite", "overwrite": True},
+}
+
+# Tools that only work with an optional feature enabled, and the variable enabling it
+OPTIONAL_TOOLS = {"sync_mirror_tool": "CAPSULECRM_MIRROR_PATH"}
+
+
+def stats(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "unit": "us",
+        "n": len(samples),
+        "mean": statistics.mean(samples) * 1e6,
+        "p50": samples[len(samples) // 2] * 1e6,
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6,
+    }
+
+
+def time_calls(fn, repeat: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return stats(samples)
+
+
+async def time_calls_async(make_call, repeat: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        await make_call()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await make_call()
+        samples.append(time.perf_counter() - start)
+    return stats(samples)
+
+
+def per_record(fn, records: list, repeat: int) -> dict:
+    """Time fn over every record, reporting microseconds per record."""
+    result = time_calls(lambda: [fn(record) for record in records], repeat, warmup=1)
+    for key in ("mean", "p50", "p99"):
+        result[key] /= len(records)
+    result["records"] = len(records)
+    return result
+
+
+def bench_request(repeat: int) -> dict:
+    from api import utils
+
+    client = utils.get_client_manager().client
+    results = {
+        "request.httpx": time_calls(lambda: client.get("/parties/1").json(), repeat),
+        "request.request": time_calls(lambda: utils.request("GET", "/parties/1"), repeat),
+    }
+
+    async def run_async():
+        result = await time_calls_async(lambda: utils.request_async("GET", "/parties/1"), repeat)
+        await utils.aclose_clients()
+        return result
+    results["request.request_async"] = asyncio.run(run_async())
+    return results
+
+
+def bench_decode(repeat: int) -> dict:
+    from api.models import Person, Organisation, Task
+    from api.decode import construct
+
+    parties = [make_party(i) for i in range(1, 1001)]
+    samples = {
+        "person": (Person, [p for p in parties if p["type"] == "person"]),
+        "organisation": (Organisation, [p for p in parties if p["type"] == "organisation"]),
+        "task": (Task, [make_task(i) for i in range(1, 501)]),
+    }
+    results = {}
+    for name, (model, records) in samples.items():
+        results[f"decode.{name}.validated"] = per_record(lambda record: model(**record), records, repeat)
+        results[f"decode.{name}.constructed"] = per_record(lambda record: construct(model, record), records, repeat)
+    return results
+
+
+def bench_conditions(repeat: int) -> dict:
+    from api.query import compile_query
+
+    return {
+        "conditions.find_parties": time_calls(lambda: compile_query("parties", PARTY_FILTER), repeat * 50),
+        "conditions.find_tasks": time_calls(lambda: compile_query("tasks", TASK_FILTER), repeat * 50),
+    }
+
+
+async def bench_tools(repeat: int) -> dict:
+    from main import mcp, lazy_tools
+
+    await asyncio.to_thread(lazy_tools.load)
+    tools = await mcp.get_tools()
+    missing = sorted(set(tools) - set(TOOL_ARGUMENTS))
+    if missing:
+        print(f"No benchmark arguments for: {', '.join(missing)}", file=sys.stderr)
+
+    # Call the server's tools/call handler directly, as in bench_concurrency.py
+    call_tool = mcp._mcp_call_tool
+    results = {}
+    for name in sorted(set(tools) & set(TOOL_ARGUMENTS)):
+        if name in OPTIONAL_TOOLS and not os.getenv(OPTIONAL_TOOLS[name]):
+            continue
+        arguments = TOOL_ARGUMENTS[name]
+        try:
+            results[f"tool.{name}"] = await time_calls_async(lambda: call_tool(name, arguments), repeat, warmup=1)
+        except Exception as e:
+            results[f"tool.{name}"] = {"error": str(e)}
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> list:
+    """Print the p50 change of every benchmark against a stored run; return those slower than threshold."""
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    regressions = []
+    print(f"\nCompared with {baseline_path} (p50):")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or "p50" not in before or "p50" not in result:
+            continue
+        change = result["p50"] / before["p50"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:48s} {before['p50']:12.1f} -> {result['p50']:12.1f} us  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial server latency in seconds")
+    parser.add_argument("--pages", type=int, default=3, help="Pages of 100 records per entity on the stand-in server")
+    parser.add_argument("--only", default=None, help="Only run benchmarks whose name starts with this prefix")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative p50 slowdown reported as a regression")
+    args = parser.parse_args()
+
+    counts = {entity: args.pages * 100 for entity in ("parties", "opportunities", "tasks")}
+    with MockCapsule(counts=counts, latency=args.latency) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        os.environ.setdefault("CAPSULECRM_EXPORT_DIR", tempfile.mkdtemp(prefix="capsulecrm-bench-suite-"))
+
+        groups = (
+            ("request.", lambda: bench_request(args.repeat)),
+            ("decode.", lambda: bench_decode(args.repeat)),
+            ("conditions.", lambda: bench_conditions(args.repeat)),
+            ("tool.", lambda: asyncio.run(bench_tools(args.repeat))),
+        )
+        results = {}
+        for prefix, run in groups:
+            if args.only and not (prefix.startswith(args.only) or args.only.startswith(prefix)):
+                continue
+            results.update({name: result for name, result in run().items()
+                            if not args.only or name.startswith(args.only)})
+
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:50s} error: {result['error']}")
+        else:
+            print(f"{name:50s} mean {result['mean']:12.1f} us   p50 {result['p50']:12.1f} us   p99 {result['p99']:12.1f} us")
+
+    report = {
+        "suite": "capsulecrm-mcp",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"repeat": args.repeat, "latency": args.latency, "pages": args.pages},
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nResults written to {args.output}")
+
+    failed = [name for name, result in results.items() if "error" in result]
+    if args.compare:
+        failed += compare(results, args.compare, args.threshold)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant mode against the local stand-in server: asserts that accounts named by
+their own access token get their own entity and reference caches, connection pools,
+rate-limit budgets and disk cache keys, and never see the process account's mirror
+or search index; then measures the memory an idle account costs and asserts that
+the least recently used idle accounts are closed once more than
+CAPSULECRM_MAX_TENANTS are open, or once idle for CAPSULECRM_TENANT_IDLE_TIMEOUT,
+while an account with a call in progress is kept.
+
+Usage:
+    python benchmarks/bench_tenants.py [--tenants 1000] [--max-tenants 100]
+"""
+
+import os
+import sys
+import time
+import gc
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+TOKEN = "benchmark-token"
+
+
+async def isolation(mock):
+    from api.utils import use_tenant, get_client_manager, get_rate_limit_budget, get_disk_cache, _disk_key, _tenant
+    from api.parties import get_party_async
+    from api.entity_cache import get_entity_cache
+    from api.reference import get_reference_cache, invalidate_reference_data
+    from api.mirror import get_mirror
+    from api.search_index import get_party_search, search_party_index
+    from api.tenants import current_tenant, tenant_key
+
+    def requests_by(token):
+        return mock.tokens[token]
+
+    def stored_accounts(endpoint):
+        disk = get_disk_cache()
+        with disk._lock:
+            return {row[0] for row in disk._conn.execute("SELECT account FROM responses WHERE endpoint = ?", (endpoint,))}
+
+    await get_party_async(1)
+    own = {"cache": get_entity_cache(), "pool": get_client_manager(), "budget": _tenant().rate_limiter,
+           "disk_key": _disk_key("/parties/1", None)}
+    with use_tenant("token-a"):
+        await get_party_async(1)
+        a_first = requests_by("token-a")
+        await get_party_async(1)
+        a_second = requests_by("token-a")
+        a = {"cache": get_entity_cache(), "pool": get_client_manager(), "budget": _tenant().rate_limiter,
+             "disk_key": _disk_key("/parties/1", None), "references": get_reference_cache()}
+        get_reference_cache().get("milestones")
+    with use_tenant("token-b"):
+        before, not_modified = requests_by("token-b"), mock.not_modified
+        await get_party_async(1)
+        b_requests, b_not_modified = requests_by("token-b") - before, mock.not_modified - not_modified
+        b = {"cache": get_entity_cache(), "pool": get_client_manager(), "budget": _tenant().rate_limiter,
+             "disk_key": _disk_key("/parties/1", None)}
+        invalidate_reference_data()
+
+    assert a_first == 1, f"account A's first read should go upstream with A's token ({a_first} requests)"
+    assert a_second == 1, "account A's second read should come from A's cache"
+    assert b_requests == 1 and b_not_modified == 0, "account B's read must not be answered from A's cached or stored copy"
+    assert requests_by(TOKEN) >= 1, "the process account should make its own request"
+    for part in ("cache", "pool", "budget"):
+        assert len({id(own[part]), id(a[part]), id(b[part])}) == 3, f"accounts share a {part}"
+    assert len({own["disk_key"], a["disk_key"], b["disk_key"]}) == 3, "accounts share disk cache keys"
+    assert stored_accounts("/parties/1") == {tenant_key(TOKEN), tenant_key("token-a"), tenant_key("token-b")}, stored_accounts("/parties/1")
+    assert a["references"] is not get_reference_cache(), "accounts share reference data"
+    print("  entity caches, connection pools, rate-limit budgets, disk cache keys and reference data are per account")
+
+    # A 429 with Retry-After on one account pauses only that account's calls
+    with use_tenant("token-c"):
+        current_tenant().rate_limiter.block_for(30)
+        assert get_rate_limit_budget()["blocked_for_seconds"] > 0
+    start = time.perf_counter()
+    with use_tenant("token-b"):
+        await get_party_async(2)
+    assert time.perf_counter() - start < 1.0, "a blocked budget on account C paced account B"
+    assert get_rate_limit_budget()["blocked_for_seconds"] == 0, "a blocked budget on account C blocked the process account"
+    print("  a 429 on one account pauses only that account")
+
+    get_party_search().index.complete = True
+    with use_tenant("token-a"):
+        tenant_mirror, tenant_search = get_mirror(), search_party_index("Example")
+        a_milestones = get_reference_cache().peek("milestones")
+    assert a_milestones is not None, "invalidating B's reference data dropped A's"
+    assert get_mirror() is not None and tenant_mirror is None, "accounts see the process account's mirror"
+    assert tenant_search is None, "accounts search the process account's index"
+    print("  accounts see neither the process account's mirror nor its search index")
+
+
+def allocated(baseline=None) -> tuple:
+    """(snapshot, bytes allocated since baseline) by the server, leaving out the stand-in running in this process."""
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, pattern, all_frames=True)
+        for pattern in ("*mock_capsule.py", "*socketserver.py", "*http/server.py", "*tracemalloc.py")
+    ])
+    if baseline is None:
+        return snapshot, 0
+    return snapshot, sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+
+
+async def open_idle(tokens: list):
+    """Make one call per account, then leave it idle."""
+    from api.utils import use_tenant
+    from api.parties import get_party_async
+    for i, token in enumerate(tokens):
+        with use_tenant(token):
+            await get_party_async(i % 1000 + 1)
+
+
+async def eviction(tenants: int, max_tenants: int):
+    from api.utils import use_tenant, get_tenants
+    from api.parties import get_party_async
+    registry = get_tenants()
+    registry.close()
+    evicted = registry.evicted
+
+    def open_tokens():
+        return {tenant.token for tenant in registry._tenants.values()}
+
+    # Memory per idle account: open max_tenants (none is closed yet) and compare
+    await open_idle(["warm-up"])
+    registry.close()
+    tracemalloc.start(8)
+    baseline, _ = allocated()
+    await open_idle([f"idle-{i}" for i in range(max_tenants)])
+    _, used = allocated(baseline)
+    print(f"\n{max_tenants} idle accounts: {used / max_tenants / 1024:.1f} KiB each "
+          f"(pools, budget, one cached party)")
+    assert registry.evicted == evicted and len(open_tokens()) == max_tenants, registry.stats(detail=False)
+
+    # At the limit, the least recently used idle account is closed: idle-0 was just used, so idle-1 goes
+    await open_idle(["idle-0", "one-more"])
+    assert len(open_tokens()) == max_tenants, registry.stats(detail=False)
+    assert "idle-1" not in open_tokens() and {"idle-0", "one-more"} <= open_tokens(), "the least recently used account should be closed"
+    print("  at the limit the least recently used idle account is closed")
+
+    # Churn through many more accounts while one has a call in progress
+    with use_tenant("busy"):
+        await open_idle([f"churn-{i}" for i in range(tenants)])
+        busy_kept = "busy" in open_tokens()
+    _, churned = allocated(baseline)
+    stats = registry.stats(detail=False)
+    print(f"after {tenants} more accounts: {stats['open']} open, {stats['evicted'] - evicted} closed, "
+          f"{churned / 1024:.0f} KiB in use")
+    tracemalloc.stop()
+    assert stats["open"] <= max_tenants, f"{stats['open']} accounts open, limit {max_tenants}"
+    assert busy_kept, "an account with a call in progress was closed"
+    assert churned < used * 1.5, f"{churned / 1024:.0f} KiB in use after churning, {used / 1024:.0f} KiB for {max_tenants} accounts"
+    print(f"  never more than {max_tenants} accounts open, the busy one kept, memory bounded")
+
+    # Idle timeout: the next account opened closes every account idle for longer
+    registry.idle_timeout = 0.05
+    await asyncio.sleep(0.1)
+    with use_tenant("late"):
+        await get_party_async(1)
+    assert open_tokens() == {"late"}, f"{len(open_tokens())} accounts open after the idle timeout"
+    print("  accounts idle past the timeout are closed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=1000, help="accounts opened while checking eviction")
+    parser.add_argument("--max-tenants", type=int, default=100, help="CAPSULECRM_MAX_TENANTS")
+    args = parser.parse_args()
+
+    with MockCapsule() as mock:
+        os.environ["CAPSULECRM_ACCESS_TOKEN"] = TOKEN
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        os.environ["CAPSULECRM_MULTI_TENANT"] = "1"
+        os.environ["CAPSULECRM_MAX_TENANTS"] = str(args.max_tenants)
+        os.environ["CAPSULECRM_MIRROR_PATH"] = os.path.join(tempfile.mkdtemp(prefix="capsulecrm-tenants-"), "mirror.db")
+        os.environ["CAPSULECRM_SEARCH_INDEX"] = "1"
+        os.environ["CAPSULECRM_DISK_CACHE_PATH"] = os.path.join(os.path.dirname(os.environ["CAPSULECRM_MIRROR_PATH"]), "responses.db")
+
+        from api.utils import aclose_clients
+
+        async def run():
+            print("isolation")
+            await isolation(mock)
+            await eviction(args.tenants, args.max_tenants)
+            await aclose_clients()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
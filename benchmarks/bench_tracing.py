@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Cost of tracing: per-call time of span() and a @traced function with tracing off
+and on, then one find_tasks_tool call through the MCP middleware against the local
+stand-in server with tracing on, printed as its span tree. With --profile the call
+is also profiled in both modes and the profile files are listed.
+
+Usage:
+    python benchmarks/bench_tracing.py [--calls 200000] [--profile]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule
+
+
+def per_call(fn, calls: int) -> float:
+    """Microseconds per call of fn()."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def print_tree(records: list):
+    children = {}
+    for record in records:
+        children.setdefault(record["parent_id"], []).append(record)
+
+    def walk(parent_id, depth):
+        for record in sorted(children.get(parent_id, []), key=lambda r: r["start"]):
+            attributes = " ".join(f"{key}={value}" for key, value in record["attributes"].items())
+            print(f"  {'  ' * depth}{record['name']:{50 - 2 * depth}s} {record['duration_ms']:8.2f} ms  {attributes}")
+            walk(record["span_id"], depth + 1)
+    walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--profile", action="store_true", help="also profile the tool call with cProfile and sampling")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="capsulecrm-trace-")
+    trace_file = os.path.join(workdir, "trace.jsonl")
+    with MockCapsule() as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        os.environ["CAPSULECRM_TRACE_FILE"] = trace_file
+        os.environ["CAPSULECRM_PROFILE_DIR"] = workdir
+
+        from api import tracing
+        from api.profiling import get_profiler
+        from api.utils import close_clients, aclose_clients
+
+        @tracing.traced
+        def noop():
+            pass
+
+        tracer = tracing.get_tracer()
+        baseline = per_call(lambda: None, args.calls)
+        for enabled in (False, True):
+            tracer.enabled = enabled
+            # Keep the spans in memory: time the bookkeeping, not the file writes
+            write, tracer._write = tracer._write, lambda spans: None
+            def nested():
+                with tracing.span("step", n=1):
+                    pass
+            nested_us = per_call(nested, args.calls) - baseline
+            traced_us = per_call(noop, args.calls) - baseline
+            tracer._write = write
+            state = "on " if enabled else "off"
+            print(f"tracing {state}: with span() {nested_us:6.2f} us   @traced call {traced_us:6.2f} us")
+        tracer.enabled = True
+
+        import main as server
+        server.lazy_tools.load()
+
+        arguments = {"user_input": {"status": "open"}}
+
+        async def session():
+            # One event loop throughout, as in the server: the async connection pool belongs to it
+            async def call():
+                start = time.perf_counter()
+                await server.mcp._mcp_call_tool("find_tasks_tool", arguments)
+                return (time.perf_counter() - start) * 1000
+
+            await call()
+            open(trace_file, "w").close()
+            elapsed = await call()
+            with open(trace_file) as f:
+                records = [json.loads(line) for line in f]
+            print(f"\nfind_tasks_tool traced: {elapsed:.1f} ms, {len(records)} spans")
+            print_tree(records)
+
+            if args.profile:
+                print()
+                for mode in ("cprofile", "sampling"):
+                    get_profiler().arm(1, mode)
+                    print(f"find_tasks_tool profiled ({mode}): {await call():.1f} ms")
+                for path in get_profiler().stats()["recent_profiles"]:
+                    print(f"  {path} ({os.path.getsize(path)} bytes)")
+            await aclose_clients()
+
+        asyncio.run(session())
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
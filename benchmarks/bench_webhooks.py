@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Webhook receiver, end to end against the local stand-in server: replays the recorded
+REST hook events in hook_events.json, first with a wrong signature and then signed,
+and asserts that the badly signed ones change nothing and that the signed ones update
+the entity cache, the mirror and the party search index, with */deleted events
+dropping the records, without any request to the API, and that malformed records
+and bodies are answered rather than breaking the request; measures the time from an edit's event to the change being visible; and
+posts a flood of events to compare the requests needed to read the affected
+records afterwards with verified events (updated in place) and with unverified ones
+(cache entries dropped).
+
+Usage:
+    python benchmarks/bench_webhooks.py [--events 20000] [--records 500] [--window 0.2]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
+
+from mock_capsule import MockCapsule, post_hook
+
+SECRET = "benchmark-secret"
+RECORDED_EVENTS = Path(__file__).parent / "hook_events.json"
+
+
+def wait_for_batch(receiver, batches: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while receiver.stats()["batches"] <= batches and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def parties_found(q: str) -> set:
+    from api.search_index import search_party_index
+    return {party.id for party in search_party_index(q, per_page=100) or []}
+
+
+def post_recorded(mock, receiver, events: list, secret) -> list:
+    """Post every recorded event signed with secret; returns the statuses once any accepted batch was applied."""
+    batches = receiver.stats()["batches"]
+    statuses = [post_hook(receiver.url, event, secret) for event in events]
+    if 202 in statuses or 200 in statuses:
+        wait_for_batch(receiver, batches)
+    return statuses
+
+
+def verify_recorded_events(mock, receiver, events: list):
+    from api.mirror import get_mirror
+    from api.parties import get_party
+    from api.opportunities import get_opportunity
+    from api.tasks import get_task
+    mirror = get_mirror()
+
+    def mirrored(entity):
+        return {record["id"]: record for record in mirror.records(entity)}
+
+    assert parties_found("Organisation 9") >= {9}, "party 9 should be indexed before it is deleted"
+    assert 1001 not in parties_found("Newcomer")
+
+    # Badly signed and unsigned: rejected, and nothing they carry is applied
+    stats = receiver.stats()
+    for secret in ("wrong", None):
+        statuses = post_recorded(mock, receiver, events, secret)
+        assert statuses == [401] * len(events), statuses
+    time.sleep(receiver.batch_window * 2)
+    before = mock.requests
+    assert receiver.stats()["batches"] == stats["batches"], receiver.stats()
+    assert get_party(6).name == "Organisation 6 AG", get_party(6).name
+    assert get_task(25).status != "COMPLETED"
+    assert mirrored("parties")[6]["name"] == "Organisation 6 AG"
+    assert 1001 not in mirrored("parties") and 9 in mirrored("parties")
+    assert parties_found("Holding") == set()
+    assert mock.requests == before, "cached records should still be served without requests"
+    print(f"  {len(events)} recorded events with a wrong or no signature: 401, nothing applied")
+
+    # Correctly signed: applied to the cache, the mirror and the index without requests
+    statuses = post_recorded(mock, receiver, events, SECRET)
+    assert all(status in (200, 202) for status in statuses), statuses
+    before = mock.requests
+    assert get_party(6).name == "Organisation 6 Holding AG", get_party(6).name
+    assert get_party(7).jobTitle == "Head of Sales", get_party(7).jobTitle
+    assert get_opportunity(12)["milestone"]["id"] == 4, get_opportunity(12)["milestone"]
+    assert get_task(25).status == "COMPLETED", get_task(25).status
+    assert mock.requests == before, f"{mock.requests - before} requests for records the events carried"
+    parties = mirrored("parties")
+    assert parties[6]["name"] == "Organisation 6 Holding AG", parties[6]["name"]
+    assert parties[1001]["lastName"] == "Newcomer"
+    assert mirrored("opportunities")[12]["milestone"]["id"] == 4
+    assert mirrored("tasks")[25]["status"] == "COMPLETED"
+    assert parties_found("Holding") == {6}, parties_found("Holding")
+    assert 1001 in parties_found("Newcomer"), parties_found("Newcomer")
+    assert receiver.stats()["ignored"] == 1, receiver.stats()
+    print("  signed updates and creations: entity cache, mirror and search index updated, 0 requests")
+
+    # */deleted: gone from the mirror and the index, and no longer served from the cache
+    assert 9 not in parties, "deleted party still in the mirror"
+    assert 13 not in mirrored("opportunities"), "deleted opportunity still in the mirror"
+    assert 9 not in parties_found("Organisation 9"), "deleted party still in the search index"
+    before = mock.requests
+    get_party(9)
+    get_opportunity(13)
+    assert mock.requests - before == 2, f"deleted records served from the cache ({mock.requests - before} requests)"
+    print("  signed deletions: dropped from the mirror and the search index, cached copies invalidated")
+
+
+def flood(mock, receiver, secret, events: int, records: int) -> tuple:
+    """Post `events` party/updated events spread over `records` parties; returns (events/s, requests to read them after)."""
+    from api.parties import get_parties
+    ids = list(range(1, records + 1))
+    get_parties(ids)
+    batches = receiver.stats()["batches"]
+    start = time.perf_counter()
+    for offset in range(0, events, 100):
+        post_hook(receiver.url, [mock.hook_event("party/updated", ids[i % records]) for i in range(offset, min(offset + 100, events))], secret)
+    rate = events / (time.perf_counter() - start)
+    wait_for_batch(receiver, batches)
+    before = mock.requests
+    get_parties(ids)
+    return rate, mock.requests - before
+
+
+def verify_malformed(mock, receiver):
+    from api.parties import get_party
+
+    # A record with an id no CapsuleCRM record has is skipped; the rest of the event is applied
+    mock.modify("parties", 2, jobTitle="Head of Purchasing")
+    event = mock.hook_event("party/updated", 2)
+    event["payload"] = [{"id": "not-a-number", "type": "person"}] + event["payload"] + [{"id": None}]
+    ignored = receiver.stats()["ignored"]
+    statuses = post_recorded(mock, receiver, [event], SECRET)
+    assert statuses == [202], statuses
+    assert receiver.stats()["ignored"] == ignored + 2, receiver.stats()
+    assert get_party(2).jobTitle == "Head of Purchasing", get_party(2).jobTitle
+    print("  records without a valid id: skipped and counted as ignored, the rest of the event applied")
+
+    # A negative Content-Length is refused instead of reading until the client disconnects
+    host, port = receiver.url.split("//", 1)[1].split("/", 1)[0].rsplit(":", 1)
+    with socket.create_connection((host, int(port)), timeout=5) as conn:
+        conn.sendall(f"POST {receiver.path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: -1\r\n\r\n".encode())
+        status = conn.recv(1024).split(b" ", 2)[1]
+    assert status == b"400", status
+    print("  a negative Content-Length: 400 without waiting for the body")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000, help="events posted in the flood")
+    parser.add_argument("--records", type=int, default=500, help="distinct parties the flood is about (at most 1000)")
+    parser.add_argument("--window", type=float, default=0.2, help="seconds events are collected before being applied")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.records > 1000:
+        parser.error("--records is at most 1000")
+
+    # The recorded events create party 1001, so the stand-in has 1000
+    with MockCapsule(counts={"parties": 1000}) as mock:
+        os.environ.setdefault("CAPSULECRM_ACCESS_TOKEN", "benchmark-token")
+        os.environ["CAPSULECRM_API_URL"] = mock.base_url
+        os.environ["CAPSULECRM_MIRROR_PATH"] = os.path.join(tempfile.mkdtemp(prefix="capsulecrm-hooks-"), "mirror.db")
+        # With events keeping cached records current, they can be served for much longer
+        os.environ["CAPSULECRM_ENTITY_CACHE_TTL"] = "3600"
+        os.environ["CAPSULECRM_ENTITY_CACHE_SIZE"] = str(max(1000, args.records))
+        os.environ["CAPSULECRM_WEBHOOK_PORT"] = "0"
+        os.environ["CAPSULECRM_WEBHOOK_SECRET"] = SECRET
+        os.environ["CAPSULECRM_WEBHOOK_BATCH_WINDOW"] = str(args.window)
+        os.environ["CAPSULECRM_SEARCH_INDEX"] = "1"
+
+        from api.webhooks import get_webhook_receiver, WebhookReceiver
+        from api.mirror import get_mirror
+        from api.parties import get_party, get_parties
+        from api.opportunities import get_opportunity
+        from api.tasks import get_task
+        from api.search_index import get_party_search
+        from api.utils import close_clients
+
+        receiver = get_webhook_receiver()
+        receiver.start()
+        mirror = get_mirror()
+        mirror.sync(full=True)
+        get_party_search().build()
+        get_parties(list(range(1, 21)))
+        get_opportunity(12)
+        get_opportunity(13)
+        get_task(25)
+
+        print("recorded events")
+        with open(RECORDED_EVENTS) as f:
+            events = json.load(f)
+        verify_recorded_events(mock, receiver, events)
+        verify_malformed(mock, receiver)
+
+        latencies = []
+        for round_ in range(args.rounds):
+            mock.modify("parties", 3, name=f"Organisation 3 AG (edit {round_})")
+            start = time.perf_counter()
+            post_hook(receiver.url, mock.hook_event("party/updated", 3), SECRET)
+            while get_party(3).name != f"Organisation 3 AG (edit {round_})":
+                time.sleep(0.001)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"\nedit visible after (batch window {args.window}s): median {statistics.median(latencies):.0f} ms")
+
+        print(f"\nflood of {args.events} events about {args.records} parties")
+        rate, requests = flood(mock, receiver, SECRET, args.events, args.records)
+        stats = receiver.stats()
+        print(f"  verified, updated in place   {rate:8.0f} events/s posted  {stats['coalesced']:6d} coalesced  "
+              f"{stats['batches']:3d} batches  last {stats['last_batch_ms']:.1f} ms  reading them again: {requests} requests")
+        unverified = WebhookReceiver(port=0, secret=None, batch_window=args.window)
+        unverified.start()
+        rate, requests = flood(mock, unverified, None, args.events, args.records)
+        print(f"  unverified, cache dropped    {rate:8.0f} events/s posted  {unverified.stats()['coalesced']:6d} coalesced  "
+              f"{unverified.stats()['batches']:3d} batches  reading them again: {requests} requests")
+        unverified.stop()
+        receiver.stop()
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
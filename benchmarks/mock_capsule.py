@@ -0,0 +1,462 @@
+"""
+Local stand-in for api.capsulecrm.com used by the benchmarks.
+
+Serves generated records with the same shape as the CapsuleCRM v2 API over
+plain HTTP/1.1 with keep-alive, so client-side costs (connection setup, JSON
+decoding, model validation) can be measured without touching the real API.
+"""
+
+import sys
+import json
+import hmac
+import hashlib
+import time
+import threading
+import urllib.request
+import urllib.error
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def make_party(i: int) -> dict:
+    """Build a party record shaped like a CapsuleCRM API response."""
+    base = {
+        "id": i,
+        "createdAt": "2024-01-15T09:30:00Z",
+        "updatedAt": "2025-06-01T12:00:00Z",
+        "lastContactedAt": None,
+        "about": None,
+        "pictureURL": "https://capsulecrm.com/theme/default/images/person_avatar_70.png",
+        "addresses": [{"id": i * 10, "type": "Office", "city": ["Zurich", "Berlin", "London", "New York"][i % 4],
+                       "country": "Switzerland", "street": f"{i} Main Street", "state": None, "zip": "8000"}],
+        "phoneNumbers": [{"id": i * 10 + 1, "type": "Work", "number": f"+41 44 {i % 1000:03d} {i % 100:02d} {i % 97:02d}"}],
+        "websites": [],
+        "emailAddresses": [{"id": i * 10 + 2, "type": "Work", "address": f"contact{i}@example{i % 50}.com"}],
+        "tags": [],
+        "fields": [],
+        "owner": {"id": 1 + i % 3, "username": f"user{1 + i % 3}", "name": f"User {1 + i % 3}"},
+        "team": None,
+        "missingImportantFields": False,
+    }
+    if i % 3 == 0:
+        base.update({"type": "organisation", "name": f"Organisation {i} AG"})
+    else:
+        base.update({
+            "type": "person",
+            "firstName": ["Anna", "Peter", "Maria", "John", "Lena"][i % 5],
+            "lastName": f"Example{i}",
+            "title": None,
+            "jobTitle": "Manager",
+            "organisation": {"id": i - i % 3, "name": f"Organisation {i - i % 3} AG", "pictureURL": None},
+        })
+    return base
+
+
+def make_opportunity(i: int) -> dict:
+    """Build an opportunity record shaped like a CapsuleCRM API response."""
+    basis = ["FIXED", "MONTH", "YEAR", "QUARTER"][i % 4]
+    return {
+        "id": i,
+        "name": f"Opportunity {i}",
+        "description": None,
+        "party": {"id": 1 + i % 1000, "type": "organisation", "name": f"Organisation {1 + i % 1000} AG"},
+        "milestone": {"id": 1 + i % 5, "name": f"Milestone {1 + i % 5}"},
+        "value": {"amount": float(1000 + (i * 37) % 9000), "currency": ["EUR", "USD", "CHF"][i % 3]},
+        "probability": (i * 13) % 101,
+        "durationBasis": basis,
+        "duration": None if basis == "FIXED" else 1 + i % 12,
+        "expectedCloseOn": f"2025-{1 + i % 12:02d}-15",
+        "owner": {"id": 1 + i % 3, "username": f"user{1 + i % 3}", "name": f"User {1 + i % 3}"},
+        "team": None,
+        "createdAt": "2024-01-15T09:30:00Z",
+        "updatedAt": "2025-06-01T12:00:00Z",
+        "closedOn": None,
+        "lostReason": None,
+        "tags": [],
+        "fields": [],
+    }
+
+
+def make_task(i: int) -> dict:
+    """Build a task record shaped like a CapsuleCRM API response."""
+    return {
+        "id": i,
+        "description": f"Follow up #{i}",
+        "detail": None,
+        "dueOn": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        "dueTime": None,
+        "status": "OPEN",
+        "category": {"id": 1 + i % 4, "name": ["Call", "Email", "Meeting", "Follow-up"][i % 4], "colour": "#fb8c00"},
+        "party": make_party(1 + i % 1000),
+        "opportunity": None,
+        "owner": {"id": 1 + i % 3, "username": f"user{1 + i % 3}", "name": f"User {1 + i % 3}"},
+        "createdAt": "2024-01-15T09:30:00Z",
+        "updatedAt": "2025-06-01T12:00:00Z",
+        "completedAt": None,
+        "hasTrack": False,
+        "repeat": None,
+    }
+
+
+def make_milestone(i: int) -> dict:
+    """Build a milestone record shaped like a CapsuleCRM API response."""
+    return {
+        "id": i,
+        "name": f"Milestone {i}",
+        "description": None,
+        "complete": i == 5,
+        "probability": min(100, i * 20),
+        "pipeline": {"id": 1, "name": "Sales"},
+        "daysUntilStale": 30,
+        "createdAt": "2024-01-01T00:00:00Z",
+        "updatedAt": "2024-01-01T00:00:00Z",
+    }
+
+
+def make_pipeline(i: int) -> dict:
+    """Build a pipeline record shaped like a CapsuleCRM API response."""
+    return {"id": i, "name": ["Sales", "Renewals"][(i - 1) % 2], "description": None,
+            "createdAt": "2024-01-01T00:00:00Z", "updatedAt": "2024-01-01T00:00:00Z"}
+
+
+def make_category(i: int) -> dict:
+    """Build a task category record shaped like a CapsuleCRM API response."""
+    return {"id": i, "name": ["Call", "Email", "Meeting", "Follow-up"][(i - 1) % 4], "colour": "#fb8c00"}
+
+
+def make_user(i: int) -> dict:
+    """Build a user record shaped like a CapsuleCRM API response."""
+    return {"id": i, "username": f"user{i}", "name": f"User {i}", "timezone": "Europe/Zurich"}
+
+
+FACTORIES = {
+    "parties": ("party", make_party),
+    "opportunities": ("opportunity", make_opportunity),
+    "tasks": ("task", make_task),
+    "milestones": ("milestone", make_milestone),
+    "pipelines": ("pipeline", make_pipeline),
+    "categories": ("category", make_category),
+    "users": ("user", make_user),
+}
+
+# Sub-resources of a party: (entity listed, field linking its records to the party)
+SUB_RESOURCES = {
+    "people": ("parties", "organisation"),
+    "opportunities": ("opportunities", "party"),
+}
+
+# REST hook event type prefix -> entity
+HOOK_ENTITIES = {"party": "parties", "opportunity": "opportunities", "task": "tasks"}
+
+
+def post_hook(url: str, events, secret: Optional[str] = None) -> int:
+    """POST a REST hook event (or a list of them) to a webhook receiver, signed with secret if given; returns the status."""
+    body = json.dumps(events).encode()
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Capsule-Signature"] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers, method="POST")) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _field_values(record: dict, field: str) -> list:
+    """Values a filter condition on `field` is compared against."""
+    def ref(key):
+        value = record.get(key)
+        return [str(value.get("id")), value.get("name"), value.get("username")] if isinstance(value, dict) else []
+
+    if field == "city":
+        return [a.get("city") for a in record.get("addresses", [])]
+    if field == "email":
+        return [e.get("address") for e in record.get("emailAddresses", [])]
+    if field == "name" and "name" not in record:
+        return [f"{record.get('firstName')} {record.get('lastName')}"]
+    if field in ("owner", "milestone", "category", "team", "party"):
+        return ref(field)
+    if field == "addedOn":
+        return [record.get("createdAt", "")[:10]]
+    if field == "updatedOn":
+        return [record.get("updatedAt", "")[:10]]
+    if field == "tag":
+        return [t.get("name") for t in record.get("tags", [])]
+    value = record.get(field)
+    return [] if value is None else [str(value)]
+
+
+def _matches(record: dict, condition: dict) -> bool:
+    """Evaluate the common filter operators; unsupported operators match everything."""
+    values = [str(v).lower() for v in _field_values(record, condition["field"]) if v is not None]
+    target = str(condition["value"]).lower()
+    operator = condition["operator"]
+    tests = {
+        "is": lambda v: v == target,
+        "contains": lambda v: target in v,
+        "starts with": lambda v: v.startswith(target),
+        "ends with": lambda v: v.endswith(target),
+        "is after": lambda v: v[:10] > target[:10],
+        "is before": lambda v: v[:10] < target[:10],
+    }
+    if operator == "is not":
+        return not any(v == target for v in values)
+    if operator not in tests:
+        return True
+    return any(tests[operator](v) for v in values)
+
+
+class MockCapsule:
+    """
+    A threaded HTTP server emulating the subset of the CapsuleCRM API used by this project.
+
+    Args:
+        counts: Number of records available per entity.
+        latency: Artificial server-side delay per request in seconds.
+        rate_limit: Requests allowed per `rate_window` seconds; once used up, requests
+            are answered with 429 and Retry-After. Like the real API, X-RateLimit-*
+            headers are always sent; the default quota is large enough to never pace.
+        rate_window: Length of the rate limit window in seconds.
+        throttle_every: Answer every n-th request with 429 and Retry-After: 0 regardless
+            of the quota, as a server shedding load would (0 never does).
+        etags: Send ETags on single-record responses and answer a matching
+            If-None-Match with 304 Not Modified.
+        list_etags: Do the same for lists and pages of records.
+    """
+
+    def __init__(self, counts: dict = None, latency: float = 0.0, rate_limit: int = 1_000_000, rate_window: float = 60.0, etags: bool = True, throttle_every: int = 0, list_etags: bool = False):
+        self.counts = {"parties": 1000, "opportunities": 1000, "tasks": 1000, "milestones": 5,
+                       "pipelines": 2, "categories": 4, "users": 3}
+        self.counts.update(counts or {})
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.etags = etags
+        self.list_etags = list_etags
+        self.throttle_every = throttle_every
+        self.not_modified = 0
+        self.rate_used = 0
+        self.rate_reset = time.time() + rate_window
+        self.throttled = 0
+        self._rate_lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        # Requests per access token (the Authorization header's bearer token)
+        self.tokens = Counter()
+        self.last_request = None
+        self.overrides = {}
+        self._generated = {}
+        self.deleted = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def start(self) -> "MockCapsule":
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                mock.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch()
+
+            def do_POST(self):
+                self._dispatch()
+
+            def do_PUT(self):
+                self._dispatch()
+
+            def _dispatch(self):
+                mock.requests += 1
+                mock.tokens[self.headers.get("Authorization", "").removeprefix("Bearer ")] += 1
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if len(raw) < length:
+                    return  # Client dropped the connection before sending the body (cancelled prefetch)
+                body = json.loads(raw) if length else None
+                if mock.latency:
+                    time.sleep(mock.latency)
+                url = urlparse(self.path)
+                limited, headers = mock.check_rate_limit()
+                if limited:
+                    status, payload = 429, {"message": "Rate limit exceeded"}
+                else:
+                    status, payload, extra = mock.handle(self.command, url.path, parse_qs(url.query), body)
+                    headers.update(extra)
+                data = json.dumps(payload).encode()
+                single = len(payload) == 1 and not url.query
+                if mock.etags and self.command == "GET" and status == 200 and (single or mock.list_etags):
+                    etag = '"' + hashlib.md5(data).hexdigest() + '"'
+                    headers["ETag"] = etag
+                    if self.headers.get("If-None-Match") == etag:
+                        mock.not_modified += 1
+                        self.send_response(304)
+                        for key, value in headers.items():
+                            self.send_header(key, value)
+                        self.end_headers()
+                        return
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        class Server(ThreadingHTTPServer):
+            # The default backlog of 5 drops SYNs when many clients connect at once
+            request_queue_size = 128
+
+            def handle_error(self, request, client_address):
+                # Clients cancelling prefetched pages drop connections mid-response
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockCapsule":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def check_rate_limit(self) -> tuple:
+        """Count a request against the quota and return (limited, rate limit headers)."""
+        with self._rate_lock:
+            now = time.time()
+            if now >= self.rate_reset:
+                self.rate_used = 0
+                self.rate_reset = now + self.rate_window
+            limited = self.rate_used >= self.rate_limit
+            shed = self.throttle_every and (self.rate_used + self.throttled + 1) % self.throttle_every == 0
+            if limited or shed:
+                self.throttled += 1
+            else:
+                self.rate_used += 1
+            headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.rate_limit - self.rate_used),
+                "X-RateLimit-Reset": str(int(self.rate_reset)),
+            }
+            if limited:
+                headers["Retry-After"] = str(max(1, int(self.rate_reset - now + 0.999)))
+            elif shed:
+                headers["Retry-After"] = "0"
+            return bool(limited or shed), headers
+
+    def record(self, entity: str, i: int) -> Optional[dict]:
+        """Return record i of an entity, including changes made with modify(), or None if it does not exist."""
+        if not 1 <= i <= self.counts[entity] or i in self.deleted.get(entity, {}):
+            return None
+        record = self._generated.get((entity, i))
+        if record is None:
+            record = self._generated[(entity, i)] = FACTORIES[entity][1](i)
+        changes = self.overrides.get((entity, i))
+        return {**record, **changes} if changes else record
+
+    def modify(self, entity: str, i: int, **fields):
+        """Change fields of a record and bump its updatedAt, as an edit in CapsuleCRM would."""
+        changes = self.overrides.setdefault((entity, i), {})
+        changes.update(fields)
+        changes["updatedAt"] = _now()
+
+    def delete(self, entity: str, i: int):
+        """Delete a record; it is reported by /<entity>/deleted from then on."""
+        self.deleted.setdefault(entity, {})[i] = _now()
+
+    def hook_event(self, event: str, i: int) -> dict:
+        """The REST hook event CapsuleCRM would post for record i, e.g. hook_event('party/updated', 3) after modify()."""
+        entity = HOOK_ENTITIES[event.split("/")[0]]
+        record = {"id": i} if event.endswith("/deleted") else self.record(entity, i)
+        return {"event": event, "payload": [record]}
+
+    def handle(self, method: str, path: str, query: dict, body) -> tuple:
+        """Route a request and return (status, payload, extra headers)."""
+        self.last_request = (method, path, query, body)
+        parts = [p for p in path.split("/") if p][2:]  # strip api/v2
+        if not parts or parts[0] not in FACTORIES:
+            return 404, {"message": "Not found"}, {}
+        entity = parts[0]
+        singular, factory = FACTORIES[entity]
+        count = self.counts[entity]
+
+        if method in ("POST", "PUT") and (len(parts) == 1 or parts[1].isdigit()):
+            if method == "PUT" and self.record(entity, int(parts[1])) is None:
+                return 404, {"message": "Could not find resource"}, {}
+            record = dict((body or {}).get(singular, {}))
+            record.setdefault("id", int(parts[1]) if len(parts) > 1 else count + 1)
+            return (201 if method == "POST" else 200), {singular: record}, {}
+
+        since = query.get("since", [None])[0]
+        if len(parts) == 2 and parts[1] == "deleted":
+            deleted = [{"id": i, "deletedAt": at} for i, at in sorted(self.deleted.get(entity, {}).items())
+                       if since is None or at >= since]
+            return 200, {entity: deleted}, {}
+
+        if len(parts) == 3 and entity == "parties" and parts[1].isdigit() and parts[2] in SUB_RESOURCES:
+            # People of an organisation, or opportunities of a party
+            party_id = int(parts[1])
+            if self.record("parties", party_id) is None:
+                return 404, {"message": "Could not find resource"}, {}
+            child, link = SUB_RESOURCES[parts[2]]
+            page = int(query.get("page", ["1"])[0])
+            per_page = min(int(query.get("perPage", ["50"])[0]), 100)
+            matching = [record for record in (self.record(child, i) for i in range(1, self.counts[child] + 1))
+                        if record is not None and (record.get(link) or {}).get("id") == party_id]
+            return 200, {child: matching[(page - 1) * per_page:page * per_page]}, {}
+
+        if len(parts) == 2 and parts[1] not in ("search", "filters"):
+            ids = [int(x) for x in parts[1].split(",")]
+            found = [record for record in (self.record(entity, i) for i in ids) if record is not None]
+            if not found:
+                return 404, {"message": "Could not find resource"}, {}
+            if len(ids) == 1:
+                return 200, {singular: found[0]}, {}
+            return 200, {entity: found}, {}
+
+        page = int(query.get("page", ["1"])[0])
+        per_page = min(int(query.get("perPage", ["50"])[0]), 100)
+        conditions = (body or {}).get("filter", {}).get("conditions", []) if parts[1:2] == ["filters"] else []
+        if since is None and not conditions and not self.overrides and not self.deleted:
+            start = (page - 1) * per_page + 1
+            stop = min(start + per_page, count + 1)
+            records = [factory(i) for i in range(start, stop)]
+            more = stop <= count
+        else:
+            matching = [record for record in (self.record(entity, i) for i in range(1, count + 1))
+                        if record is not None and (since is None or record["updatedAt"] >= since)
+                        and all(_matches(record, condition) for condition in conditions)]
+            records = matching[(page - 1) * per_page:page * per_page]
+            more = page * per_page < len(matching)
+        headers = {}
+        if more:
+            headers["Link"] = f'<{self.base_url}/{entity}?page={page + 1}&perPage={per_page}>; rel="next"'
+        return 200, {entity: records}, headers
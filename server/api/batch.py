@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+from .errors import CapsuleAPIError
+from .utils import request, request_async
+from .entity_cache import get_entity_cache
+from .projection import Projection, project
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# CapsuleCRM accepts at most this many comma-separated ids in one GET
+MAX_IDS_PER_REQUEST = 10
+
+
+def _unique_ids(ids: Iterable[int]) -> List[int]:
+    return list(dict.fromkeys(int(i) for i in ids))
+
+
+def _chunks(ids: List[int]) -> List[List[int]]:
+    return [ids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(ids), MAX_IDS_PER_REQUEST)]
+
+
+def _records(data: dict, entity: str, record_key: str) -> List[dict]:
+    # A single id is answered like a plain GET, several ids with a list
+    if record_key in data:
+        return [data[record_key]]
+    return data.get(entity, [])
+
+
+def _result(entity: str, ids: List[int], found: dict, projection: Optional[Projection]) -> dict:
+    return {
+        entity: project([found[i] for i in ids if i in found], projection),
+        "missing": [i for i in ids if i not in found],
+    }
+
+
+def _split(entity: str, e: CapsuleAPIError, chunk: List[int]) -> bool:
+    """Whether a failed chunk should be retried one id at a time to find the missing ones."""
+    if e.status_code != 404:
+        raise e
+    if len(chunk) == 1:
+        return False
+    logger.debug(f"Some of {entity} {chunk} do not exist, fetching them one by one")
+    return True
+
+
+def fetch_many(entity: str, record_key: str, ids: Iterable[int], parse_record: Callable[[dict], Any],
+               projection: Optional[Projection] = None) -> dict:
+    """
+    Fetch several records by id with as few requests as possible.
+
+    Records still fresh in the entity cache are not requested. The rest are fetched
+    with comma-separated ids, MAX_IDS_PER_REQUEST at a time, with chunks in flight
+    concurrently.
+
+    Args:
+        entity: API collection name, e.g. 'parties'
+        record_key: Key of a single record in the response body, e.g. 'party'
+        ids: Record ids; duplicates are fetched once
+        parse_record: Turns one record from the response into the value to return
+        projection: Fields to return (see api.projection); applied to the cached values
+
+    Returns:
+        {entity: values in the order of ids, "missing": ids that do not exist}
+    """
+    ids = _unique_ids(ids)
+    cache = get_entity_cache()
+    found = {}
+    wanted = []
+    for entity_id in ids:
+        hit, value = cache.cached(entity, entity_id)
+        if hit:
+            found[entity_id] = value
+        else:
+            wanted.append(entity_id)
+
+    def fetch(chunk: List[int]) -> List[dict]:
+        try:
+            return _records(request("GET", f"/{entity}/{','.join(map(str, chunk))}"), entity, record_key)
+        except CapsuleAPIError as e:
+            if not _split(entity, e, chunk):
+                return []
+            return [record for entity_id in chunk for record in fetch([entity_id])]
+
+    chunks = _chunks(wanted)
+    if len(chunks) <= 1:
+        results = [fetch(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), 8), thread_name_prefix="capsulecrm-batch") as executor:
+            # Each chunk runs in a copy of this context so its request spans nest under the caller's
+            futures = [executor.submit(contextvars.copy_context().run, fetch, chunk) for chunk in chunks]
+            results = [future.result() for future in futures]
+    for records in results:
+        for record in records:
+            value = cache.reconcile(entity, record, parse_record)
+            if value is not None:
+                found[record["id"]] = value
+    return _result(entity, ids, found, projection)
+
+
+async def fetch_many_async(entity: str, record_key: str, ids: Iterable[int], parse_record: Callable[[dict], Any],
+                           projection: Optional[Projection] = None) -> dict:
+    """Async variant of fetch_many()."""
+    ids = _unique_ids(ids)
+    cache = get_entity_cache()
+    found = {}
+    wanted = []
+    for entity_id in ids:
+        hit, value = cache.cached(entity, entity_id)
+        if hit:
+            found[entity_id] = value
+        else:
+            wanted.append(entity_id)
+
+    async def fetch(chunk: List[int]) -> List[dict]:
+        try:
+            return _records(await request_async("GET", f"/{entity}/{','.join(map(str, chunk))}"), entity, record_key)
+        except CapsuleAPIError as e:
+            if not _split(entity, e, chunk):
+                return []
+            singles = await asyncio.gather(*(fetch([entity_id]) for entity_id in chunk))
+            return [record for records in singles for record in records]
+
+    for records in await asyncio.gather(*(fetch(chunk) for chunk in _chunks(wanted))):
+        for record in records:
+            value = cache.reconcile(entity, record, parse_record)
+            if value is not None:
+                found[record["id"]] = value
+    return _result(entity, ids, found, projection)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import threading
+import contextvars
+from typing import Any, Awaitable, Callable, List, Optional
+from .errors import CapsuleAPIError
+from .config import env_int
+from .utils import count_retries
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Operations of one bulk call in flight at once; every request still goes through the shared rate limiter
+DEFAULT_CONCURRENCY = env_int("CAPSULECRM_BULK_CONCURRENCY", 8)
+
+
+class _Results:
+    """Per-item outcomes of a bulk call, in input order."""
+
+    def __init__(self, size: int, stop_on_error: bool):
+        self.items: List[Optional[dict]] = [None] * size
+        self.stop_on_error = stop_on_error
+        self.stopped = False
+
+    def record(self, index: int, retries: list, result=None, error: Optional[Exception] = None):
+        if error is None:
+            self.items[index] = {
+                "index": index,
+                "status": "retried" if retries[0] else "success",
+                "result": result,
+            }
+            if retries[0]:
+                self.items[index]["retries"] = retries[0]
+            return
+        detail = error.detail if isinstance(error, CapsuleAPIError) else str(error)
+        logger.warning(f"Bulk item {index} failed: {detail}")
+        self.items[index] = {
+            "index": index,
+            "status": "error",
+            "error": detail,
+            "status_code": getattr(error, "status_code", None),
+        }
+        if self.stop_on_error:
+            self.stopped = True
+
+    def report(self) -> dict:
+        items = [item or {"index": index, "status": "skipped"} for index, item in enumerate(self.items)]
+        counts = {status: 0 for status in ("success", "retried", "error", "skipped")}
+        for item in items:
+            counts[item["status"]] += 1
+        return {"total": len(items), **counts, "items": items}
+
+
+def run_bulk(operation: Callable[[Any], Any], items: List[Any], *, stop_on_error: bool = False,
+             concurrency: Optional[int] = None) -> dict:
+    """
+    Apply an API operation to every item with a bounded pool of worker threads.
+
+    Failures are reported per item instead of aborting the whole call. With
+    stop_on_error, no new item is started after the first failure and the items
+    never attempted are reported as skipped.
+
+    Args:
+        operation: Called with one item; performs the request(s) and returns the result
+        items: Inputs, one per operation
+        stop_on_error: Stop starting new items after the first failure
+        concurrency: Operations in flight at once (default: CAPSULECRM_BULK_CONCURRENCY)
+
+    Returns:
+        Counts per status (success, retried, error, skipped) and one entry per item in input order
+    """
+    results = _Results(len(items), stop_on_error)
+    pending = iter(range(len(items)))
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            with lock:
+                if results.stopped:
+                    return
+                index = next(pending, None)
+            if index is None:
+                return
+            retries = count_retries()
+            try:
+                results.record(index, retries, result=operation(items[index]))
+            except Exception as e:
+                with lock:
+                    results.record(index, retries, error=e)
+
+    workers = [threading.Thread(target=contextvars.copy_context().run, args=(work,), name=f"capsulecrm-bulk-{n}", daemon=True)
+               for n in range(max(1, min(concurrency or DEFAULT_CONCURRENCY, len(items))))]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results.report()
+
+
+async def run_bulk_async(operation: Callable[[Any], Awaitable[Any]], items: List[Any], *, stop_on_error: bool = False,
+                         concurrency: Optional[int] = None) -> dict:
+    """Async variant of run_bulk(); workers are tasks on the running event loop."""
+    results = _Results(len(items), stop_on_error)
+    pending = iter(range(len(items)))
+
+    async def work():
+        while not results.stopped:
+            index = next(pending, None)
+            if index is None:
+                return
+            retries = count_retries()
+            try:
+                results.record(index, retries, result=await operation(items[index]))
+            except Exception as e:
+                results.record(index, retries, error=e)
+
+    await asyncio.gather(*(work() for _ in range(max(1, min(concurrency or DEFAULT_CONCURRENCY, len(items))))))
+    return results.report()
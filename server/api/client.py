@@ -0,0 +1,173 @@
+import weakref
+import asyncio
+import logging
+import threading
+import importlib.util
+import httpx
+from typing import Optional
+from .config import env_int, env_float, env_bool
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+
+class ClientManager:
+    """
+    Owns the long-lived, keep-alive HTTP connection pool used for CapsuleCRM API calls.
+
+    The underlying client is created lazily on first use and reused by every request,
+    so DNS, TCP and TLS setup is paid once per connection instead of once per call.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        *,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 30.0,
+        verify=True,
+    ):
+        self.base_url = base_url
+        self.headers = dict(headers)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.timeout = timeout
+        # An ssl.SSLContext here is shared rather than loading the CA bundle for every client
+        self.verify = verify
+        self._client: Optional[httpx.Client] = None
+        # One async client per event loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._closing = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, base_url: str, headers: dict, verify=True) -> "ClientManager":
+        """
+        Build a manager using pool settings from the environment.
+
+        Environment variables:
+            CAPSULECRM_MAX_CONNECTIONS: Maximum number of concurrent connections (default: 20).
+            CAPSULECRM_MAX_KEEPALIVE: Maximum number of idle keep-alive connections (default: 10).
+            CAPSULECRM_KEEPALIVE_EXPIRY: Seconds an idle connection is kept open (default: 30).
+            CAPSULECRM_HTTP2: Set to 1 to negotiate HTTP/2 (requires the 'h2' package).
+        """
+        return cls(
+            base_url,
+            headers,
+            max_connections=env_int("CAPSULECRM_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=env_int("CAPSULECRM_MAX_KEEPALIVE", 10),
+            keepalive_expiry=env_float("CAPSULECRM_KEEPALIVE_EXPIRY", 30.0),
+            http2=env_bool("CAPSULECRM_HTTP2"),
+            verify=verify,
+        )
+
+    @property
+    def client(self) -> httpx.Client:
+        """The shared synchronous client, created on first access."""
+        client = self._client
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._client
+                if client is None or client.is_closed:
+                    logger.debug(f"Opening HTTP connection pool to {self.base_url} (http2={self.http2})")
+                    client = httpx.Client(
+                        base_url=self.base_url,
+                        headers=self.headers,
+                        limits=self.limits,
+                        http2=self.http2,
+                        timeout=self.timeout,
+                        verify=self.verify,
+                    )
+                    self._client = client
+        return client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        The shared asynchronous client for the running event loop, created on first access.
+
+        Pooled async connections belong to the loop that opened them, so each event loop
+        gets its own client, kept until the loop is closed.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._async_clients.get(loop)
+                if client is None or client.is_closed:
+                    # A client's connections refer to its loop, so entries of closed loops are not dropped by themselves
+                    for closed in [other for other in self._async_clients if other.is_closed()]:
+                        logger.debug("Dropping the async HTTP connection pool of a closed event loop")
+                        del self._async_clients[closed]
+                    logger.debug(f"Opening async HTTP connection pool to {self.base_url} (http2={self.http2})")
+                    client = httpx.AsyncClient(
+                        base_url=self.base_url,
+                        headers=self.headers,
+                        limits=self.limits,
+                        http2=self.http2,
+                        timeout=self.timeout,
+                        verify=self.verify,
+                    )
+                    self._async_clients[loop] = client
+        return client
+
+    def close(self):
+        """Close all synchronous pooled connections. The pool is reopened on next use."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            logger.debug("Closing HTTP connection pool")
+            client.close()
+
+    def _take_async_clients(self) -> list:
+        with self._lock:
+            clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        return [(loop, client) for loop, client in clients if not client.is_closed]
+
+    def _close_elsewhere(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        """Close an async client on the event loop it belongs to, from another loop or thread."""
+        if loop.is_closed():
+            # Nothing can be awaited on a closed loop; its sockets are released with the client
+            logger.debug("Dropping the async HTTP connection pool of a closed event loop")
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            # Kept so the task is not garbage collected before it runs
+            task = loop.create_task(client.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self):
+        """Close the asynchronous pools: the running loop's here, those of other event loops on their own loop."""
+        running = asyncio.get_running_loop()
+        for loop, client in self._take_async_clients():
+            if loop is running:
+                logger.debug("Closing async HTTP connection pool")
+                await client.aclose()
+            else:
+                self._close_elsewhere(loop, client)
+
+    def discard(self):
+        """
+        Close every pool from any thread, for a manager that will not be used again. Each
+        async pool is closed on the event loop it belongs to.
+        """
+        self.close()
+        for loop, client in self._take_async_clients():
+            self._close_elsewhere(loop, client)
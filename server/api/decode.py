@@ -0,0 +1,110 @@
+import types
+import logging
+from typing import Annotated, Callable, Dict, Optional, Type, TypeVar, Union, get_args, get_origin
+from pydantic import BaseModel
+from .config import env_bool
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+M = TypeVar("M", bound=BaseModel)
+
+# Build records read from the API as they are instead of validating them
+TRUSTED_DECODE = env_bool("CAPSULECRM_TRUSTED_DECODE")
+
+_plans: Dict[type, "_Plan"] = {}
+
+_set = object.__setattr__
+
+
+def _model_union(models: tuple) -> Optional[Callable]:
+    """Pick the member of a union of models by the record's 'type' (e.g. person/organisation)."""
+    by_type = {}
+    for model in models:
+        field = model.model_fields.get("type")
+        if field is None or not isinstance(field.default, str):
+            return None
+        by_type[field.default] = model
+
+    def convert(value):
+        model = by_type.get(value.get("type")) if isinstance(value, dict) else None
+        return construct(model, value) if model is not None else value
+    return convert
+
+
+def _converter(annotation) -> Optional[Callable]:
+    """How to build a value of the given annotation from JSON, or None to keep it as is."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return lambda value: construct(annotation, value) if isinstance(value, dict) else value
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        return _converter(get_args(annotation)[0])
+    args = [get_args(arg)[0] if get_origin(arg) is Annotated else arg
+            for arg in get_args(annotation) if arg is not type(None)]
+    if origin in (Union, types.UnionType):
+        if len(args) == 1:
+            return _converter(args[0])
+        if all(isinstance(arg, type) and issubclass(arg, BaseModel) for arg in args):
+            return _model_union(tuple(args))
+        return None
+    if origin is list and args:
+        item = _converter(args[0])
+        if item is None:
+            return None
+        return lambda value: [item(v) for v in value] if isinstance(value, list) else value
+    return None
+
+
+class _Plan:
+    __slots__ = ("fields", "nested", "defaults")
+
+    def __init__(self, model: type):
+        self.fields = frozenset(model.model_fields)
+        self.nested = [(name, convert) for name, field in model.model_fields.items()
+                       if (convert := _converter(field.annotation)) is not None]
+        self.defaults = {name: field.get_default(call_default_factory=True)
+                         for name, field in model.model_fields.items() if not field.is_required()}
+
+
+def _plan(model: type) -> _Plan:
+    plan = _plans.get(model)
+    if plan is None:
+        plan = _plans[model] = _Plan(model)
+    return plan
+
+
+def construct(model: Type[M], data: dict) -> M:
+    """
+    Build a model from a trusted API record without validating it (opt-in, see
+    decode()).
+
+    Nested models, lists of models and unions of models discriminated by their
+    'type' field (Party) are built the same way, so the result dumps and serializes
+    like a validated model. Values are not coerced and keys the model does not
+    declare are dropped, as validation would.
+    """
+    plan = _plan(model)
+    fields_set = plan.fields & data.keys()
+    values = plan.defaults.copy()
+    if len(fields_set) == len(data):
+        values.update(data)
+    else:
+        for key in fields_set:
+            values[key] = data[key]
+    for key, convert in plan.nested:
+        value = values[key] if key in fields_set else None
+        if value is not None:
+            values[key] = convert(value)
+    # What BaseModel.model_construct does, without its per-field bookkeeping
+    instance = model.__new__(model)
+    _set(instance, "__dict__", values)
+    _set(instance, "__pydantic_fields_set__", set(fields_set))
+    _set(instance, "__pydantic_extra__", None)
+    _set(instance, "__pydantic_private__", None)
+    return instance
+
+
+def decode(model: Type[M], data: dict) -> M:
+    """Turn an API record into a model: validated, or constructed as is with CAPSULECRM_TRUSTED_DECODE."""
+    if TRUSTED_DECODE:
+        return construct(model, data)
+    return model(**data)
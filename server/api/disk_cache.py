@@ -0,0 +1,177 @@
+import os
+import json
+import zlib
+import time
+import logging
+import sqlite3
+import threading
+from typing import Optional
+from .config import env_int
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+
+class CachedResponse:
+    """A GET response read back from the disk cache."""
+
+    __slots__ = ("body", "etag", "date", "size")
+
+    def __init__(self, body: bytes, etag: Optional[str], date: Optional[str], size: int):
+        self.body = body
+        self.etag = etag
+        self.date = date
+        self.size = size
+
+    def json(self):
+        return json.loads(zlib.decompress(self.body))
+
+    def validators(self) -> dict:
+        """Headers asking the API to answer 304 Not Modified if this response is still current."""
+        if self.etag:
+            return {"If-None-Match": self.etag}
+        if self.date:
+            return {"If-Modified-Since": self.date}
+        return {}
+
+
+class DiskCache:
+    """
+    GET responses kept in a SQLite file so they outlive the server process.
+
+    Each response is stored zlib-compressed with the validators it came with (ETag,
+    and Last-Modified or Date), keyed by the account, endpoint and query parameters.
+    A restarted server sends those validators instead of downloading the response
+    again, and reads that may be stale (reference data, see only_if_cached in
+    api.utils) can be answered without any request. The file is written in WAL mode,
+    so storing a response appends to the log rather than rewriting pages in place.
+
+    The total size of the stored bodies is capped at `max_bytes`; the least recently
+    used responses are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, level: int = 6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.level = level
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.evictions = 0
+        self._create_schema()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> Optional["DiskCache"]:
+        """
+        Build the cache from the environment, or return None if it is not enabled.
+
+        Environment variables:
+            CAPSULECRM_DISK_CACHE_PATH: SQLite file to keep responses in; unset disables the cache.
+            CAPSULECRM_DISK_CACHE_BYTES: Maximum total size of the compressed responses (default: 64 MiB).
+        """
+        path = os.getenv("CAPSULECRM_DISK_CACHE_PATH")
+        if not path:
+            return None
+        return cls(path, max_bytes=env_int("CAPSULECRM_DISK_CACHE_BYTES", 64 * 1024 * 1024))
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few responses in a power cut only costs downloading them again
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, account TEXT NOT NULL, endpoint TEXT NOT NULL, body BLOB NOT NULL, "
+                "etag TEXT, date TEXT, size INTEGER NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_used_at ON responses (used_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_endpoint ON responses (account, endpoint)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The stored response for key, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT body, etag, date, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+        return CachedResponse(*row)
+
+    def touch(self, key: str, revalidated: bool = False):
+        """Record that the stored response for key was used, after the API confirmed it with 304 if `revalidated`."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+
+    def put(self, key: str, account: str, endpoint: str, content: bytes, etag: Optional[str], date: Optional[str]):
+        """Store a response body with its validators, evicting the least recently used responses over the size cap."""
+        body = zlib.compress(content, self.level)
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT LENGTH(body) FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, account, endpoint, body, etag, date, size, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, account, endpoint, body, etag, date, len(content), now, now),
+            )
+            self._bytes += len(body) - (old[0] if old else 0)
+            self.stored += 1
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        rows = self._conn.execute("SELECT key, LENGTH(body) FROM responses ORDER BY used_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._bytes <= self.max_bytes * 0.9:
+                break
+            evicted.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def invalidate(self, account: str, endpoint: Optional[str] = None) -> int:
+        """Drop an account's stored responses for one endpoint (any query parameters), or all of them; returns how many."""
+        with self._lock, self._conn:
+            where, params = ("account = ? AND endpoint = ?", (account, endpoint)) if endpoint else ("account = ?", (account,))
+            size = self._conn.execute(f"SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses WHERE {where}", params).fetchone()[0]
+            removed = self._conn.execute(f"DELETE FROM responses WHERE {where}", params).rowcount
+            self._bytes -= size
+        return removed
+
+    def wipe(self) -> int:
+        """Delete every stored response and shrink the file; returns how many were deleted."""
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute("DELETE FROM responses").rowcount
+                self._bytes = 0
+            self._conn.execute("VACUUM")
+        logger.info(f"Wiped {removed} responses from the disk cache")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries[0],
+            "bytes": self._bytes,
+            "uncompressed_bytes": entries[1],
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "stored": self.stored,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,259 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from .config import env_int, env_float
+from .utils import request_conditional, request_conditional_async
+from .tenants import current_tenant
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+
+class _Entry:
+    __slots__ = ("value", "etag", "updated_at", "size", "checked_at")
+
+    def __init__(self, value, etag: Optional[str], updated_at: Optional[str], size: int):
+        self.value = value
+        self.etag = etag
+        self.updated_at = updated_at
+        self.size = size
+        self.checked_at = time.monotonic()
+
+
+class EntityCache:
+    """
+    Bounded LRU cache of parsed parties, opportunities and tasks keyed by (entity, id).
+
+    An entry younger than `ttl` seconds is returned without contacting the API. Older
+    entries are revalidated: with If-None-Match when the API sent an ETag, otherwise by
+    comparing the updatedAt of the fresh record with the cached one. Either way an
+    unchanged record skips model validation and keeps the already parsed value.
+
+    The cache is bounded both by number of entries and by the total size of the
+    response bodies it was built from; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 8 * 1024 * 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "EntityCache":
+        """
+        Build a cache configured from the environment.
+
+        Environment variables:
+            CAPSULECRM_ENTITY_CACHE_SIZE: Maximum number of cached records (0 disables the cache).
+            CAPSULECRM_ENTITY_CACHE_BYTES: Maximum total size of cached records in bytes.
+            CAPSULECRM_ENTITY_CACHE_TTL: Seconds a record is served without revalidation.
+        """
+        return cls(
+            max_entries=env_int("CAPSULECRM_ENTITY_CACHE_SIZE", 1000),
+            max_bytes=env_int("CAPSULECRM_ENTITY_CACHE_BYTES", 8 * 1024 * 1024),
+            ttl=env_float("CAPSULECRM_ENTITY_CACHE_TTL", 30.0),
+        )
+
+    @classmethod
+    def for_tenant(cls) -> "EntityCache":
+        """
+        Build the smaller cache of an account other than the process's own.
+
+        Environment variables:
+            CAPSULECRM_TENANT_CACHE_BYTES: Maximum total size of one such account's cached records in bytes (default: 1 MiB).
+        """
+        cache = cls.from_env()
+        cache.max_bytes = min(cache.max_bytes, env_int("CAPSULECRM_TENANT_CACHE_BYTES", 1024 * 1024))
+        return cache
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def _lookup(self, key: tuple) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _touch(self, entry: _Entry, etag: Optional[str]):
+        with self._lock:
+            entry.checked_at = time.monotonic()
+            if etag:
+                entry.etag = etag
+            self.revalidated += 1
+
+    def store(self, entity: str, entity_id: int, value, *, etag: Optional[str] = None,
+              updated_at: Optional[str] = None, size: int = 0):
+        """Cache a parsed record, evicting least recently used entries to stay within bounds."""
+        if not self.enabled or value is None or size > self.max_bytes:
+            return
+        key = (entity, int(entity_id))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = _Entry(value, etag, updated_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def store_record(self, entity: str, record: dict, value):
+        """Cache a record returned by a create or update call, which carries no ETag."""
+        if "id" not in record:
+            return
+        if record.get("updatedAt") is None:
+            # Not a complete record; make the next read go to the API instead
+            self.invalidate(entity, record["id"])
+        else:
+            self.store(entity, record["id"], value, updated_at=record.get("updatedAt"),
+                       size=len(json.dumps(record, default=str)))
+
+    def refresh(self, entity: str, record: dict, parse_record: Callable[[dict], Any]) -> bool:
+        """
+        Replace a cached record with a newer version received without asking for it (a
+        webhook event). Records that are not cached are left out, and versions older
+        than the cached one are ignored. Returns whether the cache changed.
+        """
+        key = (entity, int(record["id"]))
+        updated_at = record.get("updatedAt")
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or updated_at is None or (entry.updated_at or "") > updated_at:
+            return False
+        self.store(entity, record["id"], parse_record(record), updated_at=updated_at,
+                   size=len(json.dumps(record, default=str)))
+        return True
+
+    def invalidate(self, entity: Optional[str] = None, entity_id: Optional[int] = None):
+        """Drop one record, every record of an entity, or (with no arguments) everything."""
+        with self._lock:
+            if entity is not None and entity_id is not None:
+                keys = [(entity, int(entity_id))]
+            else:
+                keys = [key for key in self._entries if entity is None or key[0] == entity]
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.revalidated) / lookups, 3) if lookups else None,
+            }
+
+    def _fresh(self, key: tuple) -> tuple:
+        """Return (entry, is_fresh) for a key."""
+        entry = self._lookup(key)
+        return entry, entry is not None and time.monotonic() - entry.checked_at < self.ttl
+
+    def _reconcile(self, key: tuple, entry: Optional[_Entry], updated_at: Optional[str], etag: Optional[str],
+                   size: int, make_value: Callable[[], Any]):
+        if entry is not None and updated_at is not None and updated_at == entry.updated_at:
+            self._touch(entry, etag)
+            return entry.value
+        self._count("misses")
+        value = make_value()
+        self.store(key[0], key[1], value, etag=etag, updated_at=updated_at, size=size)
+        return value
+
+    def _resolve(self, key: tuple, entry: Optional[_Entry], result: tuple, record_key: str, parse: Callable[[dict], Any]):
+        data, etag, size = result
+        if data is None:
+            # 304 Not Modified
+            self._touch(entry, etag)
+            return entry.value
+        updated_at = data.get(record_key, {}).get("updatedAt")
+        return self._reconcile(key, entry, updated_at, etag, size, lambda: parse(data))
+
+    def cached(self, entity: str, entity_id: int) -> tuple:
+        """Return (True, value) if the record can be served without asking the API, otherwise (False, None)."""
+        if not self.enabled:
+            return False, None
+        entry, fresh = self._fresh((entity, int(entity_id)))
+        if not fresh:
+            return False, None
+        self._count("hits")
+        return True, entry.value
+
+    def reconcile(self, entity: str, record: dict, parse_record: Callable[[dict], Any]):
+        """
+        Return the value for a record fetched without a validator (e.g. by a multi-id GET),
+        reusing the cached parsed value when its updatedAt is unchanged.
+        """
+        if not self.enabled:
+            return parse_record(record)
+        key = (entity, int(record["id"]))
+        return self._reconcile(key, self._lookup(key), record.get("updatedAt"), None,
+                               len(json.dumps(record, default=str)), lambda: parse_record(record))
+
+    def get(self, entity: str, entity_id: int, record_key: str, parse: Callable[[dict], Any]):
+        """
+        Return the parsed record for /<entity>/<entity_id>, from cache when it is still valid.
+
+        Args:
+            entity: API collection name, e.g. 'parties'
+            entity_id: Record id
+            record_key: Key of the record in the response body, e.g. 'party'
+            parse: Turns the response body into the value to return and cache
+        """
+        endpoint = f"/{entity}/{entity_id}"
+        if not self.enabled:
+            return parse(request_conditional(endpoint)[0])
+        key = (entity, int(entity_id))
+        entry, fresh = self._fresh(key)
+        if fresh:
+            self._count("hits")
+            return entry.value
+        result = request_conditional(endpoint, entry.etag if entry else None)
+        return self._resolve(key, entry, result, record_key, parse)
+
+    async def get_async(self, entity: str, entity_id: int, record_key: str, parse: Callable[[dict], Any]):
+        """Async variant of get()."""
+        endpoint = f"/{entity}/{entity_id}"
+        if not self.enabled:
+            return parse((await request_conditional_async(endpoint))[0])
+        key = (entity, int(entity_id))
+        entry, fresh = self._fresh(key)
+        if fresh:
+            self._count("hits")
+            return entry.value
+        result = await request_conditional_async(endpoint, entry.etag if entry else None)
+        return self._resolve(key, entry, result, record_key, parse)
+
+
+_entity_cache = EntityCache.from_env()
+
+
+def get_entity_cache() -> EntityCache:
+    """Get the entity cache of the account the current call works on."""
+    tenant = current_tenant()
+    return _entity_cache if tenant is None else tenant.cache("entities", EntityCache.for_tenant)
@@ -0,0 +1,15 @@
+class CapsuleAPIError(Exception):
+    """
+    A failed CapsuleCRM request, with the HTTP status code it failed with.
+
+    Has the same status_code and detail attributes as the FastAPI HTTPException it
+    replaces, so the request path needs no web framework.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    def __str__(self) -> str:
+        return f"{self.status_code}: {self.detail}"
@@ -0,0 +1,290 @@
+import os
+import re
+import csv
+import json
+import time
+import uuid
+import asyncio
+import logging
+import importlib.util
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from pydantic import BaseModel
+from .utils import no_store
+from .tenants import current_tenant
+from .parties import iter_find_parties_async
+from .opportunities import iter_find_opportunities_async
+from .tasks import iter_find_tasks_async
+from .tracing import traced
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+FORMATS = {"ndjson": ".ndjson", "csv": ".csv", "parquet": ".parquet"}
+ENTITIES = {"parties": iter_find_parties_async, "opportunities": iter_find_opportunities_async, "tasks": iter_find_tasks_async}
+
+# Embedded by default so exported parties and opportunities carry their tags and custom fields
+DEFAULT_EMBED = {"parties": "tags,fields", "opportunities": "tags,fields"}
+
+# Joins the values of a list flattened into one column
+SEPARATOR = "; "
+
+# Rows per Parquet row group, the most held in memory at once
+ROW_GROUP_SIZE = 10_000
+
+# Records between progress reports
+PROGRESS_EVERY = 100
+
+
+def export_dir() -> str:
+    """
+    Where the current account's exports are written: CAPSULECRM_EXPORT_DIR, or
+    capsulecrm-exports in the home directory. Accounts other than the process's own
+    (see api.tenants) each get a subdirectory, accounts/<key>, so they never write
+    to each other's files.
+    """
+    root = os.getenv("CAPSULECRM_EXPORT_DIR") or os.path.join(os.path.expanduser("~"), "capsulecrm-exports")
+    tenant = current_tenant()
+    return os.path.join(root, "accounts", tenant.key) if tenant is not None else root
+
+
+def _export_path(entity: str, fmt: str, filename: Optional[str], overwrite: bool) -> str:
+    """
+    A path in export_dir(). A given filename loses any directory part and gets the
+    format's extension, and must not exist unless `overwrite`; a default name is
+    numbered if the same one was used in the same second.
+    """
+    extension = FORMATS[fmt]
+    directory = export_dir()
+    os.makedirs(directory, exist_ok=True)
+    if filename:
+        name = re.sub(r"[^\w.\- ]", "_", os.path.basename(filename)).strip(". ") or entity
+        if not name.lower().endswith(extension):
+            name += extension
+        path = os.path.join(directory, name)
+        if os.path.exists(path) and not overwrite:
+            raise ValueError(f"Export file {name} already exists - choose another filename or pass overwrite=True")
+        return path
+    stem = os.path.join(directory, f"{entity}-{time.strftime('%Y%m%d-%H%M%S')}")
+    path, n = f"{stem}{extension}", 1
+    while os.path.exists(path):
+        n += 1
+        path = f"{stem}-{n}{extension}"
+    return path
+
+
+def _publish(written: str, path: str, overwrite: bool):
+    """Move a complete export into place; without `overwrite`, fail rather than replace a file created meanwhile."""
+    if overwrite:
+        os.replace(written, path)
+        return
+    try:
+        # Unlike a rename, a hard link never replaces an existing file
+        os.link(written, path)
+    except FileExistsError:
+        raise ValueError(f"Export file {os.path.basename(path)} already exists - choose another filename or pass overwrite=True")
+    except OSError:
+        # File systems without hard links
+        if os.path.exists(path):
+            raise ValueError(f"Export file {os.path.basename(path)} already exists - choose another filename or pass overwrite=True")
+        os.replace(written, path)
+        return
+    os.remove(written)
+
+
+def _as_dict(record) -> dict:
+    return record.model_dump(exclude_none=True) if isinstance(record, BaseModel) else record
+
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _format_address(address: dict) -> str:
+    town = " ".join(filter(None, [address.get("zip"), address.get("city")]))
+    return ", ".join(filter(None, [address.get("street"), town, address.get("state"), address.get("country")]))
+
+
+def flatten(record: dict) -> Dict[str, Any]:
+    """
+    One record as a flat row for CSV and Parquet.
+
+    Scalars keep their name. Nested objects (owner, team, organisation, value, party,
+    milestone...) become dotted columns of their scalar values, e.g. owner.name and
+    value.amount. The first address is split into address.street, address.city etc.,
+    and every address is also written to `addresses`, one per SEPARATOR. Email
+    addresses, phone numbers, websites and tag names are each joined into one
+    column; custom fields get a column per definition, `field.<name>`. Any other
+    list is written as JSON.
+    """
+    row = {}
+    for key, value in record.items():
+        if value is None:
+            continue
+        if _is_scalar(value):
+            row[key] = value
+        elif key == "addresses":
+            if value:
+                row.update({f"address.{k}": v for k, v in value[0].items() if k != "id" and _is_scalar(v)})
+                row["addresses"] = SEPARATOR.join(_format_address(address) for address in value)
+        elif key in ("emailAddresses", "phoneNumbers", "websites"):
+            attribute = "number" if key == "phoneNumbers" else "address"
+            values = [item[attribute] for item in value if item.get(attribute)]
+            if values:
+                row[key] = SEPARATOR.join(values)
+        elif key == "tags":
+            names = [tag.get("name") if isinstance(tag, dict) else str(tag) for tag in value]
+            if names:
+                row["tags"] = SEPARATOR.join(filter(None, names))
+        elif key == "fields":
+            for field in value:
+                definition = field.get("definition") or {}
+                column = f"field.{definition.get('name') or definition.get('id')}"
+                if field.get("value") is None:
+                    continue
+                row[column] = f"{row[column]}{SEPARATOR}{field['value']}" if column in row else field["value"]
+        elif isinstance(value, dict):
+            row.update({f"{key}.{k}": v for k, v in value.items() if _is_scalar(v)})
+        elif isinstance(value, list) and value:
+            row[key] = json.dumps(value, default=str)
+    return row
+
+
+def _column_type(current: Optional[str], value) -> str:
+    """The Parquet type of a column that held `current` so far and now holds value."""
+    kind = "bool" if isinstance(value, bool) else "int" if isinstance(value, int) else "float" if isinstance(value, float) else "str"
+    if current is None or current == kind:
+        return kind
+    if {current, kind} == {"int", "float"}:
+        return "float"
+    return "str"
+
+
+def _ordered(columns: Dict[str, str]) -> Dict[str, str]:
+    """Columns in the order they first appeared, id first."""
+    return dict(sorted(columns.items(), key=lambda column: column[0] != "id"))
+
+
+def _records(entity: str, user_input: Optional[dict], max_items: Optional[int]) -> AsyncIterator:
+    query = dict(user_input or {})
+    if entity in DEFAULT_EMBED:
+        query.setdefault("embed", DEFAULT_EMBED[entity])
+    return ENTITIES[entity](query, max_items=max_items)
+
+
+def _write_csv(spool, path: str, columns: Dict[str, str]):
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=list(columns), restval="", extrasaction="ignore")
+        writer.writeheader()
+        for line in spool:
+            writer.writerow(json.loads(line))
+
+
+def _write_parquet(spool, path: str, columns: Dict[str, str]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns.items()])
+    # Columns that held values of several types
+    coerce = {name: str if kind == "str" else float for name, kind in columns.items() if kind in ("str", "float")}
+
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        batch = []
+        for line in spool:
+            row = json.loads(line)
+            for name, convert in coerce.items():
+                if name in row:
+                    row[name] = convert(row[name])
+            batch.append(row)
+            if len(batch) >= ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema))
+
+
+@traced
+async def export_records_async(entity: str, user_input: Optional[dict] = None, fmt: str = "ndjson",
+                               filename: Optional[str] = None, max_items: Optional[int] = None,
+                               progress: Optional[Callable[[int], Awaitable[None]]] = None,
+                               overwrite: bool = False) -> dict:
+    """
+    Stream every matching record to a file in export_dir(), page by page.
+
+    Records come from the same iterators as the *_all tools: with user_input, the
+    find_* query planner (search, filters, mirror); without, the whole list (open
+    tasks for tasks). Each page is written as soon as it arrives and then dropped,
+    so memory does not grow with the number of records. NDJSON keeps each record's
+    Person, Organisation, Task or opportunity shape, one per line. CSV and Parquet
+    need every column before the first row, and custom fields only show up as
+    records arrive, so rows are flattened (see flatten()) into a spool file next to
+    the export first and written out once the columns are known. Parquet needs the
+    optional pyarrow package. Responses read for an export are not kept in the disk
+    cache.
+
+    The file is written under a temporary name and renamed when complete, so a
+    failed export never leaves a partial file behind. An existing file is only
+    replaced with `overwrite`. progress(records) is awaited every PROGRESS_EVERY
+    records.
+
+    Returns:
+        dict: path, format, records, columns (CSV and Parquet), bytes and seconds
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f"Unknown entity: {entity} - use one of {', '.join(ENTITIES)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} - use one of {', '.join(FORMATS)}")
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("Parquet export needs the pyarrow package - install it, or use 'ndjson' or 'csv'")
+
+    start = time.perf_counter()
+    path = _export_path(entity, fmt, filename, overwrite)
+    # NDJSON is written as it comes; CSV and Parquet from a spool of flattened rows.
+    # Temporary names are unique, so concurrent exports to the same name do not mix.
+    temporary = f"{path}.{uuid.uuid4().hex[:8]}"
+    spool = f"{temporary}.partial" if fmt == "ndjson" else f"{temporary}.spool"
+    columns = {}
+    records = 0
+    try:
+        with open(spool, "w", encoding="utf-8") as out, no_store():
+            async for record in _records(entity, user_input, max_items):
+                record = _as_dict(record)
+                if fmt != "ndjson":
+                    record = flatten(record)
+                    for name, value in record.items():
+                        columns[name] = _column_type(columns.get(name), value)
+                out.write(json.dumps(record, default=str, ensure_ascii=False))
+                out.write("\n")
+                records += 1
+                if progress is not None and records % PROGRESS_EVERY == 0:
+                    await progress(records)
+
+        if fmt == "ndjson":
+            _publish(spool, path, overwrite)
+        else:
+            writer = _write_csv if fmt == "csv" else _write_parquet
+            partial = f"{temporary}.partial"
+
+            def write():
+                try:
+                    with open(spool, encoding="utf-8") as rows:
+                        writer(rows, partial, _ordered(columns))
+                    _publish(partial, path, overwrite)
+                finally:
+                    if os.path.exists(partial):
+                        os.remove(partial)
+            await asyncio.to_thread(write)
+    finally:
+        if os.path.exists(spool):
+            os.remove(spool)
+    if progress is not None:
+        await progress(records)
+
+    result = {
+        "path": path,
+        "format": fmt,
+        "records": records,
+        "columns": len(columns) if fmt != "ndjson" else None,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(f"Exported {records} {entity} to {path} ({result['bytes']} bytes in {result['seconds']} s)")
+    return result
@@ -0,0 +1,229 @@
+import re
+import time
+import bisect
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from .config import env_bool
+
+# Upper bounds in seconds of the latency histogram buckets (the last bucket is unbounded)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_SEGMENT = re.compile(r"/\d+(?:,\d+)*(?=/|$)")
+
+
+@lru_cache(maxsize=1024)
+def route(endpoint: str) -> str:
+    """Endpoint with record ids replaced by {id}, so /parties/12 and /parties/1,2 count as /parties/{id}."""
+    return _ID_SEGMENT.sub("/{id}", endpoint)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets; cheap to update, percentiles are estimated from the buckets."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating linearly inside the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> dict:
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.5)),
+            "p90_ms": ms(self.quantile(0.9)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "max_ms": ms(self.max),
+        }
+
+
+class _EndpointStats:
+    __slots__ = ("latency", "statuses", "bytes", "retries", "throttled", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses: Dict[str, int] = {}
+        self.bytes = 0
+        self.retries = 0
+        self.throttled = 0
+        self.errors = 0
+
+
+class _ToolStats:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+
+
+class Metrics:
+    """
+    In-process counters and latency histograms per CapsuleCRM endpoint and per MCP tool.
+
+    Endpoints are keyed by method and route (ids replaced by {id}). Per request the
+    registry keeps latency, status codes, response bytes, retries and 429s; per tool,
+    latency and errors. Recording is a dictionary lookup and a few increments under
+    a lock, a couple of microseconds per call. Cache, coalescing and rate-limit
+    figures are not duplicated here; server_stats reads them from their owners.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._endpoints: Dict[Tuple[str, str], _EndpointStats] = {}
+        self._tools: Dict[str, _ToolStats] = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, method: str, endpoint: str, status: Optional[int], seconds: float, size: int = 0):
+        """Record one HTTP attempt; status is None when no response was received."""
+        if not self.enabled:
+            return
+        key = (method, route(endpoint))
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = _EndpointStats()
+            stats.latency.observe(seconds)
+            label = str(status) if status is not None else "error"
+            stats.statuses[label] = stats.statuses.get(label, 0) + 1
+            stats.bytes += size
+            if status == 429:
+                stats.throttled += 1
+            if status is None or status >= 400:
+                stats.errors += 1
+
+    def record_retry(self, method: str, endpoint: str):
+        if not self.enabled:
+            return
+        key = (method, route(endpoint))
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = _EndpointStats()
+            stats.retries += 1
+
+    def record_tool(self, name: str, seconds: float, error: bool = False):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._tools.get(name)
+            if stats is None:
+                stats = self._tools[name] = _ToolStats()
+            stats.latency.observe(seconds)
+            if error:
+                stats.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._tools.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> dict:
+        """Per-endpoint and per-tool figures, busiest first."""
+        with self._lock:
+            endpoints = {
+                f"{method} {path}": {
+                    **stats.latency.summary(),
+                    "statuses": dict(stats.statuses),
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "throttled": stats.throttled,
+                    "response_bytes": stats.bytes,
+                }
+                for (method, path), stats in self._endpoints.items()
+            }
+            tools = {name: {**stats.latency.summary(), "errors": stats.errors} for name, stats in self._tools.items()}
+        return {
+            "enabled": self.enabled,
+            "since": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "seconds": round(time.time() - self.started_at, 1),
+            "endpoints": dict(sorted(endpoints.items(), key=lambda item: -item[1]["count"])),
+            "tools": dict(sorted(tools.items(), key=lambda item: -item[1]["count"])),
+        }
+
+    def prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            gauges: Extra point-in-time values (cache hits, remaining budget, ...) to
+                include as capsulecrm_<name> gauges; None values are skipped.
+        """
+        lines = []
+
+        def histogram(name: str, help_text: str, series: list):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.sum}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        def counter(name: str, help_text: str, series: list):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series:
+                lines.append(f"{name}{{{labels}}} {value}")
+
+        with self._lock:
+            endpoints = [(f'method="{method}",endpoint="{path}"', stats) for (method, path), stats in self._endpoints.items()]
+            tools = [(f'tool="{name}"', stats) for name, stats in self._tools.items()]
+            histogram("capsulecrm_request_duration_seconds", "CapsuleCRM API request latency per attempt.",
+                      [(labels, stats.latency) for labels, stats in endpoints])
+            counter("capsulecrm_responses_total", "CapsuleCRM API responses by status ('error' if none was received).",
+                    [(f'{labels},status="{status}"', n) for labels, stats in endpoints for status, n in stats.statuses.items()])
+            counter("capsulecrm_response_bytes_total", "Bytes of CapsuleCRM API response bodies.",
+                    [(labels, stats.bytes) for labels, stats in endpoints])
+            counter("capsulecrm_retries_total", "CapsuleCRM API requests retried after a 429 or 5xx response.",
+                    [(labels, stats.retries) for labels, stats in endpoints])
+            counter("capsulecrm_throttled_total", "CapsuleCRM API responses with status 429.",
+                    [(labels, stats.throttled) for labels, stats in endpoints])
+            histogram("capsulecrm_tool_duration_seconds", "MCP tool call latency.",
+                      [(labels, stats.latency) for labels, stats in tools])
+            counter("capsulecrm_tool_errors_total", "MCP tool calls that raised an error.",
+                    [(labels, stats.errors) for labels, stats in tools])
+        for name, value in (gauges or {}).items():
+            if value is not None:
+                lines.append(f"# TYPE capsulecrm_{name} gauge")
+                lines.append(f"capsulecrm_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics(enabled=env_bool("CAPSULECRM_METRICS", True))
+
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics registry."""
+    return _metrics
@@ -1,8 +1,19 @@
 import httpx
-from fastapi import HTTPException
-from .utils import request
 from .models import Milestone
+from .reference import get_reference_cache
+from .tracing import traced
 
+def _page_of_milestones(records: list, page: int, per_page: int) -> list[Milestone]:
+    start = (page - 1) * per_page
+    return [Milestone(**milestone) for milestone in records[start:start + per_page]]
+
+@traced
 def list_milestones(page: int = 1, per_page: int = 50) -> list[Milestone]:
-    data = request("GET", "/milestones", params={"page": page, "perPage": per_page})
-    return [Milestone(**milestone) for milestone in data.get("milestones", [])] 
\ No newline at end of file
+    # Milestones rarely change, so they are served from the reference data cache
+    table = get_reference_cache().get("milestones")
+    return _page_of_milestones(table.records, page, per_page)
+
+@traced
+async def list_milestones_async(page: int = 1, per_page: int = 50) -> list[Milestone]:
+    table = await get_reference_cache().get_async("milestones")
+    return _page_of_milestones(table.records, page, per_page)
@@ -0,0 +1,585 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from .errors import CapsuleAPIError
+from .config import env_float
+from .utils import request, no_store
+from .pagination import iter_pages
+from .tenants import current_tenant
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Records changed shortly before a sync started may not be visible to it yet, so
+# incremental pulls ask for a little more than strictly necessary.
+SYNC_OVERLAP_SECONDS = 120
+
+
+def _date(value) -> Optional[str]:
+    return value[:10] if isinstance(value, str) else None
+
+
+def _ref(field: str, key: str) -> Callable[[dict], object]:
+    def extract(record: dict):
+        ref = record.get(field)
+        return ref.get(key) if isinstance(ref, dict) else None
+    return extract
+
+
+def _joined(values) -> str:
+    # "|a|b|" lets "is" match one element exactly with LIKE '%|a|%'
+    values = [v for v in values if v]
+    return "|" + "|".join(values) + "|" if values else ""
+
+
+def _tags(record: dict) -> str:
+    return _joined(tag.get("name") for tag in record.get("tags") or [])
+
+
+def _party_name(record: dict) -> Optional[str]:
+    if record.get("name"):
+        return record["name"]
+    return " ".join(filter(None, [record.get("firstName"), record.get("lastName")])) or None
+
+
+class MirrorTable:
+    """
+    How one CapsuleCRM entity is laid out in the mirror.
+
+    Args:
+        name: Table name, which is also the API collection name
+        columns: Column name -> function extracting its value from an API record
+        fields: Filter field -> (kind, column) used to translate find_* conditions
+        indexes: Columns to index
+        list_params: Extra query parameters for the list endpoint
+        tracks_deletions: Whether the API offers /<name>/deleted for incremental syncs
+    """
+
+    def __init__(self, name: str, columns: Dict[str, Callable[[dict], object]], fields: Dict[str, tuple],
+                 indexes: List[str], list_params: Optional[dict] = None, tracks_deletions: bool = False):
+        self.name = name
+        self.columns = columns
+        self.fields = fields
+        self.indexes = indexes
+        self.list_params = list_params or {}
+        self.tracks_deletions = tracks_deletions
+
+    def row(self, record: dict) -> tuple:
+        return (record["id"], *(extract(record) for extract in self.columns.values()), json.dumps(record))
+
+
+_COMMON_COLUMNS = {
+    "owner_id": _ref("owner", "id"),
+    "owner_name": _ref("owner", "name"),
+    "owner_username": _ref("owner", "username"),
+    "added_on": lambda r: _date(r.get("createdAt")),
+    "updated_on": lambda r: _date(r.get("updatedAt")),
+}
+
+_COMMON_FIELDS = {
+    "id": ("number", "id"),
+    "owner": ("user", "owner"),
+    "addedOn": ("date", "added_on"),
+    "updatedOn": ("date", "updated_on"),
+}
+
+MIRROR_TABLES = {
+    "parties": MirrorTable(
+        "parties",
+        {
+            **_COMMON_COLUMNS,
+            "type": lambda r: r.get("type"),
+            "name": _party_name,
+            "job_title": lambda r: r.get("jobTitle"),
+            "emails": lambda r: _joined(e.get("address") for e in r.get("emailAddresses") or []),
+            "phones": lambda r: _joined(p.get("number") for p in r.get("phoneNumbers") or []),
+            "cities": lambda r: _joined(a.get("city") for a in r.get("addresses") or []),
+            "has_email": lambda r: int(bool(r.get("emailAddresses"))),
+            "team_id": _ref("team", "id"),
+            "team_name": _ref("team", "name"),
+            "last_contacted_on": lambda r: _date(r.get("lastContactedAt")),
+            "tags": _tags,
+        },
+        {
+            **_COMMON_FIELDS,
+            "type": ("text", "type"),
+            "name": ("text", "name"),
+            "jobTitle": ("text", "job_title"),
+            "email": ("multi", "emails"),
+            "phone": ("multi", "phones"),
+            "city": ("multi", "cities"),
+            "hasEmailAddress": ("bool", "has_email"),
+            "team": ("ref", "team"),
+            "lastContactedOn": ("date", "last_contacted_on"),
+            "tag": ("multi", "tags"),
+        },
+        ["owner_id", "name", "type", "added_on", "updated_on", "last_contacted_on"],
+        tracks_deletions=True,
+    ),
+    "opportunities": MirrorTable(
+        "opportunities",
+        {
+            **_COMMON_COLUMNS,
+            "name": lambda r: r.get("name"),
+            "party_id": _ref("party", "id"),
+            "milestone_id": _ref("milestone", "id"),
+            "milestone_name": _ref("milestone", "name"),
+            "value_amount": _ref("value", "amount"),
+            "probability": lambda r: r.get("probability"),
+            "expected_close_on": lambda r: _date(r.get("expectedCloseOn")),
+            "closed_on": lambda r: _date(r.get("closedOn")),
+            "tags": _tags,
+        },
+        {
+            **_COMMON_FIELDS,
+            "name": ("text", "name"),
+            "milestone": ("ref", "milestone"),
+            "party": ("number", "party_id"),
+            "probability": ("number", "probability"),
+            "expectedCloseOn": ("date", "expected_close_on"),
+            "closedOn": ("date", "closed_on"),
+            "tag": ("multi", "tags"),
+        },
+        ["owner_id", "milestone_id", "party_id", "expected_close_on", "added_on", "updated_on"],
+        tracks_deletions=True,
+    ),
+    "tasks": MirrorTable(
+        "tasks",
+        {
+            **_COMMON_COLUMNS,
+            "description": lambda r: r.get("description"),
+            "status": lambda r: r.get("status"),
+            "due_on": lambda r: _date(r.get("dueOn")),
+            "completed_on": lambda r: _date(r.get("completedAt")),
+            "category_id": _ref("category", "id"),
+            "category_name": _ref("category", "name"),
+            "party_id": _ref("party", "id"),
+            "opportunity_id": _ref("opportunity", "id"),
+        },
+        {
+            **_COMMON_FIELDS,
+            "status": ("text", "status"),
+            "description": ("text", "description"),
+            "dueOn": ("date", "due_on"),
+            "completedOn": ("date", "completed_on"),
+            "category": ("ref", "category"),
+            "party": ("number", "party_id"),
+            "opportunity": ("number", "opportunity_id"),
+        },
+        ["owner_id", "status", "due_on", "category_id", "party_id"],
+        list_params={"status": "open,completed,pending"},
+    ),
+    "milestones": MirrorTable(
+        "milestones",
+        {"name": lambda r: r.get("name"), "updated_on": lambda r: _date(r.get("updatedAt"))},
+        {"id": ("number", "id"), "name": ("text", "name")},
+        [],
+    ),
+}
+
+
+# Field kinds the mirror can order by; users and references sort by name on the API side only
+SORTABLE_KINDS = {"text", "date", "number"}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _condition_sql(table: MirrorTable, field: str, operator: str, value: str) -> Optional[tuple]:
+    """Translate one filter condition to (SQL, params), or None if the mirror cannot evaluate it."""
+    spec = table.fields.get(field)
+    if spec is None:
+        return None
+    kind, column = spec
+    operator = operator.lower()
+    negate = operator == "is not"
+    if negate:
+        operator = "is"
+
+    if kind in ("user", "ref"):
+        if operator != "is":
+            return None
+        names = [f"{column}_name", f"{column}_username"] if kind == "user" else [f"{column}_name"]
+        if value.isdigit():
+            sql, params = f"{column}_id = ?", [int(value)]
+        else:
+            sql, params = "(" + " OR ".join(f"{name} = ? COLLATE NOCASE" for name in names) + ")", [value] * len(names)
+    elif kind == "text":
+        patterns = {"is": "{}", "contains": "%{}%", "starts with": "{}%", "ends with": "%{}"}
+        if operator not in patterns:
+            return None
+        sql, params = f"{column} LIKE ? ESCAPE '\\'", [patterns[operator].format(_escape_like(value))]
+    elif kind == "multi":
+        patterns = {"is": "%|{}|%", "contains": "%{}%", "starts with": "%|{}%", "ends with": "%{}|%"}
+        if operator not in patterns:
+            return None
+        sql, params = f"{column} LIKE ? ESCAPE '\\'", [patterns[operator].format(_escape_like(value))]
+    elif kind == "date":
+        if operator == "is within last":
+            if not value.isdigit():
+                return None
+            sql, params = f"{column} >= date('now', ?)", [f"-{int(value)} days"]
+        else:
+            operators = {"is": "=", "is after": ">", "is before": "<"}
+            if operator not in operators:
+                return None
+            sql, params = f"{column} {operators[operator]} ?", [value[:10]]
+    elif kind == "number":
+        operators = {"is": "=", "is greater than": ">", "is less than": "<"}
+        if operator not in operators:
+            return None
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        sql, params = f"{column} {operators[operator]} ?", [number]
+    elif kind == "bool":
+        if operator != "is" or value.lower() not in ("true", "false"):
+            return None
+        sql, params = f"{column} = ?", [int(value.lower() == "true")]
+    else:
+        return None
+
+    if negate:
+        # Records without a value for the field do not match "is", so they match "is not"
+        sql = f"NOT COALESCE(({sql}), 0)"
+    return sql, params
+
+
+def _where_sql(table: MirrorTable, conditions: list) -> Optional[tuple]:
+    """Translate ANDed conditions to ([SQL clauses], params), or None if one cannot be evaluated."""
+    clauses, params = [], []
+    for condition in conditions:
+        translated = _condition_sql(table, condition.field, condition.operator, str(condition.value))
+        if translated is None:
+            logger.debug(f"Mirror cannot evaluate {condition.field} {condition.operator}, using the live API")
+            return None
+        clauses.append(translated[0])
+        params.extend(translated[1])
+    return clauses, params
+
+
+def _utc_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class CrmMirror:
+    """
+    Local SQLite copy of parties, opportunities, tasks and milestones.
+
+    The first sync pulls every record; later syncs only pull records changed since
+    the previous one (`since=`) plus, where the API reports them, deletions. A full
+    sync is repeated every `full_sync_interval` seconds to catch anything incremental
+    pulls cannot see. Deleted tasks only disappear in a full sync, so entities
+    without deletion tracking are fully synced again before their last full sync is
+    `max_staleness` seconds old.
+
+    find_* only answer from the mirror while it has seen every change to that entity
+    up to at most `max_staleness` seconds ago (the last sync, or the last full sync
+    for entities without deletion tracking); otherwise they fall back to the live API.
+    """
+
+    def __init__(self, path: str, *, sync_interval: float = 300.0, max_staleness: float = 900.0,
+                 full_sync_interval: float = 86400.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self.full_sync_interval = full_sync_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._create_schema()
+
+    @classmethod
+    def from_env(cls) -> Optional["CrmMirror"]:
+        """
+        Build the mirror from the environment, or return None if it is not enabled.
+
+        Environment variables:
+            CAPSULECRM_MIRROR_PATH: SQLite file to keep the mirror in; unset disables the mirror.
+            CAPSULECRM_MIRROR_SYNC_INTERVAL: Seconds between incremental syncs.
+            CAPSULECRM_MIRROR_MAX_STALENESS: Oldest sync, in seconds, find_* will still answer from (full sync for tasks).
+            CAPSULECRM_MIRROR_FULL_SYNC_INTERVAL: Seconds between full re-syncs.
+        """
+        path = os.getenv("CAPSULECRM_MIRROR_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            sync_interval=env_float("CAPSULECRM_MIRROR_SYNC_INTERVAL", 300.0),
+            max_staleness=env_float("CAPSULECRM_MIRROR_MAX_STALENESS", 900.0),
+            full_sync_interval=env_float("CAPSULECRM_MIRROR_FULL_SYNC_INTERVAL", 86400.0),
+        )
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "entity TEXT PRIMARY KEY, synced_from REAL, synced_at REAL, full_synced_at REAL, records INTEGER)"
+            )
+            for table in MIRROR_TABLES.values():
+                columns = ", ".join(table.columns)
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table.name} (id INTEGER PRIMARY KEY, {columns}, record TEXT NOT NULL)")
+                for column in table.indexes:
+                    self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.name}_{column} ON {table.name} ({column})")
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    # Syncing
+
+    def _state(self, entity: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT synced_from, synced_at, full_synced_at FROM sync_state WHERE entity = ?", (entity,)
+            ).fetchone()
+
+    def _upsert(self, table: MirrorTable, records: List[dict]):
+        if not records:
+            return
+        placeholders = ", ".join("?" * (len(table.columns) + 2))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table.name} (id, {', '.join(table.columns)}, record) VALUES ({placeholders})",
+                [table.row(record) for record in records],
+            )
+
+    def _fetch_page(self, table: MirrorTable, params: dict) -> Callable[[int, int], List[dict]]:
+        def fetch(page: int, per_page: int) -> List[dict]:
+            data = request("GET", f"/{table.name}", params={**params, "page": page, "perPage": per_page})
+            records = data.get(table.name, [])
+            self._upsert(table, records)
+            return records
+        return fetch
+
+    def _pull_deletions(self, table: MirrorTable, since: str):
+        try:
+            deleted = [
+                record["id"] for record in iter_pages(
+                    lambda page, size: request("GET", f"/{table.name}/deleted",
+                                               params={"since": since, "page": page, "perPage": size}).get(table.name, []),
+                    prefetch=0,
+                )
+            ]
+        except CapsuleAPIError as e:
+            logger.warning(f"Could not fetch deleted {table.name}: {e.detail}")
+            return
+        if deleted:
+            with self._lock, self._conn:
+                self._conn.executemany(f"DELETE FROM {table.name} WHERE id = ?", [(i,) for i in deleted])
+
+    def apply_changes(self, entity: str, records: List[dict], deleted_ids: List[int]):
+        """Store changed records and drop deleted ones as reported outside a sync (webhook events)."""
+        table = MIRROR_TABLES[entity]
+        self._upsert(table, records)
+        if deleted_ids:
+            with self._lock, self._conn:
+                self._conn.executemany(f"DELETE FROM {table.name} WHERE id = ?", [(i,) for i in deleted_ids])
+
+    def _full_sync_interval(self, table: MirrorTable) -> float:
+        if table.tracks_deletions:
+            return self.full_sync_interval
+        # Leave one sync interval's headroom so the entity does not go stale between syncs
+        return min(self.full_sync_interval, max(self.max_staleness - self.sync_interval, 0))
+
+    def sync_entity(self, entity: str, full: bool = False) -> int:
+        """Pull changes for one entity; returns the number of records received."""
+        table = MIRROR_TABLES[entity]
+        state = self._state(entity)
+        started = time.time()
+        full = full or state is None or entity == "milestones" or started - (state[2] or 0) > self._full_sync_interval(table)
+        params = dict(table.list_params)
+        since = None
+        if not full:
+            since = _utc_iso(state[0] - SYNC_OVERLAP_SECONDS)
+            params["since"] = since
+
+        seen = [record["id"] for record in iter_pages(self._fetch_page(table, params))]
+        with self._lock, self._conn:
+            if full:
+                # Anything not returned by a full pull no longer exists
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_ids (id INTEGER PRIMARY KEY)")
+                self._conn.execute("DELETE FROM seen_ids")
+                self._conn.executemany("INSERT OR IGNORE INTO seen_ids (id) VALUES (?)", [(i,) for i in seen])
+                self._conn.execute(f"DELETE FROM {table.name} WHERE id NOT IN (SELECT id FROM seen_ids)")
+        if since and table.tracks_deletions:
+            self._pull_deletions(table, since)
+
+        with self._lock, self._conn:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {table.name}").fetchone()[0]
+            full_synced_at = started if full else state[2]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (entity, synced_from, synced_at, full_synced_at, records) VALUES (?, ?, ?, ?, ?)",
+                (entity, started, time.time(), full_synced_at, count),
+            )
+        logger.info(f"Mirror {'full' if full else 'incremental'} sync of {entity}: {len(seen)} received, {count} stored")
+        return len(seen)
+
+    def sync(self, full: bool = False) -> dict:
+        """Sync every entity; an entity that fails to sync keeps its previous state."""
+        result = {}
+        for entity in MIRROR_TABLES:
+            try:
+                # Pages of a sync are not read again, so they would only push useful responses out of the disk cache
+                with no_store():
+                    result[entity] = self.sync_entity(entity, full)
+            except Exception as e:
+                logger.warning(f"Mirror sync of {entity} failed: {e}")
+                result[entity] = f"failed: {e}"
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(self.sync_interval)
+
+    def start(self):
+        """Start syncing in a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="capsulecrm-mirror", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # Querying
+
+    @staticmethod
+    def _age(entity: str, synced_from: float, full_synced_at: Optional[float], now: float) -> float:
+        """Seconds since the mirror last saw every change to entity; only a full sync sees deletions it cannot pull."""
+        seen_from = synced_from if MIRROR_TABLES[entity].tracks_deletions else (full_synced_at or 0)
+        return now - seen_from
+
+    def is_fresh(self, entity: str) -> bool:
+        state = self._state(entity)
+        return state is not None and self._age(entity, state[0], state[2], time.time()) <= self.max_staleness
+
+    def query(self, entity: str, conditions: list, page: int = 1, per_page: int = 50,
+              any_of: Optional[List[list]] = None, order_by: Optional[list] = None) -> Optional[List[dict]]:
+        """
+        Answer a find_* query from the mirror.
+
+        Args:
+            entity: parties, opportunities or tasks
+            conditions: Filter conditions (ANDed), as built for the filter API
+            page: Page number
+            per_page: Items per page
+            any_of: Alternative lists of conditions; if given, a record must also match
+                all conditions of at least one of them
+            order_by: OrderBy fields to sort by before paginating (by id otherwise)
+
+        Returns:
+            The matching records as returned by the API, or None if the mirror is stale
+            or cannot evaluate one of the conditions or sort fields.
+        """
+        if not self.is_fresh(entity):
+            logger.debug(f"Mirror of {entity} is stale, using the live API")
+            return None
+        table = MIRROR_TABLES[entity]
+        where = _where_sql(table, conditions)
+        if where is None:
+            return None
+        clauses, params = where
+        if any_of:
+            alternatives = [_where_sql(table, branch) for branch in any_of]
+            if any(alternative is None for alternative in alternatives):
+                return None
+            clauses.append("(" + " OR ".join("(" + (" AND ".join(sql) or "1") + ")" for sql, _ in alternatives) + ")")
+            params.extend(param for _, branch_params in alternatives for param in branch_params)
+        order = []
+        for sort in order_by or []:
+            spec = table.fields.get(sort.field)
+            if spec is None or spec[0] not in SORTABLE_KINDS:
+                logger.debug(f"Mirror cannot sort by {sort.field}, using the live API")
+                return None
+            direction = "DESC" if sort.direction.lower().startswith("desc") else "ASC"
+            order.extend([f"{spec[1]} IS NULL", f"{spec[1]} {direction}"])
+        where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT record FROM {table.name} {where_sql} ORDER BY {', '.join(order + ['id'])} LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._conn.execute(sql, [*params, per_page, (max(page, 1) - 1) * per_page]).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def records(self, entity: str, batch_size: int = 1000) -> Iterable[dict]:
+        """Yield every mirrored record of an entity, reading batch_size rows at a time."""
+        table = MIRROR_TABLES[entity].name
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, record FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            for row_id, record in rows:
+                yield json.loads(record)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def status(self) -> dict:
+        """Return per-entity record counts and sync times."""
+        with self._lock:
+            rows = self._conn.execute("SELECT entity, synced_from, synced_at, full_synced_at, records FROM sync_state").fetchall()
+        now = time.time()
+        return {
+            "path": self.path,
+            "max_staleness_seconds": self.max_staleness,
+            "entities": {
+                entity: {
+                    "records": records,
+                    "age_seconds": round(self._age(entity, synced_from, full_synced_at, now), 1),
+                    "fresh": self._age(entity, synced_from, full_synced_at, now) <= self.max_staleness,
+                    "last_sync": _utc_iso(synced_at),
+                    "last_full_sync": _utc_iso(full_synced_at) if full_synced_at else None,
+                }
+                for entity, synced_from, synced_at, full_synced_at, records in rows
+            },
+        }
+
+
+_mirror = CrmMirror.from_env()
+
+
+def get_mirror() -> Optional[CrmMirror]:
+    """Get the process-wide CRM mirror, or None if CAPSULECRM_MIRROR_PATH is not set or the call works on another account."""
+    return _mirror if current_tenant() is None else None
+
+
+def start_mirror():
+    """Start background syncing if the mirror is enabled. Called once at server startup."""
+    if _mirror is not None:
+        _mirror.start()
+
+
+def stop_mirror():
+    """Stop background syncing. Called once when the server shuts down."""
+    if _mirror is not None:
+        _mirror.stop()
+
+
+def query_mirror(entity: str, conditions: list, page: int = 1, per_page: int = 50,
+                 any_of: Optional[List[list]] = None, order_by: Optional[list] = None) -> Optional[List[dict]]:
+    """Answer a find_* query from the mirror if it is enabled, fresh and able to; otherwise return None."""
+    mirror = get_mirror()
+    if mirror is None:
+        return None
+    return mirror.query(entity, conditions, page, per_page, any_of, order_by)
+
+
+async def query_mirror_async(entity: str, conditions: list, page: int = 1, per_page: int = 50,
+                             any_of: Optional[List[list]] = None, order_by: Optional[list] = None) -> Optional[List[dict]]:
+    """Async variant of query_mirror(); the query runs in a worker thread."""
+    mirror = get_mirror()
+    if mirror is None:
+        return None
+    return await asyncio.to_thread(mirror.query, entity, conditions, page, per_page, any_of, order_by)
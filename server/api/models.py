@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Any, Union
+from pydantic import BaseModel, Discriminator, Field, Tag
+from typing import Annotated, Optional, List, Any, Union
 
 class OpportunityValue(BaseModel):
     amount: float = Field(..., description="The monetary amount of the opportunity.")
@@ -45,6 +45,10 @@ class OpportunityCreate(BaseModel):
             return self.total_value * self.probability / 100
         return None
 
+class OpportunityUpdate(BaseModel):
+    id: int = Field(..., description="The unique ID of the opportunity to update.")
+    opportunity: OpportunityCreate = Field(..., description="The new values of the opportunity.")
+
 class Address(BaseModel):
     id: int
     type: Optional[str] = None
@@ -113,7 +117,18 @@ class Person(BaseModel):
     team: Optional[Any] = Field(None, description="The team this person is assigned to.")
     missingImportantFields: Optional[bool] = Field(None, description="Indicates if any important custom fields are missing a value.")
 
-Party = Union[Person, Organisation]
+def _party_type(value) -> str:
+    """Which Party member a value is, so validation tries only that one; untyped parties with a name are organisations."""
+    party_type = value.get("type") if isinstance(value, dict) else getattr(value, "type", None)
+    if party_type in ("person", "organisation"):
+        return party_type
+    has_name = "name" in value if isinstance(value, dict) else isinstance(value, Organisation)
+    return "organisation" if has_name else "person"
+
+Party = Annotated[
+    Union[Annotated[Person, Tag("person")], Annotated[Organisation, Tag("organisation")]],
+    Discriminator(_party_type),
+]
 
 class Pipeline(BaseModel):
     id: int
@@ -1,29 +1,78 @@
-from .utils import request, filter_entities
-from .models import OpportunityCreate, Filter, Condition
-from typing import List, Optional
+from .utils import request, request_async, filter_entities, filter_entities_async
+from .models import OpportunityCreate, OpportunityUpdate, Filter
+from .entity_cache import get_entity_cache
+from .batch import fetch_many, fetch_many_async
+from .bulk import run_bulk, run_bulk_async
+from .query import QueryPlanner
+from .projection import Projection, project
+from .pagination import iter_pages, aiter_pages, MAX_PAGE_SIZE, DEFAULT_PREFETCH
+from .tracing import traced
+from typing import AsyncIterator, Iterator, List, Optional
 
 # You may want to define an Opportunity model for full read support, but for now use dict for responses
 
-def list_opportunities(page: int = 1, per_page: int = 50) -> List[dict]:
+@traced
+def list_opportunities(page: int = 1, per_page: int = 50, projection: Optional[Projection] = None) -> List[dict]:
     data = request("GET", "/opportunities", params={"page": page, "perPage": per_page})
-    return data.get("opportunities", [])
+    return project(data.get("opportunities", []), projection)
 
-def search_opportunities(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None) -> List[dict]:
+@traced
+async def list_opportunities_async(page: int = 1, per_page: int = 50, projection: Optional[Projection] = None) -> List[dict]:
+    data = await request_async("GET", "/opportunities", params={"page": page, "perPage": per_page})
+    return project(data.get("opportunities", []), projection)
+
+def _search_params(q: str, page: int, per_page: int, embed: Optional[str]) -> dict:
     params = {"q": q, "page": page, "perPage": per_page}
     if embed:
         params["embed"] = embed
-    data = request("GET", "/opportunities/search", params=params)
-    return data.get("opportunities", [])
+    return params
+
+@traced
+def search_opportunities(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[dict]:
+    data = request("GET", "/opportunities/search", params=_search_params(q, page, per_page, embed))
+    return project(data.get("opportunities", []), projection)
 
-def filter_opportunities(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None) -> List[dict]:
+@traced
+async def search_opportunities_async(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[dict]:
+    data = await request_async("GET", "/opportunities/search", params=_search_params(q, page, per_page, embed))
+    return project(data.get("opportunities", []), projection)
+
+@traced
+def filter_opportunities(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[dict]:
     data = filter_entities("opportunities", filter_obj, page, per_page, embed)
-    return data.get("opportunities", [])
+    return project(data.get("opportunities", []), projection)
+
+@traced
+async def filter_opportunities_async(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[dict]:
+    data = await filter_entities_async("opportunities", filter_obj, page, per_page, embed)
+    return project(data.get("opportunities", []), projection)
 
-def get_opportunity(opportunity_id: int) -> dict:
-    data = request("GET", f"/opportunities/{opportunity_id}")
+def _to_opportunity(data: dict) -> dict:
     return data["opportunity"]
 
-def create_opportunity(opportunity: OpportunityCreate) -> dict:
+def _cache_opportunity(data: dict) -> dict:
+    opportunity = _to_opportunity(data)
+    get_entity_cache().store_record("opportunities", opportunity, opportunity)
+    return opportunity
+
+@traced
+def get_opportunity(opportunity_id: int, projection: Optional[Projection] = None) -> dict:
+    return project(get_entity_cache().get("opportunities", opportunity_id, "opportunity", _to_opportunity), projection)
+
+@traced
+async def get_opportunity_async(opportunity_id: int, projection: Optional[Projection] = None) -> dict:
+    return project(await get_entity_cache().get_async("opportunities", opportunity_id, "opportunity", _to_opportunity), projection)
+
+@traced
+def get_opportunities(opportunity_ids: List[int], projection: Optional[Projection] = None) -> dict:
+    """Fetch several opportunities at once; returns {"opportunities": [...] in input order, "missing": [ids]}."""
+    return fetch_many("opportunities", "opportunity", opportunity_ids, lambda record: record, projection)
+
+@traced
+async def get_opportunities_async(opportunity_ids: List[int], projection: Optional[Projection] = None) -> dict:
+    return await fetch_many_async("opportunities", "opportunity", opportunity_ids, lambda record: record, projection)
+
+def _opportunity_payload(opportunity: OpportunityCreate) -> dict:
     # Always send value.amount as per-unit value to Capsule.
     # If value_type is 'total', convert total to per-unit by dividing by duration.
     data_dict = opportunity.dict(exclude_none=True)
@@ -31,23 +80,84 @@ def create_opportunity(opportunity: OpportunityCreate) -> dict:
     duration = data_dict.get('duration')
     if value_type == 'total' and duration and data_dict['value']['amount'] is not None:
         data_dict['value']['amount'] = data_dict['value']['amount'] / duration
-    data = request("POST", "/opportunities", json={"opportunity": data_dict})
-    return data["opportunity"]
+    return {"opportunity": data_dict}
+
+@traced
+def create_opportunity(opportunity: OpportunityCreate) -> dict:
+    data = request("POST", "/opportunities", json=_opportunity_payload(opportunity))
+    return _cache_opportunity(data)
+
+@traced
+async def create_opportunity_async(opportunity: OpportunityCreate) -> dict:
+    data = await request_async("POST", "/opportunities", json=_opportunity_payload(opportunity))
+    return _cache_opportunity(data)
 
+@traced
 def update_opportunity(opportunity_id: int, opportunity: OpportunityCreate) -> dict:
-    data = request("PUT", f"/opportunities/{opportunity_id}", json={"opportunity": opportunity.dict(exclude_none=True)})
-    return data["opportunity"]
+    data = request("PUT", f"/opportunities/{opportunity_id}", json=_opportunity_payload(opportunity))
+    return _cache_opportunity(data)
+
+@traced
+async def update_opportunity_async(opportunity_id: int, opportunity: OpportunityCreate) -> dict:
+    data = await request_async("PUT", f"/opportunities/{opportunity_id}", json=_opportunity_payload(opportunity))
+    return _cache_opportunity(data)
+
+@traced
+def bulk_create_opportunities(opportunities: List[OpportunityCreate], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    """Create many opportunities concurrently, converting value_type='total' per item; see run_bulk() for the report."""
+    return run_bulk(create_opportunity, opportunities, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+async def bulk_create_opportunities_async(opportunities: List[OpportunityCreate], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    return await run_bulk_async(create_opportunity_async, opportunities, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+def bulk_update_opportunities(updates: List[OpportunityUpdate], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    """Update many opportunities concurrently, converting value_type='total' per item."""
+    return run_bulk(lambda update: update_opportunity(update.id, update.opportunity), updates,
+                    stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+async def bulk_update_opportunities_async(updates: List[OpportunityUpdate], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    return await run_bulk_async(lambda update: update_opportunity_async(update.id, update.opportunity), updates,
+                                stop_on_error=stop_on_error, concurrency=concurrency)
+
+def _to_opportunities(data: dict, projection: Optional[Projection] = None) -> List[dict]:
+    return project(data.get("opportunities", []), projection)
+
+# find_* queries are compiled and planned in api.query
+_planner = QueryPlanner("opportunities", _to_opportunities)
+
+@traced
+def find_opportunities(user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+    """Find opportunities by filters, free text or neither (see QueryPlanner); with explain, also report how the query was answered."""
+    return _planner.find(user_input, projection, explain)
+
+@traced
+async def find_opportunities_async(user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+    return await _planner.find_async(user_input, projection, explain)
+
+def iter_opportunities(per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[dict]:
+    return iter_pages(lambda page, size: list_opportunities(page, size, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_opportunities_async(per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[dict]:
+    return aiter_pages(lambda page, size: list_opportunities_async(page, size, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_search_opportunities(q: str, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[dict]:
+    return iter_pages(lambda page, size: search_opportunities(q, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_search_opportunities_async(q: str, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[dict]:
+    return aiter_pages(lambda page, size: search_opportunities_async(q, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_filter_opportunities(filter_obj: Filter, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[dict]:
+    return iter_pages(lambda page, size: filter_opportunities(filter_obj, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_filter_opportunities_async(filter_obj: Filter, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[dict]:
+    return aiter_pages(lambda page, size: filter_opportunities_async(filter_obj, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_find_opportunities(user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[dict]:
+    """Like find_opportunities(), but follows pagination through every matching opportunity."""
+    return _planner.iterate(user_input, prefetch, max_items, projection)
 
-def find_opportunities(user_input: dict):
-    filterable_fields = {"status", "tag", "addedOn", "owner", "milestone"}
-    filter_conditions = []
-    for key in filterable_fields:
-        if key in user_input:
-            filter_conditions.append(Condition(field=key, operator="is", value=user_input[key]))
-    if filter_conditions:
-        filter_obj = Filter(conditions=filter_conditions)
-        return filter_opportunities(filter_obj)
-    elif "q" in user_input:
-        return search_opportunities(user_input["q"])
-    else:
-        return list_opportunities() 
\ No newline at end of file
+def iter_find_opportunities_async(user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[dict]:
+    return _planner.iterate_async(user_input, prefetch, max_items, projection)
@@ -0,0 +1,139 @@
+import math
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional
+from .config import env_int
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Largest perPage CapsuleCRM accepts
+MAX_PAGE_SIZE = 100
+
+# Pages fetched ahead of the one being consumed
+DEFAULT_PREFETCH = env_int("CAPSULECRM_PREFETCH_PAGES", 2)
+
+PageFetcher = Callable[[int, int], List[Any]]
+AsyncPageFetcher = Callable[[int, int], Awaitable[List[Any]]]
+PageDecoder = Callable[[List[Any]], List[Any]]
+
+
+def _page_window(per_page: int, max_items: Optional[int]) -> tuple:
+    """Return the effective page size and the last page worth requesting (None if unbounded)."""
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    if max_items is None:
+        return per_page, None
+    per_page = min(per_page, max(1, max_items))
+    return per_page, math.ceil(max_items / per_page) if max_items > 0 else 0
+
+
+def iter_pages(
+    fetch_page: PageFetcher,
+    *,
+    per_page: int = MAX_PAGE_SIZE,
+    prefetch: int = DEFAULT_PREFETCH,
+    max_items: Optional[int] = None,
+    decode: Optional[PageDecoder] = None,
+) -> Iterator[Any]:
+    """
+    Iterate over every record of a paginated CapsuleCRM collection.
+
+    Pages are requested by number; up to `prefetch` pages after the current one are
+    fetched in background threads while the caller consumes records, and iteration
+    stops at the first page shorter than `per_page` as CapsuleCRM returned it. Pass
+    raw records and `decode` when decoding may drop some (parties of an unknown
+    type), so that a full page that decodes short does not end the iteration early.
+
+    Args:
+        fetch_page: Called as fetch_page(page, per_page) and returns the records of that page
+        per_page: Page size, capped at the API maximum of 100
+        prefetch: Number of pages requested ahead of the page being consumed
+        max_items: Stop after yielding this many records
+        decode: Turns the records of one page into the ones yielded, in the fetching thread
+
+    Yields:
+        Records in API order
+    """
+    per_page, last_page = _page_window(per_page, max_items)
+    if last_page == 0:
+        return
+    executor = ThreadPoolExecutor(max_workers=prefetch + 1, thread_name_prefix="capsulecrm-prefetch")
+    pending = deque()
+    next_page = 1
+
+    def fetch(page: int) -> tuple:
+        records = fetch_page(page, per_page)
+        return len(records), records if decode is None else decode(records)
+
+    def schedule():
+        nonlocal next_page
+        if last_page is None or next_page <= last_page:
+            pending.append(executor.submit(contextvars.copy_context().run, fetch, next_page))
+            next_page += 1
+
+    try:
+        for _ in range(prefetch + 1):
+            schedule()
+        yielded = 0
+        while pending:
+            received, records = pending.popleft().result()
+            for record in records:
+                yield record
+                yielded += 1
+                if max_items is not None and yielded >= max_items:
+                    return
+            if received < per_page:
+                return
+            schedule()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def aiter_pages(
+    fetch_page: AsyncPageFetcher,
+    *,
+    per_page: int = MAX_PAGE_SIZE,
+    prefetch: int = DEFAULT_PREFETCH,
+    max_items: Optional[int] = None,
+    decode: Optional[PageDecoder] = None,
+) -> AsyncIterator[Any]:
+    """Async variant of iter_pages(); prefetched pages are fetched as concurrent tasks."""
+    per_page, last_page = _page_window(per_page, max_items)
+    if last_page == 0:
+        return
+    pending = deque()
+    next_page = 1
+
+    async def fetch(page: int) -> tuple:
+        records = await fetch_page(page, per_page)
+        return len(records), records if decode is None else decode(records)
+
+    def schedule():
+        nonlocal next_page
+        if last_page is None or next_page <= last_page:
+            pending.append(asyncio.ensure_future(fetch(next_page)))
+            next_page += 1
+
+    try:
+        for _ in range(prefetch + 1):
+            schedule()
+        yielded = 0
+        while pending:
+            received, records = await pending.popleft()
+            for record in records:
+                yield record
+                yielded += 1
+                if max_items is not None and yielded >= max_items:
+                    return
+            if received < per_page:
+                return
+            schedule()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
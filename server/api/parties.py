@@ -1,127 +1,227 @@
-from .utils import request, filter_entities
-from .models import Party, Person, Organisation, Filter, Condition
-from typing import List, Union, Optional
+from .utils import request, request_async, filter_entities, filter_entities_async
+from .models import Party, Person, Organisation, Filter
+from .decode import decode
+from .entity_cache import get_entity_cache
+from .batch import fetch_many, fetch_many_async
+from .bulk import run_bulk, run_bulk_async
+from .search_index import index_parties, search_party_index
+from .query import QueryPlanner
+from .projection import Projection, project
+from .pagination import iter_pages, aiter_pages, MAX_PAGE_SIZE, DEFAULT_PREFETCH
+from .tracing import traced
+from typing import AsyncIterator, Iterator, List, Union, Optional
 
-def list_parties(page: int = 1, per_page: int = 50) -> List[Party]:
-    data = request("GET", "/parties", params={"page": page, "perPage": per_page})
+def _to_party(party: dict) -> Optional[Party]:
+    if party.get("type") == "person":
+        return decode(Person, party)
+    elif party.get("type") == "organisation":
+        return decode(Organisation, party)
+    return None
+
+@traced
+def _to_parties(data: dict, projection: Optional[Projection] = None) -> List[Party]:
+    if projection is not None:
+        # Skip model validation (and the search index, which needs whole parties)
+        return projection.apply_all(data.get("parties", []))
     parties = []
     for party in data.get("parties", []):
-        if party.get("type") == "person":
-            parties.append(Person(**party))
-        elif party.get("type") == "organisation":
-            parties.append(Organisation(**party))
+        parsed = _to_party(party)
+        if parsed is not None:
+            parties.append(parsed)
+    index_parties(parties)
     return parties
 
-def search_parties(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None) -> List[Party]:
+def _to_single_party(data: dict) -> Party:
+    party = _to_party(data["party"])
+    if party is None:
+        raise ValueError("Unknown party type")
+    index_parties([party])
+    return party
+
+@traced
+def list_parties(page: int = 1, per_page: int = 50, projection: Optional[Projection] = None) -> List[Party]:
+    data = request("GET", "/parties", params={"page": page, "perPage": per_page})
+    return _to_parties(data, projection)
+
+@traced
+async def list_parties_async(page: int = 1, per_page: int = 50, projection: Optional[Projection] = None) -> List[Party]:
+    data = await request_async("GET", "/parties", params={"page": page, "perPage": per_page})
+    return _to_parties(data, projection)
+
+def _search_params(q: str, page: int, per_page: int, embed: Optional[str]) -> dict:
     params = {"q": q, "page": page, "perPage": per_page}
     if embed:
         params["embed"] = embed
-    data = request("GET", "/parties/search", params=params)
-    parties = []
-    for party in data.get("parties", []):
-        if party.get("type") == "person":
-            parties.append(Person(**party))
-        elif party.get("type") == "organisation":
-            parties.append(Organisation(**party))
-    return parties
+    return params
+
+@traced
+def search_parties(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Party]:
+    # The local index cannot embed extra fields; without embed it answers in well under a millisecond
+    if embed is None:
+        parties = search_party_index(q, page, per_page)
+        if parties is not None:
+            return project(parties, projection)
+    data = request("GET", "/parties/search", params=_search_params(q, page, per_page, embed))
+    return _to_parties(data, projection)
 
-def filter_parties(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None) -> List[Party]:
+@traced
+async def search_parties_async(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Party]:
+    if embed is None:
+        parties = search_party_index(q, page, per_page)
+        if parties is not None:
+            return project(parties, projection)
+    data = await request_async("GET", "/parties/search", params=_search_params(q, page, per_page, embed))
+    return _to_parties(data, projection)
+
+@traced
+def filter_parties(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Party]:
     data = filter_entities("parties", filter_obj, page, per_page, embed)
-    parties = []
-    for party in data.get("parties", []):
-        if party.get("type") == "person":
-            parties.append(Person(**party))
-        elif party.get("type") == "organisation":
-            parties.append(Organisation(**party))
-    return parties
+    return _to_parties(data, projection)
+
+@traced
+async def filter_parties_async(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Party]:
+    data = await filter_entities_async("parties", filter_obj, page, per_page, embed)
+    return _to_parties(data, projection)
+
+# find_* queries are compiled and planned in api.query; the party index answers free text locally
+_planner = QueryPlanner("parties", _to_parties, local_search=search_party_index)
 
-def find_parties(user_input: dict):
-    # Extended filterable fields based on CapsuleCRM API documentation
-    filterable_fields = {
-        "tag", "addedOn", "owner", "type", "name", "jobTitle", "email", 
-        "phone", "city", "hasEmailAddress", "hasPeople", "updatedOn", 
-        "lastContactedOn", "id", "team"
-    }
-    
-    # Extract pagination and embed parameters
-    page = user_input.get("page", 1)
-    per_page = user_input.get("per_page", 50)
-    embed = user_input.get("embed")
-    
-    # Build filter conditions with operator support
-    filter_conditions = []
-    for key in filterable_fields:
-        if key in user_input:
-            value = user_input[key]
-            operator = "is"  # default operator
-            
-            # Handle operator specification in field names like "addedOn_after"
-            if "_" in key:
-                field_name, op_suffix = key.split("_", 1)
-                if field_name in filterable_fields:
-                    operator_map = {
-                        "after": "is after",
-                        "before": "is before", 
-                        "contains": "contains",
-                        "starts": "starts with",
-                        "ends": "ends with",
-                        "gt": "is greater than",
-                        "lt": "is less than",
-                        "within": "is within last",
-                        "not": "is not"
-                    }
-                    operator = operator_map.get(op_suffix, "is")
-                    key = field_name
-            
-            # Handle operator specified in value dict
-            if isinstance(value, dict) and "operator" in value:
-                operator = value["operator"]
-                value = value["value"]
-            
-            filter_conditions.append(Condition(field=key, operator=operator, value=str(value)))
-    
-    # Decide whether to use filtering, search, or list
-    if filter_conditions:
-        filter_obj = Filter(conditions=filter_conditions)
-        return filter_parties(filter_obj, page, per_page, embed)
-    elif "q" in user_input:
-        return search_parties(user_input["q"], page, per_page, embed)
-    else:
-        return list_parties(page, per_page)
+@traced
+def find_parties(user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+    """Find parties by filters, free text or neither (see QueryPlanner); with explain, also report how the query was answered."""
+    return _planner.find(user_input, projection, explain)
 
+@traced
+async def find_parties_async(user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+    return await _planner.find_async(user_input, projection, explain)
+
+# The iterators below fetch raw pages and decode them afterwards: parties of an unknown
+# type are dropped when decoding, and a full page that decodes short must not end the iteration
+def _decoder(projection: Optional[Projection]):
+    return lambda parties: _to_parties({"parties": parties}, projection)
+
+def _raw_page(endpoint: str, params: dict):
+    def fetch(page, size):
+        return request("GET", endpoint, params={**params, "page": page, "perPage": size}).get("parties", [])
+
+    async def fetch_async(page, size):
+        return (await request_async("GET", endpoint, params={**params, "page": page, "perPage": size})).get("parties", [])
+    return fetch, fetch_async
+
+def _raw_search_page(q: str, embed: Optional[str]):
+    params = {"q": q}
+    if embed:
+        params["embed"] = embed
+    return _raw_page("/parties/search", params)
+
+def _index_page(q: str, embed: Optional[str], projection: Optional[Projection]):
+    """A page fetcher answering from the local index, if it can answer q (its pages are decoded already)."""
+    if embed is not None or search_party_index(q, 1, 1) is None:
+        return None
+    return lambda page, size: project(search_party_index(q, page, size) or [], projection)
+
+def iter_parties(per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Party]:
+    return iter_pages(_raw_page("/parties", {})[0], per_page=per_page, prefetch=prefetch, max_items=max_items, decode=_decoder(projection))
+
+def iter_parties_async(per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Party]:
+    return aiter_pages(_raw_page("/parties", {})[1], per_page=per_page, prefetch=prefetch, max_items=max_items, decode=_decoder(projection))
+
+def iter_search_parties(q: str, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Party]:
+    local = _index_page(q, embed, projection)
+    if local is not None:
+        return iter_pages(local, per_page=per_page, prefetch=prefetch, max_items=max_items)
+    return iter_pages(_raw_search_page(q, embed)[0], per_page=per_page, prefetch=prefetch, max_items=max_items, decode=_decoder(projection))
+
+def iter_search_parties_async(q: str, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Party]:
+    local = _index_page(q, embed, projection)
+    if local is not None:
+        async def fetch_local(page, size):
+            return local(page, size)
+        return aiter_pages(fetch_local, per_page=per_page, prefetch=prefetch, max_items=max_items)
+    return aiter_pages(_raw_search_page(q, embed)[1], per_page=per_page, prefetch=prefetch, max_items=max_items, decode=_decoder(projection))
+
+def iter_filter_parties(filter_obj: Filter, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Party]:
+    return iter_pages(lambda page, size: filter_entities("parties", filter_obj, page, size, embed).get("parties", []),
+                      per_page=per_page, prefetch=prefetch, max_items=max_items, decode=_decoder(projection))
+
+def iter_filter_parties_async(filter_obj: Filter, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Party]:
+    async def fetch(page, size):
+        return (await filter_entities_async("parties", filter_obj, page, size, embed)).get("parties", [])
+    return aiter_pages(fetch, per_page=per_page, prefetch=prefetch, max_items=max_items, decode=_decoder(projection))
+
+def iter_find_parties(user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Party]:
+    """Like find_parties(), but follows pagination through every matching party."""
+    return _planner.iterate(user_input, prefetch, max_items, projection)
+
+def iter_find_parties_async(user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Party]:
+    return _planner.iterate_async(user_input, prefetch, max_items, projection)
+
+@traced
 def list_persons(page: int = 1, per_page: int = 50) -> List[Person]:
     return [p for p in list_parties(page, per_page) if isinstance(p, Person)]
 
+@traced
 def list_organisations(page: int = 1, per_page: int = 50) -> List[Organisation]:
     return [o for o in list_parties(page, per_page) if isinstance(o, Organisation)]
 
-def get_party(party_id: int) -> Party:
-    data = request("GET", f"/parties/{party_id}")
-    party = data["party"]
-    if party.get("type") == "person":
-        return Person(**party)
-    elif party.get("type") == "organisation":
-        return Organisation(**party)
-    else:
-        raise ValueError("Unknown party type")
+def _cache_party(data: dict) -> Party:
+    party = _to_single_party(data)
+    get_entity_cache().store_record("parties", data["party"], party)
+    return party
+
+@traced
+def get_party(party_id: int, projection: Optional[Projection] = None) -> Party:
+    return project(get_entity_cache().get("parties", party_id, "party", _to_single_party), projection)
+
+@traced
+async def get_party_async(party_id: int, projection: Optional[Projection] = None) -> Party:
+    return project(await get_entity_cache().get_async("parties", party_id, "party", _to_single_party), projection)
 
+@traced
+def get_parties(party_ids: List[int], projection: Optional[Projection] = None) -> dict:
+    """Fetch several parties at once; returns {"parties": [...] in input order, "missing": [ids]}."""
+    return fetch_many("parties", "party", party_ids, _to_party, projection)
+
+@traced
+async def get_parties_async(party_ids: List[int], projection: Optional[Projection] = None) -> dict:
+    return await fetch_many_async("parties", "party", party_ids, _to_party, projection)
+
+@traced
 def create_party(party: Party) -> Party:
     # party is either Person or Organisation
     data = request("POST", "/parties", json={"party": party.dict(exclude_none=True)})
-    party_data = data["party"]
-    if party_data.get("type") == "person":
-        return Person(**party_data)
-    elif party_data.get("type") == "organisation":
-        return Organisation(**party_data)
-    else:
-        raise ValueError("Unknown party type")
+    return _cache_party(data)
 
+@traced
+async def create_party_async(party: Party) -> Party:
+    data = await request_async("POST", "/parties", json={"party": party.dict(exclude_none=True)})
+    return _cache_party(data)
+
+@traced
 def update_party(party_id: int, party: Party) -> Party:
     data = request("PUT", f"/parties/{party_id}", json={"party": party.dict(exclude_none=True)})
-    party_data = data["party"]
-    if party_data.get("type") == "person":
-        return Person(**party_data)
-    elif party_data.get("type") == "organisation":
-        return Organisation(**party_data)
-    else:
-        raise ValueError("Unknown party type") 
\ No newline at end of file
+    return _cache_party(data)
+
+@traced
+async def update_party_async(party_id: int, party: Party) -> Party:
+    data = await request_async("PUT", f"/parties/{party_id}", json={"party": party.dict(exclude_none=True)})
+    return _cache_party(data)
+
+@traced
+def bulk_create_parties(parties: List[Party], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    """Create many parties concurrently; see run_bulk() for the per-item report."""
+    return run_bulk(create_party, parties, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+async def bulk_create_parties_async(parties: List[Party], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    return await run_bulk_async(create_party_async, parties, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+def bulk_update_parties(parties: List[Party], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    """Update many parties, each identified by its id, concurrently."""
+    return run_bulk(lambda party: update_party(party.id, party), parties, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+async def bulk_update_parties_async(parties: List[Party], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    return await run_bulk_async(lambda party: update_party_async(party.id, party), parties,
+                                stop_on_error=stop_on_error, concurrency=concurrency)
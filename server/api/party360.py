@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Union
+from .errors import CapsuleAPIError
+from .utils import request, request_async, count_requests
+from .entity_cache import get_entity_cache
+from .projection import Projection
+from .parties import search_parties, search_parties_async
+from .opportunities import find_opportunities, find_opportunities_async
+from .tasks import find_tasks, find_tasks_async
+from .tracing import traced
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Extra party fields the API only returns when asked for
+PARTY_EMBED = "tags,fields"
+
+# Parties found by name that are reported besides the one the overview is about
+MAX_OTHER_MATCHES = 5
+
+
+def _name(party: dict) -> str:
+    return party.get("name") or " ".join(filter(None, [party.get("firstName"), party.get("lastName")]))
+
+
+def _pick(matches: List[dict], name: str) -> tuple:
+    """The match whose name equals `name` (ignoring case), else the first; and the other matches."""
+    wanted = name.strip().lower()
+    best = next((m for m in matches if _name(m).lower() == wanted), matches[0])
+    others = [{"id": m["id"], "name": _name(m), "type": m.get("type")} for m in matches if m is not best]
+    return best, others[:MAX_OTHER_MATCHES]
+
+
+def _known_type(party_id: int) -> Optional[str]:
+    """The party's type if a cached copy says so, sparing the people request for persons."""
+    hit, value = get_entity_cache().cached("parties", party_id)
+    return getattr(value, "type", None) if hit else None
+
+
+def _people_params(max_people: int) -> dict:
+    return {"perPage": max(1, min(max_people, 100))}
+
+
+def _without_party(records: List[dict], party_id: int, opportunity_ids: set) -> List[dict]:
+    """Drop the nested copy of the overview's party, and reduce nested opportunities already listed to {id, name}."""
+    slim = []
+    for record in records:
+        record = dict(record)
+        party = record.get("party")
+        if isinstance(party, dict) and party.get("id") == party_id:
+            del record["party"]
+        opportunity = record.get("opportunity")
+        if isinstance(opportunity, dict) and opportunity.get("id") in opportunity_ids:
+            record["opportunity"] = {"id": opportunity["id"], "name": opportunity.get("name")}
+        slim.append(record)
+    return slim
+
+
+def _overview(party: dict, people: Optional[List[dict]], opportunities: List[dict], tasks: List[dict],
+              projection: Projection, limits: Dict[str, int]) -> dict:
+    party_id = party["id"]
+    opportunity_ids = {o["id"] for o in opportunities}
+    opportunities = _without_party(opportunities, party_id, set())
+    tasks = _without_party(tasks, party_id, opportunity_ids)
+
+    open_value: Dict[str, float] = {}
+    open_opportunities = 0
+    for opportunity in opportunities:
+        if not opportunity.get("closedOn"):
+            open_opportunities += 1
+            value = opportunity.get("value") or {}
+            if value.get("amount") is not None:
+                currency = value.get("currency") or "?"
+                open_value[currency] = open_value.get(currency, 0) + value["amount"]
+    today = date.today().isoformat()
+    overdue = sum(1 for task in tasks if (task.get("dueOn") or "9999") < today)
+
+    result: Dict[str, Any] = {"party": projection.apply(party)}
+    if party.get("type") == "organisation":
+        result["people"] = projection.apply_all(people or [])
+    elif isinstance(party.get("organisation"), dict):
+        result["organisation"] = projection.apply(party["organisation"])
+    result["opportunities"] = projection.apply_all(opportunities)
+    result["open_tasks"] = projection.apply_all(tasks)
+    result["summary"] = {
+        "people": len(people or []),
+        "opportunities": len(opportunities),
+        "open_opportunities": open_opportunities,
+        "open_value": open_value,
+        "open_tasks": len(tasks),
+        "overdue_tasks": overdue,
+        # A full list suggests there are more than the limit allowed for
+        "truncated": [kind for kind, count in (("people", len(people or [])), ("opportunities", len(opportunities)),
+                                               ("open_tasks", len(tasks))) if count >= limits[kind]],
+    }
+    return result
+
+
+def _found(answer: dict) -> tuple:
+    """(results, upstream requests) of a find_* answer with explain; find_* counts its own requests."""
+    return answer["results"], answer["explain"]["upstream_requests"]
+
+
+def _resolve(party: Union[int, str]) -> tuple:
+    """(party id, or None if party must be searched for by name; the name)."""
+    if isinstance(party, int) or (isinstance(party, str) and party.strip().isdigit()):
+        return int(party), None
+    if not isinstance(party, str) or not party.strip():
+        raise ValueError("party must be a party id or a non-empty name")
+    return None, party
+
+
+def _no_match(name: str) -> CapsuleAPIError:
+    return CapsuleAPIError(status_code=404, detail=f"No party found matching '{name}'")
+
+
+def _people_failed(party_id: int, e: Exception) -> list:
+    # Persons have no people; the API answers their /people with an error
+    logger.debug(f"No people for party {party_id}: {e}")
+    return []
+
+
+@traced
+def party_360(party: Union[int, str], max_opportunities: int = 50, max_tasks: int = 50, max_people: int = 50,
+              compact: bool = True) -> dict:
+    """
+    Everything about one party in one call: the party (with tags and custom fields), its
+    people (organisations) or organisation (persons), its opportunities and its open tasks.
+
+    The party is looked up by name first if no id is given; the remaining requests are
+    sent concurrently. Opportunities and tasks go through the find_* query planner, so
+    they are answered from the mirror when it is fresh. The party is not repeated inside
+    its opportunities and tasks, and opportunities nested in tasks are reduced to
+    {id, name}.
+
+    Args:
+        party: Party id, or a name to search for
+        max_opportunities, max_tasks, max_people: Most records of each kind to return
+        compact: Drop empty values and reduce nested objects to {id, name}
+
+    Returns:
+        {"party", "people" or "organisation", "opportunities", "open_tasks", "summary",
+        "matched_by", "other_matches", "upstream_requests"}
+
+    Raises:
+        CapsuleAPIError: 404 if no party matches
+    """
+    requests = count_requests()
+    party_id, name = _resolve(party)
+    others, party_type = [], None
+    if party_id is None:
+        matches = [m if isinstance(m, dict) else m.model_dump() for m in search_parties(name, per_page=MAX_OTHER_MATCHES + 1)]
+        if not matches:
+            raise _no_match(name)
+        match, others = _pick(matches, name)
+        party_id, party_type = match["id"], match.get("type")
+    party_type = party_type or _known_type(party_id)
+
+    def people() -> list:
+        if party_type == "person":
+            return []
+        try:
+            return request("GET", f"/parties/{party_id}/people", params=_people_params(max_people)).get("parties", [])
+        except CapsuleAPIError as e:
+            return _people_failed(party_id, e)
+
+    calls: List[Callable[[], Any]] = [
+        lambda: request("GET", f"/parties/{party_id}", params={"embed": PARTY_EMBED})["party"],
+        people,
+        lambda: _found(find_opportunities({"party": party_id, "per_page": max_opportunities}, Projection(), explain=True)),
+        lambda: _found(find_tasks({"party": party_id, "status": "open", "per_page": max_tasks}, Projection(), explain=True)),
+    ]
+    # Each call runs in a copy of this context so its requests are counted and traced here
+    with ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix="capsulecrm-batch") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+        record, people_records, (opportunities, opportunity_requests), (tasks, task_requests) = [future.result() for future in futures]
+    result = _overview(record, people_records, opportunities, tasks, Projection(compact=compact),
+                       {"people": max_people, "opportunities": max_opportunities, "open_tasks": max_tasks})
+    result.update(matched_by="id" if name is None else "name", other_matches=others, upstream_requests=requests[0] + opportunity_requests + task_requests)
+    return result
+
+
+@traced
+async def party_360_async(party: Union[int, str], max_opportunities: int = 50, max_tasks: int = 50, max_people: int = 50,
+                          compact: bool = True) -> dict:
+    """Async variant of party_360()."""
+    requests = count_requests()
+    party_id, name = _resolve(party)
+    others, party_type = [], None
+    if party_id is None:
+        matches = [m if isinstance(m, dict) else m.model_dump() for m in await search_parties_async(name, per_page=MAX_OTHER_MATCHES + 1)]
+        if not matches:
+            raise _no_match(name)
+        match, others = _pick(matches, name)
+        party_id, party_type = match["id"], match.get("type")
+    party_type = party_type or _known_type(party_id)
+
+    async def people() -> list:
+        if party_type == "person":
+            return []
+        try:
+            return (await request_async("GET", f"/parties/{party_id}/people", params=_people_params(max_people))).get("parties", [])
+        except CapsuleAPIError as e:
+            return _people_failed(party_id, e)
+
+    async def record() -> dict:
+        return (await request_async("GET", f"/parties/{party_id}", params={"embed": PARTY_EMBED}))["party"]
+
+    party_record, people_records, opportunities, tasks = await asyncio.gather(
+        record(),
+        people(),
+        find_opportunities_async({"party": party_id, "per_page": max_opportunities}, Projection(), explain=True),
+        find_tasks_async({"party": party_id, "status": "open", "per_page": max_tasks}, Projection(), explain=True),
+    )
+    (opportunities, opportunity_requests), (tasks, task_requests) = _found(opportunities), _found(tasks)
+    result = _overview(party_record, people_records, opportunities, tasks, Projection(compact=compact),
+                       {"people": max_people, "opportunities": max_opportunities, "open_tasks": max_tasks})
+    result.update(matched_by="id" if name is None else "name", other_matches=others, upstream_requests=requests[0] + opportunity_requests + task_requests)
+    return result
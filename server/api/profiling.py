@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+from .config import env_int, env_float
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+# Worker threads whose stacks belong to the profiled call (batch fetches, page prefetch, bulk operations)
+WORKER_THREAD_PREFIXES = ("capsulecrm-batch", "capsulecrm-prefetch", "capsulecrm-bulk")
+
+
+class _Sampler:
+    """Collects the stacks of the calling thread and the api worker threads every interval, as folded stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capsulecrm-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = threads.get(ident, "")
+                if ident != self.thread_id and not name.startswith(WORKER_THREAD_PREFIXES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = names.get(code)
+                    if label is None:
+                        label = names[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                # Worker threads are grouped by pool, not by thread number
+                stack.append(name.rstrip("0123456789").rstrip("-_") if ident != self.thread_id else "tool")
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Folded stack lines ('frame;frame;frame count'), as read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Profiles the next N tool calls and writes one profile per call to disk.
+
+    Armed with CAPSULECRM_PROFILE_NEXT at startup or profile_next_calls_tool at run
+    time. 'cprofile' records every function call on the event loop thread while the
+    tool runs (other requests served concurrently show up too) and writes a .prof
+    file for pstats or snakeviz. 'sampling' records the stacks of the event loop
+    thread and the batch, prefetch and bulk worker threads every
+    CAPSULECRM_PROFILE_INTERVAL seconds and writes folded stacks (.folded) for a flame
+    graph; it costs far less than cProfile and so distorts timings less. Only one
+    call is profiled at a time; calls arriving meanwhile run unprofiled and do not
+    use up the count.
+    """
+
+    def __init__(self, directory: str, calls: int = 0, mode: str = "cprofile", interval: float = 0.001):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} - use one of {', '.join(PROFILE_MODES)}")
+        self.directory = directory
+        self.remaining = max(0, calls)
+        self.mode = mode
+        self.interval = interval
+        self.written = []
+        self._active = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        """
+        Environment variables:
+            CAPSULECRM_PROFILE_NEXT: Tool calls to profile from startup (default: 0).
+            CAPSULECRM_PROFILE_MODE: 'cprofile' (default) or 'sampling'.
+            CAPSULECRM_PROFILE_DIR: Directory for the profiles (default: capsulecrm-mcp-profiles in the temp directory).
+            CAPSULECRM_PROFILE_INTERVAL: Seconds between samples in sampling mode (default: 0.001).
+        """
+        mode = os.getenv("CAPSULECRM_PROFILE_MODE", "cprofile")
+        if mode not in PROFILE_MODES:
+            logger.warning(f"Unknown CAPSULECRM_PROFILE_MODE {mode!r}, using cprofile")
+            mode = "cprofile"
+        return cls(
+            directory=os.getenv("CAPSULECRM_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "capsulecrm-mcp-profiles"),
+            calls=env_int("CAPSULECRM_PROFILE_NEXT", 0),
+            mode=mode,
+            interval=env_float("CAPSULECRM_PROFILE_INTERVAL", 0.001),
+        )
+
+    def arm(self, calls: int, mode: Optional[str] = None) -> dict:
+        """Profile the next `calls` tool calls (0 disarms), in `mode` if given."""
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} - use one of {', '.join(PROFILE_MODES)}")
+        with self._lock:
+            self.remaining = max(0, calls)
+            if mode is not None:
+                self.mode = mode
+        return self.stats()
+
+    def _claim(self) -> Optional[str]:
+        """Take one call off the count unless none are left or another call is being profiled; returns the mode."""
+        if not self.remaining:
+            return None
+        with self._lock:
+            if not self.remaining or self._active:
+                return None
+            self.remaining -= 1
+            self._active = True
+            return self.mode
+
+    @contextmanager
+    def profile(self, name: str):
+        """Profile the enclosed block if the profiler is armed; a no-op otherwise."""
+        mode = self._claim()
+        if mode is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    self._save(name, ".prof", lambda path: pstats.Stats(profiler).dump_stats(path), start)
+            else:
+                with _Sampler(threading.get_ident(), self.interval) as sampler:
+                    yield
+                self._save(name, ".folded", lambda path: _write_text(path, sampler.folded()), start)
+        finally:
+            with self._lock:
+                self._active = False
+
+    def _save(self, name: str, suffix: str, write, start: float):
+        now = time.time()
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}-{name}{suffix}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write(path)
+        except OSError as e:
+            logger.warning(f"Could not write profile to {path}: {e}")
+            return
+        self.written.append(path)
+        del self.written[:-20]
+        logger.info(f"Profiled {name} ({(time.perf_counter() - start) * 1000:.0f} ms) to {path}")
+
+    def stats(self) -> dict:
+        return {"remaining": self.remaining, "mode": self.mode, "directory": self.directory, "recent_profiles": list(self.written)}
+
+
+def _write_text(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+_profiler = Profiler.from_env()
+
+
+def get_profiler() -> Profiler:
+    """Get the process-wide profiler."""
+    return _profiler
@@ -0,0 +1,86 @@
+from typing import Iterable, List, Optional
+from pydantic import BaseModel
+
+# Nested objects that compact output reduces to {id, name}
+REFERENCE_FIELDS = {"owner", "team", "party", "organisation", "milestone", "pipeline", "category", "opportunity", "kase"}
+
+_EMPTY = (None, "", [], {})
+
+
+def _field_tree(fields: Iterable[str]) -> dict:
+    """Turn ['name', 'owner.name'] into {'id': {}, 'name': {}, 'owner': {'name': {}}}."""
+    tree = {"id": {}}
+    for field in fields:
+        node = tree
+        for part in field.split("."):
+            node = node.setdefault(part.strip(), {})
+    return tree
+
+
+def _reference(value: dict) -> dict:
+    name = value.get("name") or " ".join(filter(None, (value.get("firstName"), value.get("lastName")))) \
+        or value.get("username") or value.get("description")
+    return {"id": value["id"], "name": name} if name else {"id": value["id"]}
+
+
+def _shape(record: dict, tree: Optional[dict], compact: bool) -> dict:
+    shaped = {}
+    for key in (record if tree is None else [key for key in tree if key in record]):
+        value = record[key]
+        subtree = tree[key] or None if tree is not None else None
+        if isinstance(value, dict):
+            if compact and subtree is None and key in REFERENCE_FIELDS and "id" in value:
+                value = _reference(value)
+            else:
+                value = _shape(value, subtree, compact)
+        elif isinstance(value, list):
+            value = [_shape(item, subtree, compact) if isinstance(item, dict) else item for item in value]
+        if compact and value in _EMPTY:
+            continue
+        shaped[key] = value
+    return shaped
+
+
+class Projection:
+    """
+    Which fields of a record a read tool returns, and whether it returns them compactly.
+
+    Applied to raw API records, so fields that are not returned are never validated
+    into models. Records that are already models (from a cache or the search index)
+    are dumped first.
+
+    Args:
+        fields: Field names to keep, with dots for nested fields ('owner.name',
+            'emailAddresses.address'). 'id' is always kept. None keeps every field.
+        compact: Drop null and empty values and reduce nested owner, party, milestone
+            and similar objects to {id, name}, unless fields selects their subfields.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None, compact: bool = False):
+        self.fields = list(fields) if fields else None
+        self.compact = compact
+        self._tree = _field_tree(self.fields) if self.fields else None
+
+    @classmethod
+    def of(cls, fields: Optional[List[str]] = None, compact: bool = False) -> Optional["Projection"]:
+        """The projection for a tool's fields/compact arguments, or None when the full records are wanted."""
+        if not fields and not compact:
+            return None
+        return cls(fields, compact)
+
+    def apply(self, record) -> dict:
+        if isinstance(record, BaseModel):
+            record = record.model_dump(exclude_none=self.compact)
+        return _shape(record, self._tree, self.compact)
+
+    def apply_all(self, records: Iterable) -> List[dict]:
+        return [self.apply(record) for record in records]
+
+
+def project(value, projection: Optional[Projection]):
+    """Apply a projection to a record, a list of records, or None (return value unchanged)."""
+    if projection is None or value is None:
+        return value
+    if isinstance(value, list):
+        return projection.apply_all(value)
+    return projection.apply(value)
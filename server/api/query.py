@@ -0,0 +1,503 @@
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+from .models import Condition, Filter, OrderBy
+from .utils import request, request_async, filter_entities, filter_entities_async, count_requests
+from .mirror import get_mirror, query_mirror, query_mirror_async
+from .reference import ensure_references, ensure_references_async, resolve_filter_value
+from .projection import Projection, project
+from .pagination import iter_pages, aiter_pages, MAX_PAGE_SIZE, DEFAULT_PREFETCH
+from .tracing import span
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Field name suffixes selecting an operator, as in "addedOn_after"
+OPERATOR_SUFFIXES = {
+    "after": "is after",
+    "before": "is before",
+    "contains": "contains",
+    "starts": "starts with",
+    "ends": "ends with",
+    "gt": "is greater than",
+    "lt": "is less than",
+    "within": "is within last",
+    "not": "is not",
+}
+
+# Fields the CapsuleCRM filter API accepts per entity
+FILTERABLE_FIELDS = {
+    "parties": {
+        "tag", "addedOn", "owner", "type", "name", "jobTitle", "email", "phone", "city",
+        "hasEmailAddress", "hasPeople", "updatedOn", "lastContactedOn", "id", "team",
+    },
+    "opportunities": {
+        "status", "tag", "addedOn", "updatedOn", "owner", "team", "milestone", "name", "party",
+        "value", "probability", "expectedCloseOn", "closedOn", "lastContactedOn", "id",
+    },
+    "tasks": {
+        "status", "tag", "dueOn", "owner", "id", "category", "party", "opportunity",
+        "completedOn", "description", "addedOn", "updatedOn",
+    },
+}
+
+# user_input keys that are not filter fields
+QUERY_KEYS = {"q", "page", "per_page", "embed", "any", "order_by"}
+
+# Record keys holding the value of a filter field where the names differ, for sorting merged results
+RECORD_KEYS = {
+    "addedOn": "createdAt", "updatedOn": "updatedAt", "completedOn": "completedAt",
+    "lastContactedOn": "lastContactedAt", "value": "value.amount", "owner": "owner.name",
+    "milestone": "milestone.name", "category": "category.name", "team": "team.name", "party": "party.id",
+}
+
+# Why a plan that was tried returned nothing, so the next one ran
+FALLBACK_REASONS = {
+    "mirror": "mirror stale, or unable to evaluate a condition or sort field",
+    "search_index": "index not ready or no local match",
+}
+
+# OR-groups are sent as one filter per combination of alternatives; this bounds the fan-out
+MAX_BRANCHES = 10
+
+
+def _condition_value(field: str, value) -> str:
+    value = resolve_filter_value(field, value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _field_operator(entity: str, key: str) -> Optional[tuple]:
+    fields = FILTERABLE_FIELDS[entity]
+    if key in fields:
+        return key, "is"
+    field, _, suffix = key.rpartition("_")
+    if field in fields and suffix in OPERATOR_SUFFIXES:
+        return field, OPERATOR_SUFFIXES[suffix]
+    return None
+
+
+def _order_by(value) -> List[OrderBy]:
+    """Parse order_by: "field", "-field" (descending), {"field", "direction"} or a list of these."""
+    if value is None:
+        return []
+    order = []
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict):
+            order.append(OrderBy(field=item["field"], direction=item.get("direction", "ascending")))
+        elif isinstance(item, str) and item:
+            descending = item.startswith("-")
+            order.append(OrderBy(field=item.lstrip("-+"), direction="descending" if descending else "ascending"))
+        else:
+            raise ValueError(f"Invalid order_by: {item!r} - use 'field', '-field' or {{'field': ..., 'direction': ...}}")
+    return order
+
+
+class Query:
+    """
+    A find_* request compiled from user_input.
+
+    Attributes:
+        conditions: Conditions every result matches
+        or_groups: Groups of alternatives, each alternative a list of conditions; a
+            result matches at least one alternative of every group
+        q: Free text to search for, if any
+        order_by: Sort order
+        page, per_page, embed: As given, defaulting to page 1 of 50
+        ignored: user_input keys that are neither query keys nor filterable fields
+    """
+
+    def __init__(self, entity: str, conditions: List[Condition], or_groups: List[List[List[Condition]]], q: Optional[str],
+                 order_by: List[OrderBy], page: int, per_page: int, embed: Optional[str], ignored: List[str]):
+        self.entity = entity
+        self.conditions = conditions
+        self.or_groups = or_groups
+        self.q = q
+        self.order_by = order_by
+        self.page = page
+        self.per_page = per_page
+        self.embed = embed
+        self.ignored = ignored
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.conditions or self.or_groups)
+
+    def alternatives(self) -> List[List[Condition]]:
+        """The OR-groups multiplied out: lists of conditions of which a result matches at least one ([] if none)."""
+        if not self.or_groups:
+            return []
+        combined = [[]]
+        for group in self.or_groups:
+            combined = [chosen + alternative for chosen in combined for alternative in group]
+        return combined
+
+    def branches(self) -> List[List[Condition]]:
+        """The query as OR-free condition lists, one filter request each."""
+        alternatives = self.alternatives()
+        if not alternatives:
+            return [self.conditions]
+        return [self.conditions + alternative for alternative in alternatives]
+
+    def filter(self, conditions: List[Condition]) -> Filter:
+        return Filter(conditions=conditions, orderBy=self.order_by or None)
+
+    def describe(self) -> dict:
+        def text(conditions):
+            return [f"{c.field} {c.operator} {c.value}" for c in conditions]
+        return {
+            "conditions": text(self.conditions),
+            "any_of": [text(alternative) for alternative in self.alternatives()],
+            "q": self.q,
+            "order_by": [f"{o.field} {o.direction}" for o in self.order_by],
+            "page": self.page,
+            "per_page": self.per_page,
+            "embed": self.embed,
+            "ignored_keys": self.ignored,
+        }
+
+
+def _conditions(entity: str, items: dict, ignored: List[str], or_groups: Optional[list]) -> List[Condition]:
+    conditions = []
+    for key, value in items.items():
+        if key in QUERY_KEYS:
+            continue
+        resolved = _field_operator(entity, key)
+        if resolved is None:
+            ignored.append(key)
+            continue
+        field, operator = resolved
+        if isinstance(value, dict) and "operator" in value:
+            operator, value = value["operator"], value.get("value")
+        if isinstance(value, (list, tuple)):
+            if not value:
+                ignored.append(key)
+                continue
+            if or_groups is None:
+                raise ValueError(f"Lists of values are not supported inside 'any': {key}")
+            or_groups.append([[Condition(field=field, operator=operator, value=_condition_value(field, v))] for v in value])
+        else:
+            conditions.append(Condition(field=field, operator=operator, value=_condition_value(field, value)))
+    return conditions
+
+
+def compile_query(entity: str, user_input: dict, per_page: int = 50) -> Query:
+    """
+    Compile find_* user_input into a Query.
+
+    Filter fields take a value ("status": "open"), an operator suffix ("addedOn_after":
+    "2024-01-01"), an operator and value ({"operator": "contains", "value": "Acme"}) or
+    a list of values, any of which may match ("owner": ["alice", "bob"]). "any" takes a
+    list of such dicts, any of which may match; "order_by" a field name, "-field" for
+    descending, or a list of them. Milestone, owner and category names are resolved to
+    ids when known (see ensure_references).
+    """
+    ignored: List[str] = []
+    or_groups: List[List[List[Condition]]] = []
+    conditions = _conditions(entity, user_input, ignored, or_groups)
+    if "any" in user_input:
+        alternatives = user_input["any"]
+        if not isinstance(alternatives, list) or not all(isinstance(a, dict) for a in alternatives):
+            raise ValueError("'any' takes a list of filter dicts, any of which may match")
+        group = [_conditions(entity, alternative, ignored, None) for alternative in alternatives]
+        if group and all(group):
+            or_groups.append(group)
+    query = Query(entity, conditions, or_groups, user_input.get("q"), _order_by(user_input.get("order_by")),
+                  max(1, int(user_input.get("page", 1))), max(1, int(user_input.get("per_page", per_page))),
+                  user_input.get("embed"), ignored)
+    if len(query.branches()) > MAX_BRANCHES:
+        raise ValueError(f"Query expands to {len(query.branches())} OR combinations; at most {MAX_BRANCHES} are supported")
+    return query
+
+
+def _windows(offset: int, limit: int, per_page: int) -> tuple:
+    """Upstream pages covering records [offset, offset + limit): (page size, page numbers, records to skip in the first)."""
+    size = per_page if per_page <= MAX_PAGE_SIZE and offset % per_page == 0 else MAX_PAGE_SIZE
+    first = offset // size + 1
+    last = (offset + limit - 1) // size + 1
+    return size, range(first, last + 1), offset - (first - 1) * size
+
+
+def _sort_value(record: dict, field: str):
+    value = record
+    for part in RECORD_KEYS.get(field, field).split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    # Numbers compare as numbers, everything else (ISO dates included) as text
+    return value if isinstance(value, (int, float)) or value is None else str(value)
+
+
+def _merge(results: List[List[dict]], order_by: List[OrderBy]) -> List[dict]:
+    """Union records of several filters, without duplicates, sorted by order_by (by id if empty)."""
+    merged = list({record["id"]: record for records in results for record in records}.values())
+    merged.sort(key=lambda record: record["id"])
+    # One stable sort per key, last key first; records without a value go last
+    for sort in reversed(order_by):
+        present = [r for r in merged if _sort_value(r, sort.field) is not None]
+        missing = [r for r in merged if _sort_value(r, sort.field) is None]
+        present.sort(key=lambda r: _sort_value(r, sort.field), reverse=sort.direction.lower().startswith("desc"))
+        merged = present + missing
+    return merged
+
+
+class QueryPlanner:
+    """
+    Turns find_* user_input into the cheapest way of answering it and runs it.
+
+    Plans, cheapest first:
+        mirror        the local SQLite mirror, when enabled, fresh and able to evaluate
+                      every condition and sort field (not with embed or bare free text)
+        search_index  the in-process party index, for free text without filters
+        filter        one filter request per upstream page, conditions and orderBy sent to the API
+        filter_union  one filter per OR combination, each returning the first page*per_page
+                      matches in the requested order, merged and sorted locally
+        search        the search endpoint, for free text without filters
+        list          the list endpoint, when there is nothing to filter on
+    Filters take precedence over free text, which the filter API cannot combine with
+    them. Pages larger than the API's 100 are assembled from several upstream pages.
+    With explain, find() also reports the plan, the plans passed over and why, and
+    the number of HTTP requests it cost.
+
+    Args:
+        entity: parties, opportunities or tasks
+        decode: Turns an API response ({entity: [records]}) into results, applying a projection
+        list_params: Extra query parameters of the list endpoint
+        list_conditions: Conditions equivalent to list_params, for the mirror
+        local_search: Answers free text locally as (q, page, per_page) -> results or None
+    """
+
+    def __init__(self, entity: str, decode: Callable[[dict, Optional[Projection]], List[Any]],
+                 list_params: Optional[dict] = None, list_conditions: Optional[List[Condition]] = None,
+                 local_search: Optional[Callable[[str, int, int], Optional[List[Any]]]] = None):
+        self.entity = entity
+        self.decode = decode
+        self.list_params = list_params or {}
+        self.list_conditions = list_conditions or []
+        self.local_search = local_search
+
+    def _plans(self, query: Query, skipped: list) -> List[str]:
+        """Candidate plans in order of preference; static reasons to pass over a plan go to skipped."""
+        plans = []
+        if query.embed is not None:
+            skipped.append({"plan": "mirror", "reason": "embed needs the live API"})
+        elif query.q is not None and not query.filtered:
+            skipped.append({"plan": "mirror", "reason": "the mirror cannot search free text"})
+        elif get_mirror() is None:
+            skipped.append({"plan": "mirror", "reason": "mirror not enabled (CAPSULECRM_MIRROR_PATH)"})
+        else:
+            plans.append("mirror")
+        if query.filtered:
+            plans.append("filter" if len(query.branches()) == 1 else "filter_union")
+        elif query.q is not None:
+            if self.local_search is not None and query.embed is None:
+                plans.append("search_index")
+            plans.append("search")
+        else:
+            plans.append("list")
+        return plans
+
+    def _notes(self, query: Query, plan: str) -> List[str]:
+        notes = []
+        if query.q is not None and query.filtered:
+            notes.append("q was not applied: the filter API cannot combine free text with conditions")
+        if query.order_by and plan in ("search", "search_index", "list"):
+            notes.append(f"order_by was not applied: the {plan} plan returns results in API order")
+        if query.ignored:
+            notes.append(f"unknown filter fields ignored: {', '.join(query.ignored)}")
+        return notes
+
+    def _mirror_args(self, query: Query) -> tuple:
+        conditions = query.conditions if query.filtered else self.list_conditions
+        return (self.entity, conditions, query.page, query.per_page, query.alternatives() or None, query.order_by or None)
+
+    # Upstream page fetchers returning raw records
+
+    def _filter_page(self, filter_obj: Filter, embed: Optional[str]):
+        return lambda page, size: filter_entities(self.entity, filter_obj, page, size, embed).get(self.entity, [])
+
+    def _filter_page_async(self, filter_obj: Filter, embed: Optional[str]):
+        async def fetch(page, size):
+            return (await filter_entities_async(self.entity, filter_obj, page, size, embed)).get(self.entity, [])
+        return fetch
+
+    def _endpoint_page(self, query: Query, plan: str):
+        endpoint = f"/{self.entity}/search" if plan == "search" else f"/{self.entity}"
+        params = {"q": query.q} if plan == "search" else dict(self.list_params)
+        if query.embed:
+            params["embed"] = query.embed
+
+        def fetch(page, size):
+            return request("GET", endpoint, params={**params, "page": page, "perPage": size}).get(self.entity, [])
+
+        async def fetch_async(page, size):
+            return (await request_async("GET", endpoint, params={**params, "page": page, "perPage": size})).get(self.entity, [])
+        return fetch, fetch_async
+
+    @staticmethod
+    def _window(fetch_page, offset: int, limit: int, per_page: int) -> List[dict]:
+        size, pages, skip = _windows(offset, limit, per_page)
+        records = []
+        for page in pages:
+            batch = fetch_page(page, size)
+            records.extend(batch)
+            if len(batch) < size:
+                break
+        return records[skip:skip + limit]
+
+    @staticmethod
+    async def _window_async(fetch_page, offset: int, limit: int, per_page: int) -> List[dict]:
+        size, pages, skip = _windows(offset, limit, per_page)
+        records = []
+        # Pages of one window are requested concurrently
+        for batch in await asyncio.gather(*(fetch_page(page, size) for page in pages)):
+            records.extend(batch)
+            if len(batch) < size:
+                break
+        return records[skip:skip + limit]
+
+    def _run(self, plan: str, query: Query, projection: Optional[Projection]) -> Optional[List[Any]]:
+        offset = (query.page - 1) * query.per_page
+        if plan == "mirror":
+            records = query_mirror(*self._mirror_args(query))
+            return None if records is None else self.decode({self.entity: records}, projection)
+        if plan == "search_index":
+            results = self.local_search(query.q, query.page, query.per_page)
+            return None if results is None else project(results, projection)
+        if plan == "filter":
+            fetch = self._filter_page(query.filter(query.branches()[0]), query.embed)
+            records = self._window(fetch, offset, query.per_page, query.per_page)
+        elif plan == "filter_union":
+            results = [self._window(self._filter_page(query.filter(branch), query.embed), 0, offset + query.per_page, query.per_page)
+                       for branch in query.branches()]
+            records = _merge(results, query.order_by)[offset:offset + query.per_page]
+        else:
+            fetch, _ = self._endpoint_page(query, plan)
+            records = self._window(fetch, offset, query.per_page, query.per_page)
+        return self.decode({self.entity: records}, projection)
+
+    async def _run_async(self, plan: str, query: Query, projection: Optional[Projection]) -> Optional[List[Any]]:
+        offset = (query.page - 1) * query.per_page
+        if plan == "mirror":
+            records = await query_mirror_async(*self._mirror_args(query))
+            return None if records is None else self.decode({self.entity: records}, projection)
+        if plan == "search_index":
+            results = self.local_search(query.q, query.page, query.per_page)
+            return None if results is None else project(results, projection)
+        if plan == "filter":
+            fetch = self._filter_page_async(query.filter(query.branches()[0]), query.embed)
+            records = await self._window_async(fetch, offset, query.per_page, query.per_page)
+        elif plan == "filter_union":
+            results = await asyncio.gather(*(
+                self._window_async(self._filter_page_async(query.filter(branch), query.embed), 0, offset + query.per_page, query.per_page)
+                for branch in query.branches()))
+            records = _merge(results, query.order_by)[offset:offset + query.per_page]
+        else:
+            _, fetch = self._endpoint_page(query, plan)
+            records = await self._window_async(fetch, offset, query.per_page, query.per_page)
+        return self.decode({self.entity: records}, projection)
+
+    def _explain(self, query: Query, plan: str, skipped: list, requests: int, results: list, start: float) -> dict:
+        return {
+            "entity": self.entity,
+            "plan": plan,
+            "upstream_requests": requests,
+            "results": len(results),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "skipped": skipped,
+            "notes": self._notes(query, plan),
+            **query.describe(),
+        }
+
+    def find(self, user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+        """Answer a find_* query; with explain, return {"results": [...], "explain": {...}}."""
+        start = time.perf_counter()
+        requests = count_requests()
+        ensure_references(user_input)
+        query = compile_query(self.entity, user_input)
+        skipped = []
+        for plan in self._plans(query, skipped):
+            with span("plan", entity=self.entity, plan=plan):
+                results = self._run(plan, query, projection)
+            if results is not None:
+                break
+            skipped.append({"plan": plan, "reason": FALLBACK_REASONS[plan]})
+        logger.debug(f"find {self.entity}: {plan} plan, {requests[0]} requests")
+        if not explain:
+            return results
+        return {"results": results, "explain": self._explain(query, plan, skipped, requests[0], results, start)}
+
+    async def find_async(self, user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+        """Async variant of find()."""
+        start = time.perf_counter()
+        requests = count_requests()
+        await ensure_references_async(user_input)
+        query = compile_query(self.entity, user_input)
+        skipped = []
+        for plan in self._plans(query, skipped):
+            with span("plan", entity=self.entity, plan=plan):
+                results = await self._run_async(plan, query, projection)
+            if results is not None:
+                break
+            skipped.append({"plan": plan, "reason": FALLBACK_REASONS[plan]})
+        logger.debug(f"find {self.entity}: {plan} plan, {requests[0]} requests")
+        if not explain:
+            return results
+        return {"results": results, "explain": self._explain(query, plan, skipped, requests[0], results, start)}
+
+    def _page_fetchers(self, query: Query) -> List[tuple]:
+        """(sync, async) fetchers of raw pages, one per OR branch, for iterating over every match."""
+        fetchers = []
+        if query.filtered:
+            for branch in query.branches():
+                filter_obj = query.filter(branch)
+                fetchers.append((self._filter_page(filter_obj, query.embed), self._filter_page_async(filter_obj, query.embed)))
+        else:
+            fetchers.append(self._endpoint_page(query, "search" if query.q is not None else "list"))
+        return fetchers
+
+    def iterate(self, user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None,
+                projection: Optional[Projection] = None) -> Iterator[Any]:
+        """Like find(), but follows pagination through every match; OR branches are read one after another."""
+        ensure_references(user_input)
+        query = compile_query(self.entity, user_input, per_page=MAX_PAGE_SIZE)
+        fetchers = self._page_fetchers(query)
+        decode = lambda records: self.decode({self.entity: records}, projection)
+        if len(fetchers) == 1:
+            return iter_pages(fetchers[0][0], per_page=query.per_page, prefetch=prefetch, max_items=max_items, decode=decode)
+        return _distinct((iter_pages(fetch, per_page=query.per_page, prefetch=prefetch, decode=decode) for fetch, _ in fetchers), max_items)
+
+    async def iterate_async(self, user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None,
+                            projection: Optional[Projection] = None) -> AsyncIterator[Any]:
+        """Async variant of iterate()."""
+        await ensure_references_async(user_input)
+        query = compile_query(self.entity, user_input, per_page=MAX_PAGE_SIZE)
+        fetchers = self._page_fetchers(query)
+        decode = lambda records: self.decode({self.entity: records}, projection)
+        seen = set()
+        for _, fetch_async in fetchers:
+            async for record in aiter_pages(fetch_async, per_page=query.per_page, prefetch=prefetch, max_items=max_items, decode=decode):
+                if len(fetchers) > 1:
+                    record_id = _record_id(record)
+                    if record_id in seen:
+                        continue
+                    seen.add(record_id)
+                yield record
+                if max_items is not None and len(fetchers) > 1 and len(seen) >= max_items:
+                    return
+
+
+def _record_id(record):
+    return record.get("id") if isinstance(record, dict) else getattr(record, "id", None)
+
+
+def _distinct(iterators, max_items: Optional[int]) -> Iterator[Any]:
+    seen = set()
+    for records in iterators:
+        for record in records:
+            record_id = _record_id(record)
+            if record_id in seen:
+                continue
+            seen.add(record_id)
+            yield record
+            if max_items is not None and len(seen) >= max_items:
+                return
@@ -0,0 +1,163 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from .config import env_int, env_float
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Methods that may be safely repeated after a 429 or 5xx response
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _header_int(headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter for the given zero-based retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimiter:
+    """
+    Token bucket that paces requests against CapsuleCRM's hourly request quota.
+
+    The bucket holds up to `burst` tokens and refills at the rate that spreads the
+    remaining quota (from the X-RateLimit-* response headers) evenly over the time left
+    until the quota resets. Plenty of budget therefore means no waiting at all, while a
+    nearly exhausted quota slows callers down gradually instead of failing with 429s.
+    A Retry-After from the server pauses every caller until it has passed.
+    """
+
+    def __init__(self, limit: int = 4000, window: float = 3600.0, burst: int = 50, max_wait: float = 120.0):
+        self.limit = limit
+        self.max_wait = max_wait
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.rate = limit / window
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Build a limiter using settings from the environment.
+
+        Environment variables:
+            CAPSULECRM_RATE_BURST: Requests that may be sent back to back before pacing starts (default: 50).
+            CAPSULECRM_RATE_MAX_WAIT: Longest a request waits for budget before failing with 429 (default: 120s).
+        """
+        return cls(burst=env_int("CAPSULECRM_RATE_BURST", 50), max_wait=env_float("CAPSULECRM_RATE_MAX_WAIT", 120.0))
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self) -> float:
+        """Take a token if one is available. Returns 0 on success, otherwise the estimated wait in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> bool:
+        """Block until a request may be sent. Returns False if the budget is exhausted for longer than max_wait."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._try_take()
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            logger.debug(f"Rate limiter pacing request by {wait:.2f}s")
+            # Re-check at least every second, the rate may change as responses arrive
+            time.sleep(min(wait, 1.0))
+
+    async def acquire_async(self) -> bool:
+        """Async variant of acquire() that does not block the event loop while waiting."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._try_take()
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            logger.debug(f"Rate limiter pacing request by {wait:.2f}s")
+            await asyncio.sleep(min(wait, 1.0))
+
+    def update(self, headers):
+        """Re-tune the bucket from the X-RateLimit-* headers of a response."""
+        limit = _header_int(headers, "X-RateLimit-Limit")
+        remaining = _header_int(headers, "X-RateLimit-Remaining")
+        reset = _header_int(headers, "X-RateLimit-Reset")
+        if remaining is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit is not None:
+                self.limit = limit
+            self.remaining = remaining
+            if reset is not None:
+                self.reset_at = float(reset)
+                seconds_left = max(1.0, reset - time.time())
+                # Keep a minimal trickle so callers never wait forever on a stale reset time
+                self.rate = max(remaining / seconds_left, 1.0 / seconds_left)
+            # Never hand out more tokens than the server says are left
+            self.tokens = min(self.tokens, float(remaining))
+
+    def block_for(self, seconds: float):
+        """Hold back every request for the given number of seconds (e.g. from Retry-After)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+    def budget(self) -> dict:
+        """Snapshot of the current request budget."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset_at": datetime.fromtimestamp(self.reset_at, timezone.utc).isoformat() if self.reset_at else None,
+                "seconds_until_reset": max(0, int(self.reset_at - time.time())) if self.reset_at else None,
+                "tokens_available": round(max(self.tokens, 0.0), 2),
+                "requests_per_second": round(self.rate, 3),
+                "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 2),
+            }
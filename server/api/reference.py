@@ -0,0 +1,283 @@
+import time
+import logging
+import threading
+import contextvars
+from typing import Iterable, List, Optional
+from .config import env_float
+from .errors import CapsuleAPIError
+from .utils import request, request_async, get_disk_cache, invalidate_disk_cache, only_if_cached
+from .pagination import iter_pages, aiter_pages
+from .tenants import current_tenant
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# kind -> (endpoint, response key, record fields usable as a name, paginated, default TTL in seconds)
+REFERENCE_KINDS = {
+    "milestones": ("/milestones", "milestones", ("name",), True, 3600.0),
+    "pipelines": ("/pipelines", "pipelines", ("name",), True, 3600.0),
+    "categories": ("/categories", "categories", ("name",), False, 3600.0),
+    "users": ("/users", "users", ("name", "username"), False, 900.0),
+}
+
+# Filter fields whose values may be given by name and are resolved to ids
+FILTER_REFERENCES = {"milestone": "milestones", "owner": "users", "category": "categories"}
+
+
+class ReferenceTable:
+    """An immutable snapshot of one kind of reference data with O(1) lookup by id and by name."""
+
+    def __init__(self, records: List[dict], name_fields: Iterable[str]):
+        self.records = records
+        self.loaded_at = time.monotonic()
+        self.by_id = {record["id"]: record for record in records if "id" in record}
+        self.by_name = {}
+        for record in records:
+            for field in name_fields:
+                name = record.get(field)
+                if isinstance(name, str):
+                    self.by_name.setdefault(name.strip().lower(), record)
+
+
+class ReferenceCache:
+    """
+    Caches rarely changing CapsuleCRM reference data (milestones, pipelines, task
+    categories and users) with a TTL per kind.
+
+    Readers never wait for a refresh: once a kind has been loaded, an expired table
+    keeps being served while a background thread fetches a fresh copy. Only the very
+    first read of a kind that was not warmed blocks on the API.
+    """
+
+    def __init__(self, ttls: Optional[dict] = None):
+        self.ttls = {kind: spec[4] for kind, spec in REFERENCE_KINDS.items()}
+        self.ttls.update(ttls or {})
+        self._tables = {}
+        self._refreshing = set()
+        # Bumped on invalidate so a refresh that started earlier cannot store outdated data
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ReferenceCache":
+        """
+        Build a cache using TTLs from the environment.
+
+        Environment variables:
+            CAPSULECRM_REFERENCE_TTL_<KIND>: TTL in seconds for MILESTONES, PIPELINES, CATEGORIES or USERS.
+        """
+        return cls({kind: env_float(f"CAPSULECRM_REFERENCE_TTL_{kind.upper()}", ttl)
+                    for kind, (_, _, _, _, ttl) in REFERENCE_KINDS.items()})
+
+    def _fetch(self, kind: str) -> ReferenceTable:
+        endpoint, key, name_fields, paginated, _ = REFERENCE_KINDS[kind]
+        if not paginated:
+            return ReferenceTable(request("GET", endpoint).get(key, []), name_fields)
+        records = list(iter_pages(
+            lambda page, size: request("GET", endpoint, params={"page": page, "perPage": size}).get(key, []),
+            prefetch=0,
+        ))
+        return ReferenceTable(records, name_fields)
+
+    async def _fetch_async(self, kind: str) -> ReferenceTable:
+        endpoint, key, name_fields, paginated, _ = REFERENCE_KINDS[kind]
+        if not paginated:
+            return ReferenceTable((await request_async("GET", endpoint)).get(key, []), name_fields)
+
+        async def fetch_page(page, size):
+            data = await request_async("GET", endpoint, params={"page": page, "perPage": size})
+            return data.get(key, [])
+
+        records = [record async for record in aiter_pages(fetch_page, prefetch=0)]
+        return ReferenceTable(records, name_fields)
+
+    def _load_stored(self, kind: str) -> Optional[ReferenceTable]:
+        """The table as last stored in the disk cache, marked expired so it is refreshed; None if it is not stored."""
+        if get_disk_cache() is None:
+            return None
+        try:
+            with only_if_cached():
+                table = self._fetch(kind)
+        except CapsuleAPIError:
+            return None
+        table.loaded_at = float("-inf")
+        logger.debug(f"Loaded {len(table.records)} {kind} from the disk cache")
+        return table
+
+    def _store(self, kind: str, table: ReferenceTable, generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._tables[kind] = table
+            self._refreshing.discard(kind)
+        logger.debug(f"Cached {len(table.records)} {kind}")
+
+    def _refresh_in_background(self, kind: str):
+        with self._lock:
+            if kind in self._refreshing:
+                return
+            self._refreshing.add(kind)
+            generation = self._generation
+
+        def refresh():
+            try:
+                self._store(kind, self._fetch(kind), generation)
+            except Exception as e:
+                logger.warning(f"Background refresh of {kind} failed: {e}")
+                with self._lock:
+                    self._refreshing.discard(kind)
+
+        # Refresh with the account of the call that noticed the table expired
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(refresh,), name=f"capsulecrm-refresh-{kind}", daemon=True).start()
+
+    def peek(self, kind: str) -> Optional[ReferenceTable]:
+        """Return the cached table without ever blocking, scheduling a refresh if it has expired."""
+        table = self._tables.get(kind)
+        if table is not None and time.monotonic() - table.loaded_at > self.ttls[kind]:
+            self._refresh_in_background(kind)
+        return table
+
+    def get(self, kind: str) -> ReferenceTable:
+        """Return the table for a kind, loading it from the API if it has never been loaded."""
+        table = self.peek(kind)
+        if table is None:
+            generation = self._generation
+            table = self._load_stored(kind)
+            if table is not None:
+                self._store(kind, table, generation)
+                self._refresh_in_background(kind)
+                return table
+            table = self._fetch(kind)
+            self._store(kind, table, generation)
+        return table
+
+    async def get_async(self, kind: str) -> ReferenceTable:
+        """Async variant of get()."""
+        table = self.peek(kind)
+        if table is None:
+            generation = self._generation
+            table = self._load_stored(kind)
+            if table is not None:
+                self._store(kind, table, generation)
+                self._refresh_in_background(kind)
+                return table
+            table = await self._fetch_async(kind)
+            self._store(kind, table, generation)
+        return table
+
+    def warm(self, kinds: Optional[Iterable[str]] = None):
+        """
+        Load the given kinds (default: all) in the background. Kinds stored in the disk
+        cache by an earlier run are served from it right away while they are refreshed.
+        """
+        for kind in kinds or REFERENCE_KINDS:
+            if kind not in self._tables:
+                table = self._load_stored(kind)
+                if table is not None:
+                    self._store(kind, table, self._generation)
+                self._refresh_in_background(kind)
+
+    def invalidate(self, kind: Optional[str] = None):
+        """Drop one kind (or everything) so the next read fetches fresh data."""
+        with self._lock:
+            self._generation += 1
+            if kind is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(kind, None)
+
+    def lookup(self, kind: str, key) -> Optional[dict]:
+        """Find a cached record by id or case-insensitive name without touching the API."""
+        table = self.peek(kind)
+        if table is None:
+            return None
+        if isinstance(key, int) or (isinstance(key, str) and key.isdigit()):
+            return table.by_id.get(int(key))
+        if isinstance(key, str):
+            return table.by_name.get(key.strip().lower())
+        return None
+
+
+_reference_cache = ReferenceCache.from_env()
+
+
+def get_reference_cache() -> ReferenceCache:
+    """Get the reference data cache of the account the current call works on."""
+    tenant = current_tenant()
+    return _reference_cache if tenant is None else tenant.cache("references", ReferenceCache.from_env)
+
+
+def warm_reference_cache():
+    """Start loading all reference data in the background. Called once at server startup."""
+    _reference_cache.warm()
+
+
+def invalidate_reference_data(kind: Optional[str] = None):
+    """
+    Invalidate cached reference data.
+
+    Args:
+        kind: One of milestones, pipelines, categories, users; None invalidates everything
+    """
+    if kind is not None and kind not in REFERENCE_KINDS:
+        raise ValueError(f"Unknown reference data kind: {kind}")
+    get_reference_cache().invalidate(kind)
+    # Otherwise the next read would be answered with the stored copy again
+    for name in [kind] if kind else REFERENCE_KINDS:
+        invalidate_disk_cache(REFERENCE_KINDS[name][0])
+
+
+def _reference_field(key: str) -> Optional[str]:
+    """The reference field a find_* key filters on, with or without an operator suffix ('owner', 'owner_not')."""
+    if key in FILTER_REFERENCES:
+        return key
+    field = key.rpartition("_")[0]
+    return field if field in FILTER_REFERENCES else None
+
+
+def _names(value) -> List[str]:
+    """The names (not ids) in a filter value: a value, a list of them or {'operator': ..., 'value': ...}."""
+    if isinstance(value, dict) and "operator" in value:
+        value = value.get("value")
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [v for v in values if isinstance(v, str) and not v.isdigit()]
+
+
+def _kinds_to_resolve(user_input: dict) -> set:
+    """Reference data needed to resolve the names in user_input, walking the keys and values api.query.compile_query does."""
+    filters = [user_input]
+    if isinstance(user_input.get("any"), list):
+        filters += [alternative for alternative in user_input["any"] if isinstance(alternative, dict)]
+    kinds = set()
+    for items in filters:
+        for key, value in items.items():
+            field = _reference_field(key)
+            if field is not None and _names(value):
+                kinds.add(FILTER_REFERENCES[field])
+    return kinds
+
+
+def ensure_references(user_input: dict):
+    """Make sure the reference data needed to resolve names in user_input is loaded."""
+    for kind in _kinds_to_resolve(user_input):
+        try:
+            get_reference_cache().get(kind)
+        except Exception as e:
+            logger.warning(f"Could not load {kind} to resolve filter names: {e}")
+
+
+async def ensure_references_async(user_input: dict):
+    """Async variant of ensure_references()."""
+    for kind in _kinds_to_resolve(user_input):
+        try:
+            await get_reference_cache().get_async(kind)
+        except Exception as e:
+            logger.warning(f"Could not load {kind} to resolve filter names: {e}")
+
+
+def resolve_filter_value(field: str, value):
+    """Replace a milestone, owner or category name with its id if it is known; otherwise return value unchanged."""
+    kind = FILTER_REFERENCES.get(field)
+    if kind is None or not isinstance(value, str) or value.isdigit():
+        return value
+    record = get_reference_cache().lookup(kind, value)
+    return str(record["id"]) if record is not None else value
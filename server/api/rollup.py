@@ -0,0 +1,233 @@
+import math
+import asyncio
+import logging
+from array import array
+from itertools import islice
+from operator import mul
+from typing import Dict, Iterable, List, Optional
+from .mirror import get_mirror
+from .reference import get_reference_cache
+from .opportunities import iter_opportunities, iter_opportunities_async
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+GROUP_BY_FIELDS = ("milestone", "owner", "currency", "close_month")
+
+_MISSING = math.nan
+
+
+class _Codes:
+    """Maps the distinct values of a categorical column to small integer codes."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class OpportunityColumns:
+    """
+    Opportunities held as one typed array per field instead of one dict per record.
+
+    Records are appended a page at a time and can be discarded right after, so memory
+    stays at a few dozen bytes per opportunity. Categorical fields (milestone, owner,
+    currency, close month) are stored as integer codes into a table of distinct values.
+    """
+
+    def __init__(self):
+        self.amount = array("d")
+        self.probability = array("d")
+        self.duration = array("d")
+        self.fixed = array("b")
+        self.closed = array("b")
+        self.milestone = array("l")
+        self.owner = array("l")
+        self.currency = array("l")
+        self.close_month = array("l")
+        self.milestones = _Codes()
+        self.owners = _Codes()
+        self.currencies = _Codes()
+        self.close_months = _Codes()
+        self.owner_names: Dict[int, str] = {}
+        self.milestone_names: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    def extend(self, records: Iterable[dict]):
+        for record in records:
+            self.append(record)
+
+    def append(self, record: dict):
+        value = record.get("value") or {}
+        amount = value.get("amount")
+        probability = record.get("probability")
+        duration = record.get("duration")
+        basis = record.get("durationBasis")
+        milestone = record.get("milestone") or {}
+        owner = record.get("owner") or {}
+        close_on = record.get("expectedCloseOn")
+
+        self.amount.append(_MISSING if amount is None else float(amount))
+        self.probability.append(_MISSING if probability is None else float(probability))
+        self.duration.append(_MISSING if duration is None else float(duration))
+        self.fixed.append(not basis or basis == "FIXED")
+        self.closed.append(record.get("closedOn") is not None)
+        self.milestone.append(self.milestones.code(milestone.get("id")))
+        self.owner.append(self.owners.code(owner.get("id")))
+        self.currency.append(self.currencies.code(value.get("currency")))
+        self.close_month.append(self.close_months.code(close_on[:7] if close_on else None))
+        if "name" in milestone:
+            self.milestone_names.setdefault(milestone.get("id"), milestone["name"])
+        if "name" in owner:
+            self.owner_names.setdefault(owner.get("id"), owner["name"])
+
+    def total_values(self) -> array:
+        """
+        Per-opportunity total value with the semantics of OpportunityCreate.total_value:
+        amount times duration unless the duration basis is FIXED or no duration is set.
+        Missing amounts are NaN.
+        """
+        factors = array("d", (1.0 if fixed or duration != duration else duration
+                              for fixed, duration in zip(self.fixed, self.duration)))
+        return array("d", map(mul, self.amount, factors))
+
+    def weighted_values(self, totals: array) -> array:
+        """
+        Per-opportunity probability-weighted value, as OpportunityCreate.current_value:
+        total value times probability / 100. NaN when amount or probability is missing.
+        """
+        return array("d", map(mul, totals, (p / 100 for p in self.probability)))
+
+    def _column(self, field: str) -> tuple:
+        return {
+            "milestone": (self.milestone, self.milestones),
+            "owner": (self.owner, self.owners),
+            "currency": (self.currency, self.currencies),
+            "close_month": (self.close_month, self.close_months),
+        }[field]
+
+    def _label(self, field: str, value):
+        if field == "milestone":
+            name = self.milestone_names.get(value)
+            if name is None and value is not None:
+                record = get_reference_cache().lookup("milestones", value)
+                name = record.get("name") if record else None
+            return name
+        if field == "owner":
+            return self.owner_names.get(value)
+        return None
+
+    def rollup(self, group_by: List[str], include_closed: bool = False) -> dict:
+        """
+        Sum unweighted and weighted value per group.
+
+        Args:
+            group_by: Fields from GROUP_BY_FIELDS; an empty list sums everything
+            include_closed: Also count opportunities that are already won or lost
+
+        Returns:
+            Groups ordered by weighted value, each with the group key(s), the number of
+            opportunities and their total and weighted value. Opportunities without a
+            probability count towards total_value only and are reported in
+            without_probability.
+        """
+        unknown = [field for field in group_by if field not in GROUP_BY_FIELDS]
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(unknown)}; use any of {', '.join(GROUP_BY_FIELDS)}")
+
+        totals = self.total_values()
+        weighted = self.weighted_values(totals)
+
+        # Combine the codes of all group fields into one integer key per opportunity
+        keys = array("l", [0]) * len(self)
+        for field in group_by:
+            codes, table = self._column(field)
+            width = len(table.values)
+            keys = array("l", map(lambda key, code: key * width + code, keys, codes))
+
+        count, total_sum, weighted_sum, unweighted_only = {}, {}, {}, {}
+        for key, closed, total, value in zip(keys, self.closed, totals, weighted):
+            if closed and not include_closed:
+                continue
+            count[key] = count.get(key, 0) + 1
+            if total == total:
+                total_sum[key] = total_sum.get(key, 0.0) + total
+            if value == value:
+                weighted_sum[key] = weighted_sum.get(key, 0.0) + value
+            elif total == total:
+                unweighted_only[key] = unweighted_only.get(key, 0) + 1
+
+        groups = []
+        for key in count:
+            values = []
+            remainder = key
+            for field in reversed(group_by):
+                table = self._column(field)[1]
+                remainder, code = divmod(remainder, len(table.values))
+                values.append(table.values[code])
+            group = {}
+            for field, value in zip(group_by, reversed(values)):
+                group[field] = value
+                label = self._label(field, value)
+                if label is not None:
+                    group[f"{field}_name"] = label
+            group.update({
+                "count": count[key],
+                "total_value": round(total_sum.get(key, 0.0), 2),
+                "weighted_value": round(weighted_sum.get(key, 0.0), 2),
+            })
+            if unweighted_only.get(key):
+                group["without_probability"] = unweighted_only[key]
+            groups.append(group)
+        groups.sort(key=lambda group: group["weighted_value"], reverse=True)
+
+        return {
+            "group_by": group_by,
+            "opportunities": sum(count.values()),
+            # Values in different currencies are summed as they are unless grouped by currency
+            "currencies": [currency for currency in self.currencies.values if currency is not None],
+            "groups": groups,
+        }
+
+
+def _mirror_is_fresh() -> bool:
+    mirror = get_mirror()
+    return mirror is not None and mirror.is_fresh("opportunities")
+
+
+def load_opportunity_columns(max_items: Optional[int] = None) -> OpportunityColumns:
+    """Stream every opportunity (from the mirror when fresh, otherwise the API) into columns."""
+    columns = OpportunityColumns()
+    if _mirror_is_fresh():
+        columns.extend(islice(get_mirror().records("opportunities"), max_items))
+    else:
+        columns.extend(iter_opportunities(max_items=max_items))
+    return columns
+
+
+async def load_opportunity_columns_async(max_items: Optional[int] = None) -> OpportunityColumns:
+    """Async variant of load_opportunity_columns(); reading the mirror happens in a worker thread."""
+    if _mirror_is_fresh():
+        return await asyncio.to_thread(load_opportunity_columns, max_items)
+    columns = OpportunityColumns()
+    async for record in iter_opportunities_async(max_items=max_items):
+        columns.append(record)
+    return columns
+
+
+def rollup_opportunities(group_by: List[str], include_closed: bool = False, max_items: Optional[int] = None) -> dict:
+    """Sum pipeline value over all opportunities, grouped by the given fields."""
+    return load_opportunity_columns(max_items).rollup(group_by, include_closed)
+
+
+async def rollup_opportunities_async(group_by: List[str], include_closed: bool = False, max_items: Optional[int] = None) -> dict:
+    """Async variant of rollup_opportunities()."""
+    columns = await load_opportunity_columns_async(max_items)
+    return await asyncio.to_thread(columns.rollup, group_by, include_closed)
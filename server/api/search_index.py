@@ -0,0 +1,389 @@
+import re
+import math
+import time
+import heapq
+import bisect
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+from .config import env_bool, env_float
+from .models import Party
+from .tenants import current_tenant
+from .utils import no_store
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Minimum trigram (Dice) similarity for a fuzzy match
+FUZZY_THRESHOLD = 0.5
+# Cap on tokens expanded per prefix or fuzzy term, so one-letter queries stay cheap
+MAX_EXPANSIONS = 500
+# Queries made only of these characters and at least this many digits are phone lookups
+_PHONE_QUERY = re.compile(r"[\d\s+()./-]+")
+_MIN_PHONE_DIGITS = 5
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so "Zürich" matches "zurich"."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _WORD.findall(_fold(text))
+
+
+def _digits(text: Optional[str]) -> str:
+    return re.sub(r"\D", "", text or "")
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def party_tokens(party: Party) -> tuple:
+    """Return (word tokens, phone digit strings) to index for a party."""
+    words = set()
+    for text in (getattr(party, "name", None), getattr(party, "firstName", None), getattr(party, "lastName", None)):
+        words.update(tokenize(text))
+    for email in party.emailAddresses or []:
+        address = _fold(email.address or "")
+        if address:
+            words.add(address)
+            words.update(tokenize(address))
+    for address in party.addresses or []:
+        words.update(tokenize(address.city))
+    phones = {_digits(phone.number) for phone in party.phoneNumbers or []}
+    phones.discard("")
+    return words, phones
+
+
+class _SortedKeys:
+    """
+    Sorted list of unique keys supporting prefix range scans.
+
+    Added keys are appended and the list is re-sorted on the next lookup, so adding
+    many keys in a row (building the index) costs one sort instead of one insert each.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self._sorted = True
+
+    def _sort(self):
+        if not self._sorted:
+            self.keys.sort()
+            self._sorted = True
+
+    def add(self, key: str):
+        # Callers only add keys that are not present yet
+        self.keys.append(key)
+        self._sorted = False
+
+    def remove(self, key: str):
+        self._sort()
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def with_prefix(self, prefix: str, limit: int = MAX_EXPANSIONS) -> List[str]:
+        self._sort()
+        start = bisect.bisect_left(self.keys, prefix)
+        stop = bisect.bisect_left(self.keys, prefix + "\uffff", lo=start)
+        return self.keys[start:min(stop, start + limit)]
+
+
+class PartyIndex:
+    """
+    In-process inverted index over party names, email addresses, cities and phone numbers.
+
+    Words match exactly or by prefix; a word with no such match falls back to trigram
+    fuzzy matching, so misspellings like "mueler" still find "Mueller". Phone queries
+    match on normalized digits, either as a prefix or as a suffix (a number typed
+    without its country code). Every query word must match for a party to be returned.
+
+    Parties are added or replaced one at a time, so the index can be kept current as
+    parties are fetched or changed.
+    """
+
+    def __init__(self):
+        self.complete = False
+        self.built_at = time.monotonic()
+        self._parties: Dict[int, Party] = {}
+        self._doc_terms: Dict[int, tuple] = {}
+        # Lists rather than sets: they take a fraction of the memory, and entries are only
+        # removed when a party's indexed fields change, which is rare
+        self._postings: Dict[str, List[int]] = {}
+        self._words = _SortedKeys()
+        self._trigrams: Dict[str, List[str]] = {}
+        self._phones: Dict[str, List[int]] = {}
+        self._phone_prefixes = _SortedKeys()
+        self._phone_suffixes = _SortedKeys()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._parties)
+
+    def _unlink(self, party_id: int):
+        words, phones = self._doc_terms.pop(party_id, ((), ()))
+        for word in words:
+            ids = self._postings[word]
+            ids.remove(party_id)
+            if not ids:
+                del self._postings[word]
+                self._words.remove(word)
+                for trigram in _trigrams(word):
+                    words_with_trigram = self._trigrams[trigram]
+                    words_with_trigram.remove(word)
+                    if not words_with_trigram:
+                        del self._trigrams[trigram]
+        for phone in phones:
+            ids = self._phones[phone]
+            ids.remove(party_id)
+            if not ids:
+                del self._phones[phone]
+                self._phone_prefixes.remove(phone)
+                self._phone_suffixes.remove(phone[::-1])
+
+    def add(self, parties: Iterable[Party]):
+        """Add parties, replacing earlier versions of the same parties."""
+        with self._lock:
+            for party in parties:
+                if party is None or party.id is None:
+                    continue
+                words, phones = party_tokens(party)
+                terms = (tuple(sorted(words)), tuple(sorted(phones)))
+                self._parties[party.id] = party
+                if self._doc_terms.get(party.id) == terms:
+                    continue
+                self._unlink(party.id)
+                self._doc_terms[party.id] = terms
+                for word in words:
+                    ids = self._postings.get(word)
+                    if ids is None:
+                        ids = self._postings[word] = []
+                        self._words.add(word)
+                        for trigram in _trigrams(word):
+                            self._trigrams.setdefault(trigram, []).append(word)
+                    ids.append(party.id)
+                for phone in phones:
+                    ids = self._phones.get(phone)
+                    if ids is None:
+                        ids = self._phones[phone] = []
+                        self._phone_prefixes.add(phone)
+                        self._phone_suffixes.add(phone[::-1])
+                    ids.append(party.id)
+
+    def remove(self, party_id: int):
+        with self._lock:
+            self._unlink(party_id)
+            self._parties.pop(party_id, None)
+
+    def _fuzzy(self, term: str) -> Dict[str, float]:
+        grams = _trigrams(term)
+        # A word reaching the threshold shares at least `required` trigrams with the term,
+        # so it must contain one of the len(grams) - required + 1 rarest ones: only words
+        # listed under those need to be scored
+        required = math.ceil(FUZZY_THRESHOLD * len(grams) / (2 - FUZZY_THRESHOLD))
+        rarest = sorted(grams, key=lambda trigram: len(self._trigrams.get(trigram, ())))
+        candidates = set()
+        for trigram in rarest[:len(grams) - required + 1]:
+            candidates.update(self._trigrams.get(trigram, ()))
+        scored = []
+        for word in candidates:
+            similarity = 2 * len(grams & _trigrams(word)) / (len(grams) + len(word))  # a word has len(word) trigrams
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((similarity, word))
+        return {word: similarity for similarity, word in heapq.nlargest(MAX_EXPANSIONS, scored)}
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        scores = {}
+        for word in self._words.with_prefix(term):
+            weight = 3.0 if word == term else 2.0
+            for party_id in self._postings[word]:
+                scores[party_id] = max(scores.get(party_id, 0.0), weight)
+        if not scores and len(term) >= 3:
+            for word, similarity in self._fuzzy(term).items():
+                for party_id in self._postings[word]:
+                    scores[party_id] = max(scores.get(party_id, 0.0), similarity)
+        return scores
+
+    def _phone_scores(self, digits: str) -> Dict[int, float]:
+        scores = {}
+        for phone in self._phone_prefixes.with_prefix(digits):
+            for party_id in self._phones[phone]:
+                scores[party_id] = 3.0 if phone == digits else 2.0
+        for reversed_phone in self._phone_suffixes.with_prefix(digits[::-1]):
+            for party_id in self._phones[reversed_phone[::-1]]:
+                scores.setdefault(party_id, 2.0)
+        return scores
+
+    def search(self, q: str, limit: Optional[int] = None) -> List[Party]:
+        """Return parties matching every word of q, best matches first."""
+        with self._lock:
+            digits = _digits(q)
+            if _PHONE_QUERY.fullmatch(q.strip()) and len(digits) >= _MIN_PHONE_DIGITS:
+                scores = self._phone_scores(digits)
+            else:
+                scores = None
+                terms = tokenize(q)
+                # A whole email address is indexed as one word as well as by its parts
+                if "@" in q:
+                    terms = [_fold(q.strip())]
+                for term in terms:
+                    term_scores = self._term_scores(term)
+                    if scores is None:
+                        scores = term_scores
+                    else:
+                        scores = {i: s + term_scores[i] for i, s in scores.items() if i in term_scores}
+                    if not scores:
+                        break
+            key = lambda item: (-item[1], item[0])
+            if limit is None:
+                ranked = sorted((scores or {}).items(), key=key)
+            else:
+                ranked = heapq.nsmallest(limit, (scores or {}).items(), key=key)
+            return [self._parties[party_id] for party_id, _ in ranked]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "parties": len(self._parties),
+                "words": len(self._postings),
+                "trigrams": len(self._trigrams),
+                "phones": len(self._phones),
+                "complete": self.complete,
+                "age_seconds": round(time.monotonic() - self.built_at, 1),
+            }
+
+
+class PartySearch:
+    """
+    Keeps a PartyIndex of every party and decides when search_parties may use it.
+
+    The index is built in the background, from the local mirror when it is fresh and
+    from the API otherwise, and rebuilt once it is older than `max_age` so parties
+    created or deleted elsewhere are picked up. Between rebuilds, parties fetched or
+    changed through this server are updated in place.
+    """
+
+    def __init__(self, enabled: bool = False, max_age: float = 3600.0):
+        self.enabled = enabled
+        self.max_age = max_age
+        self.index = PartyIndex()
+        self._building = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "PartySearch":
+        """
+        Build from the environment.
+
+        Environment variables:
+            CAPSULECRM_SEARCH_INDEX: Set to 1 to build and search the local party index.
+            CAPSULECRM_SEARCH_INDEX_MAX_AGE: Seconds after which the index is rebuilt.
+        """
+        return cls(enabled=env_bool("CAPSULECRM_SEARCH_INDEX"), max_age=env_float("CAPSULECRM_SEARCH_INDEX_MAX_AGE", 3600.0))
+
+    def _load(self) -> Iterable[Party]:
+        # Imported here because the parties module feeds this index
+        from .mirror import get_mirror
+        from .parties import iter_parties, _to_party
+        mirror = get_mirror()
+        if mirror is not None and mirror.is_fresh("parties"):
+            return (_to_party(record) for record in mirror.records("parties"))
+        return iter_parties()
+
+    def build(self):
+        """Build a new index from scratch and swap it in once complete."""
+        started = time.perf_counter()
+        index = PartyIndex()
+        try:
+            with no_store():
+                index.add(self._load())
+            index.complete = True
+            self.index = index
+            logger.info(f"Built party search index of {len(index)} parties in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logger.warning(f"Building the party search index failed: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def build_in_background(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.build, name="capsulecrm-party-index", daemon=True).start()
+
+    def ready(self) -> bool:
+        """Whether the index holds every party and is recent enough to answer searches."""
+        if not self.enabled:
+            return False
+        index = self.index
+        if time.monotonic() - index.built_at > self.max_age:
+            self.build_in_background()
+        return index.complete
+
+    def add(self, parties: Iterable[Party]):
+        if self.enabled:
+            self.index.add(parties)
+
+    def remove(self, party_ids: Iterable[int]):
+        if self.enabled:
+            for party_id in party_ids:
+                self.index.remove(party_id)
+
+
+_party_search = PartySearch.from_env()
+
+
+def get_party_search() -> PartySearch:
+    """Get the process-wide party search index."""
+    return _party_search
+
+
+def build_party_index():
+    """Start building the party search index in the background if it is enabled. Called once at server startup."""
+    _party_search.build_in_background()
+
+
+def index_parties(parties: Iterable[Party]):
+    """Add or refresh parties that were just fetched or changed. The index only holds the process's own account."""
+    if current_tenant() is None:
+        _party_search.add(parties)
+
+
+def unindex_parties(party_ids: Iterable[int]):
+    """Remove parties that were deleted."""
+    if current_tenant() is None:
+        _party_search.remove(party_ids)
+
+
+def search_party_index(q: str, page: int = 1, per_page: int = 50) -> Optional[List[Party]]:
+    """
+    Search parties locally.
+
+    Returns:
+        One page of matches, or None if the index is not ready or has no match for q
+        (the party may have been created since the index was built), in which case
+        the caller should ask the API, as it also should when the call works on
+        another account.
+    """
+    if current_tenant() is not None or not _party_search.ready():
+        return None
+    start = (max(page, 1) - 1) * per_page
+    matches = _party_search.index.search(q, limit=start + per_page)
+    if not matches:
+        return None
+    return matches[start:start + per_page]
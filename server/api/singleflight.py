@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Lets concurrent identical calls share one execution and its result.
+
+    The first caller for a key runs the call; callers arriving with the same key while
+    it is in flight wait for it and receive the same result (or exception) instead of
+    running it again. Nothing is kept once the call finishes, so this is not a cache:
+    a call made after the previous one returned runs again.
+
+    Threads and event loops are tracked separately; an async call is only shared with
+    other callers on the same loop. Results are shared, not copied, so callers must
+    not modify them.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]):
+        """Run fn(), or wait for an identical call already in flight in another thread."""
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            logger.debug(f"Sharing in-flight call {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, make_call: Callable[[], Awaitable[Any]]):
+        """
+        Async variant of do(). The call runs as its own task, so a caller that is
+        cancelled does not cancel it for the others waiting on it.
+        """
+        if not self.enabled:
+            return await make_call()
+        loop = asyncio.get_running_loop()
+        loop_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            if task is None:
+                task = loop.create_task(make_call())
+                self._tasks[loop_key] = task
+                task.add_done_callback(lambda done: self._forget(loop_key, done))
+                self.calls += 1
+            else:
+                logger.debug(f"Sharing in-flight call {key}")
+                self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, loop_key: tuple, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(loop_key) is task:
+                del self._tasks[loop_key]
+        # Mark the outcome as retrieved even if every caller was cancelled meanwhile
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Return how many calls ran and how many callers shared a call already in flight."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "requests": self.calls,
+                "deduplicated": self.shared,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
@@ -1,83 +1,155 @@
-from .utils import request, filter_entities
+from .utils import request, request_async, filter_entities, filter_entities_async
 from .models import Task, Filter, Condition
-from typing import List, Optional
+from .decode import decode
+from .entity_cache import get_entity_cache
+from .batch import fetch_many, fetch_many_async
+from .bulk import run_bulk, run_bulk_async
+from .query import QueryPlanner
+from .projection import Projection, project
+from .pagination import iter_pages, aiter_pages, MAX_PAGE_SIZE, DEFAULT_PREFETCH
+from .tracing import traced
+from typing import AsyncIterator, Iterator, List, Optional
 
-def list_tasks(page: int = 1, per_page: int = 50, status: str = "open") -> List[Task]:
+@traced
+def _to_tasks(data: dict, projection: Optional[Projection] = None) -> List[Task]:
+    if projection is not None:
+        return projection.apply_all(data.get("tasks", []))
+    return [decode(Task, task) for task in data.get("tasks", [])]
+
+@traced
+def list_tasks(page: int = 1, per_page: int = 50, status: str = "open", projection: Optional[Projection] = None) -> List[Task]:
     data = request("GET", "/tasks", params={"page": page, "perPage": per_page, "status": status})
-    return [Task(**task) for task in data.get("tasks", [])]
+    return _to_tasks(data, projection)
+
+@traced
+async def list_tasks_async(page: int = 1, per_page: int = 50, status: str = "open", projection: Optional[Projection] = None) -> List[Task]:
+    data = await request_async("GET", "/tasks", params={"page": page, "perPage": per_page, "status": status})
+    return _to_tasks(data, projection)
 
-def search_tasks(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None) -> List[Task]:
+def _search_params(q: str, page: int, per_page: int, embed: Optional[str]) -> dict:
     params = {"q": q, "page": page, "perPage": per_page}
     if embed:
         params["embed"] = embed
-    data = request("GET", "/tasks/search", params=params)
-    return [Task(**task) for task in data.get("tasks", [])]
+    return params
+
+@traced
+def search_tasks(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Task]:
+    data = request("GET", "/tasks/search", params=_search_params(q, page, per_page, embed))
+    return _to_tasks(data, projection)
+
+@traced
+async def search_tasks_async(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Task]:
+    data = await request_async("GET", "/tasks/search", params=_search_params(q, page, per_page, embed))
+    return _to_tasks(data, projection)
+
+def _to_task(data: dict) -> Task:
+    return decode(Task, data["task"])
+
+def _cache_task(data: dict) -> Task:
+    task = _to_task(data)
+    get_entity_cache().store_record("tasks", data["task"], task)
+    return task
+
+@traced
+def get_task(task_id: int, projection: Optional[Projection] = None) -> Task:
+    return project(get_entity_cache().get("tasks", task_id, "task", _to_task), projection)
 
-def get_task(task_id: int) -> Task:
-    data = request("GET", f"/tasks/{task_id}")
-    return Task(**data["task"])
+@traced
+async def get_task_async(task_id: int, projection: Optional[Projection] = None) -> Task:
+    return project(await get_entity_cache().get_async("tasks", task_id, "task", _to_task), projection)
 
+@traced
+def get_tasks(task_ids: List[int], projection: Optional[Projection] = None) -> dict:
+    """Fetch several tasks at once; returns {"tasks": [...] in input order, "missing": [ids]}."""
+    return fetch_many("tasks", "task", task_ids, lambda record: decode(Task, record), projection)
+
+@traced
+async def get_tasks_async(task_ids: List[int], projection: Optional[Projection] = None) -> dict:
+    return await fetch_many_async("tasks", "task", task_ids, lambda record: decode(Task, record), projection)
+
+@traced
 def create_task(task: Task) -> Task:
     data = request("POST", "/tasks", json={"task": task.dict(exclude_none=True)})
-    return Task(**data["task"])
+    return _cache_task(data)
 
+@traced
+async def create_task_async(task: Task) -> Task:
+    data = await request_async("POST", "/tasks", json={"task": task.dict(exclude_none=True)})
+    return _cache_task(data)
+
+@traced
 def update_task(task_id: int, task: Task) -> Task:
     data = request("PUT", f"/tasks/{task_id}", json={"task": task.dict(exclude_none=True)})
-    return Task(**data["task"])
+    return _cache_task(data)
+
+@traced
+async def update_task_async(task_id: int, task: Task) -> Task:
+    data = await request_async("PUT", f"/tasks/{task_id}", json={"task": task.dict(exclude_none=True)})
+    return _cache_task(data)
+
+@traced
+def bulk_create_tasks(tasks: List[Task], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    """Create many tasks concurrently; see run_bulk() for the per-item report."""
+    return run_bulk(create_task, tasks, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+async def bulk_create_tasks_async(tasks: List[Task], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    return await run_bulk_async(create_task_async, tasks, stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+def bulk_update_tasks(tasks: List[Task], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    """Update many tasks, each identified by its id, concurrently."""
+    return run_bulk(lambda task: update_task(task.id, task), tasks, stop_on_error=stop_on_error, concurrency=concurrency)
 
-def filter_tasks(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None) -> List[Task]:
+@traced
+async def bulk_update_tasks_async(tasks: List[Task], stop_on_error: bool = False, concurrency: Optional[int] = None) -> dict:
+    return await run_bulk_async(lambda task: update_task_async(task.id, task), tasks,
+                                stop_on_error=stop_on_error, concurrency=concurrency)
+
+@traced
+def filter_tasks(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Task]:
     data = filter_entities("tasks", filter_obj, page, per_page, embed)
-    return [Task(**task) for task in data.get("tasks", [])]
-
-def find_tasks(user_input: dict):
-    # Extended filterable fields based on CapsuleCRM API documentation
-    filterable_fields = {
-        "status", "tag", "dueOn", "owner", "id", "category", "party", 
-        "opportunity", "completedOn", "description", "addedOn", "updatedOn"
-    }
-    
-    # Extract pagination and embed parameters
-    page = user_input.get("page", 1)
-    per_page = user_input.get("per_page", 50)
-    embed = user_input.get("embed")
-    
-    # Build filter conditions with operator support
-    filter_conditions = []
-    for key in filterable_fields:
-        if key in user_input:
-            value = user_input[key]
-            operator = "is"  # default operator
-            
-            # Handle operator specification in field names like "dueOn_after"
-            if "_" in key:
-                field_name, op_suffix = key.split("_", 1)
-                if field_name in filterable_fields:
-                    operator_map = {
-                        "after": "is after",
-                        "before": "is before", 
-                        "contains": "contains",
-                        "starts": "starts with",
-                        "ends": "ends with",
-                        "gt": "is greater than",
-                        "lt": "is less than",
-                        "within": "is within last",
-                        "not": "is not"
-                    }
-                    operator = operator_map.get(op_suffix, "is")
-                    key = field_name
-            
-            # Handle operator specified in value dict
-            if isinstance(value, dict) and "operator" in value:
-                operator = value["operator"]
-                value = value["value"]
-            
-            filter_conditions.append(Condition(field=key, operator=operator, value=str(value)))
-    
-    # Decide whether to use filtering, search, or list
-    if filter_conditions:
-        filter_obj = Filter(conditions=filter_conditions)
-        return filter_tasks(filter_obj, page, per_page, embed)
-    elif "q" in user_input:
-        return search_tasks(user_input["q"], page, per_page, embed)
-    else:
-        return list_tasks(page, per_page) 
\ No newline at end of file
+    return _to_tasks(data, projection)
+
+@traced
+async def filter_tasks_async(filter_obj: Filter, page: int = 1, per_page: int = 50, embed: Optional[str] = None, projection: Optional[Projection] = None) -> List[Task]:
+    data = await filter_entities_async("tasks", filter_obj, page, per_page, embed)
+    return _to_tasks(data, projection)
+
+# find_* queries are compiled and planned in api.query; without conditions find_tasks lists open tasks
+_planner = QueryPlanner("tasks", _to_tasks, list_params={"status": "open"},
+                        list_conditions=[Condition(field="status", operator="is", value="open")])
+
+@traced
+def find_tasks(user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+    """Find tasks by filters, free text or neither (see QueryPlanner); with explain, also report how the query was answered."""
+    return _planner.find(user_input, projection, explain)
+
+@traced
+async def find_tasks_async(user_input: dict, projection: Optional[Projection] = None, explain: bool = False):
+    return await _planner.find_async(user_input, projection, explain)
+
+def iter_tasks(status: str = "open", per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Task]:
+    return iter_pages(lambda page, size: list_tasks(page, size, status, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_tasks_async(status: str = "open", per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Task]:
+    return aiter_pages(lambda page, size: list_tasks_async(page, size, status, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_search_tasks(q: str, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Task]:
+    return iter_pages(lambda page, size: search_tasks(q, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_search_tasks_async(q: str, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Task]:
+    return aiter_pages(lambda page, size: search_tasks_async(q, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_filter_tasks(filter_obj: Filter, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Task]:
+    return iter_pages(lambda page, size: filter_tasks(filter_obj, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_filter_tasks_async(filter_obj: Filter, embed: Optional[str] = None, per_page: int = MAX_PAGE_SIZE, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Task]:
+    return aiter_pages(lambda page, size: filter_tasks_async(filter_obj, page, size, embed, projection), per_page=per_page, prefetch=prefetch, max_items=max_items)
+
+def iter_find_tasks(user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> Iterator[Task]:
+    """Like find_tasks(), but follows pagination through every matching task."""
+    return _planner.iterate(user_input, prefetch, max_items, projection)
+
+def iter_find_tasks_async(user_input: dict, prefetch: int = DEFAULT_PREFETCH, max_items: Optional[int] = None, projection: Optional[Projection] = None) -> AsyncIterator[Task]:
+    return _planner.iterate_async(user_input, prefetch, max_items, projection)
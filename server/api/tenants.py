@@ -0,0 +1,197 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+from .client import ClientManager
+from .config import env_int, env_float, env_bool
+from .ratelimit import RateLimiter
+from .singleflight import SingleFlight
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# The account the current tool call works on; None is the process's own (CAPSULECRM_ACCESS_TOKEN)
+_current_tenant: ContextVar[Optional["Tenant"]] = ContextVar("capsulecrm_tenant", default=None)
+
+
+def tenant_key(token: Optional[str]) -> str:
+    """Short name for an account in logs and stats; the token itself is never shown."""
+    return hashlib.sha256(token.encode()).hexdigest()[:12] if token else "-"
+
+
+class Tenant:
+    """
+    One CapsuleCRM account: its access token, its own connection pool, request
+    budget and request coalescing, and its own namespace of caches (see cache()).
+    """
+
+    def __init__(self, token: Optional[str], client_manager: ClientManager, rate_limiter: RateLimiter, singleflight: SingleFlight):
+        self.token = token
+        self.key = tenant_key(token)
+        self.client_manager = client_manager
+        self.rate_limiter = rate_limiter
+        self.singleflight = singleflight
+        self.active = 0
+        self.last_used = time.monotonic()
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def cache(self, name: str, factory: Callable[[], object]):
+        """This account's cache called `name`, created with factory() on first use."""
+        cache = self._caches.get(name)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.get(name)
+                if cache is None:
+                    cache = self._caches[name] = factory()
+        return cache
+
+    def close(self):
+        """Drop the caches and close the connection pools."""
+        with self._lock:
+            self._caches.clear()
+        self.client_manager.discard()
+
+    async def aclose(self):
+        """Async variant of close(); must be awaited on the loop that uses the async pool."""
+        with self._lock:
+            self._caches.clear()
+        self.client_manager.close()
+        await self.client_manager.aclose()
+
+    def stats(self) -> dict:
+        budget = self.rate_limiter.budget()
+        return {
+            "active_calls": self.active,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "remaining": budget["remaining"],
+            "caches": {name: cache.stats()["entries"] for name, cache in self._caches.items() if hasattr(cache, "stats")},
+        }
+
+
+class TenantRegistry:
+    """
+    The accounts other than the process's own that tool calls have named, least
+    recently used first. Each is created on first use by `factory(token)`; when there
+    are more than max_tenants, or one has been idle for idle_timeout seconds, idle
+    ones are closed and dropped, so memory stays bounded however many accounts the
+    server sees. A tenant with calls in progress is never dropped.
+    """
+
+    def __init__(self, factory: Callable[[str], Tenant], enabled: bool = False, max_tenants: int = 100, idle_timeout: float = 900.0):
+        self.factory = factory
+        self.enabled = enabled
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self._tenants = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls, factory: Callable[[str], Tenant]) -> "TenantRegistry":
+        """
+        Build a registry configured from the environment.
+
+        Environment variables:
+            CAPSULECRM_MULTI_TENANT: Set to 1 to let tool calls name their own account's token (default: off).
+            CAPSULECRM_MAX_TENANTS: Accounts kept open at once besides the process's own (default: 100).
+            CAPSULECRM_TENANT_IDLE_TIMEOUT: Seconds an unused account is kept open (default: 900).
+        """
+        return cls(
+            factory,
+            enabled=env_bool("CAPSULECRM_MULTI_TENANT"),
+            max_tenants=env_int("CAPSULECRM_MAX_TENANTS", 100),
+            idle_timeout=env_float("CAPSULECRM_TENANT_IDLE_TIMEOUT", 900.0),
+        )
+
+    def _evict(self, now: float) -> list:
+        """Remove idle tenants over the limit or past the idle timeout; returns them for closing outside the lock."""
+        evicted = []
+        for key, tenant in list(self._tenants.items()):
+            over_limit = len(self._tenants) > self.max_tenants
+            if not over_limit and now - tenant.last_used < self.idle_timeout:
+                break
+            if tenant.active:
+                continue
+            del self._tenants[key]
+            evicted.append(tenant)
+        self.evicted += len(evicted)
+        return evicted
+
+    def _acquire(self, token: str) -> Tenant:
+        now = time.monotonic()
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            tenant = self._tenants.get(key)
+            if tenant is None:
+                tenant = self._tenants[key] = self.factory(token)
+                self.created += 1
+                logger.info(f"Opened CapsuleCRM account {tenant.key} ({len(self._tenants)} open)")
+            self._tenants.move_to_end(key)
+            tenant.active += 1
+            tenant.last_used = now
+            evicted = self._evict(now)
+        for old in evicted:
+            logger.info(f"Closed idle CapsuleCRM account {old.key}")
+            old.close()
+        return tenant
+
+    def _release(self, tenant: Tenant):
+        with self._lock:
+            tenant.active -= 1
+            tenant.last_used = time.monotonic()
+
+    @contextmanager
+    def use(self, token: Optional[str]):
+        """Make the calls within this block work on the account `token` belongs to; None keeps the process's own."""
+        if not token or not self.enabled:
+            yield
+            return
+        tenant = self._acquire(token)
+        reset = _current_tenant.set(tenant)
+        try:
+            yield
+        finally:
+            _current_tenant.reset(reset)
+            self._release(tenant)
+
+    def _take_all(self) -> list:
+        with self._lock:
+            tenants, self._tenants = list(self._tenants.values()), OrderedDict()
+        return tenants
+
+    def close(self):
+        """Close every tenant. Called once when the server shuts down."""
+        for tenant in self._take_all():
+            tenant.close()
+
+    async def aclose(self):
+        """Async variant of close()."""
+        for tenant in self._take_all():
+            await tenant.aclose()
+
+    def stats(self, detail: bool = True) -> dict:
+        """Counts, plus each open tenant's figures when `detail` is set."""
+        with self._lock:
+            tenants = list(self._tenants.values()) if detail else []
+            open_ = len(self._tenants)
+        stats = {
+            "enabled": self.enabled,
+            "open": open_,
+            "max_tenants": self.max_tenants,
+            "idle_timeout_seconds": self.idle_timeout,
+            "created": self.created,
+            "evicted": self.evicted,
+        }
+        if detail:
+            stats["tenants"] = {tenant.key: tenant.stats() for tenant in tenants}
+        return stats
+
+
+def current_tenant() -> Optional[Tenant]:
+    """The account the current call works on, or None for the process's own account."""
+    return _current_tenant.get()
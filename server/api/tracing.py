@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import random
+import threading
+import functools
+from contextvars import ContextVar
+from typing import List, Optional
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+SERVICE_NAME = "capsulecrm-mcp"
+TRACE_FORMATS = ("jsonl", "otlp")
+
+
+class _Trace:
+    __slots__ = ("spans", "done")
+
+    def __init__(self):
+        self.spans: List["Span"] = []
+        self.done = False
+
+
+class Span:
+    """One timed step of a tool call; spans started while it is open become its children."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_trace")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._trace = parent._trace if parent else _Trace()
+
+    def set(self, **attributes):
+        """Add attributes, e.g. the status code once a response arrived."""
+        self.attributes.update(attributes)
+
+    def as_record(self) -> dict:
+        """Flat record: one JSON line per span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            **({"error": self.error} if self.error else {}),
+        }
+
+    def as_otlp(self) -> dict:
+        """Span in the OpenTelemetry OTLP/JSON encoding."""
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("capsulecrm_span", default=None)
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "attributes", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.name, _current_span.get(), self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(span)
+        return False
+
+
+class _NoSpan:
+    """Stand-in returned by span() while tracing is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """
+    Nested spans from a tool call through the api functions down to each HTTP attempt.
+
+    Spans are parented through a context variable, so they nest across awaits and
+    asyncio tasks, and across the worker threads of batch, bulk and pagination,
+    which run in a copy of the caller's context. When the outermost span of a trace
+    ends, the whole trace is written to the trace file: one JSON line per span
+    (jsonl) or one OTLP/JSON export request per trace (otlp), which OpenTelemetry
+    collectors and tools accept as is. Spans ending after their trace was written
+    (an abandoned prefetch) are written on their own.
+
+    Tracing is off unless a trace file is set; span() and traced() then cost one attribute check.
+    """
+
+    def __init__(self, path: Optional[str] = None, format: str = "jsonl"):
+        if format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format: {format} - use one of {', '.join(TRACE_FORMATS)}")
+        self.path = path
+        self.format = format
+        self.enabled = bool(path)
+        self.traces_written = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        Environment variables:
+            CAPSULECRM_TRACE_FILE: File to append finished traces to; tracing is off if unset.
+            CAPSULECRM_TRACE_FORMAT: 'jsonl' (default) or 'otlp'.
+        """
+        format = os.getenv("CAPSULECRM_TRACE_FORMAT", "jsonl")
+        if format not in TRACE_FORMATS:
+            logger.warning(f"Unknown CAPSULECRM_TRACE_FORMAT {format!r}, using jsonl")
+            format = "jsonl"
+        return cls(os.getenv("CAPSULECRM_TRACE_FILE") or None, format)
+
+    def _finish(self, span: Span):
+        trace = span._trace
+        with self._lock:
+            if trace.done:
+                self._write([span])
+                return
+            trace.spans.append(span)
+            if span.parent_id is None:
+                trace.done = True
+                self._write(trace.spans)
+                self.traces_written += 1
+
+    def _write(self, spans: List[Span]):
+        if self.format == "otlp":
+            lines = [json.dumps({"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [span.as_otlp() for span in spans]}],
+            }]})]
+        else:
+            lines = [json.dumps(span.as_record(), default=str) for span in spans]
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write trace to {self.path}: {e}")
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "path": self.path, "format": self.format, "traces_written": self.traces_written}
+
+
+_tracer = Tracer.from_env()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer."""
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Context manager timing a step as a child of the current span; yields the Span, or a no-op stand-in while tracing is off."""
+    if not _tracer.enabled:
+        return _NO_SPAN
+    return _SpanContext(_tracer, name, attributes)
+
+
+def traced(fn):
+    """Run every call of an api function (sync or async) in a span named after it."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return await fn(*args, **kwargs)
+            with _SpanContext(_tracer, name, {}):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _tracer.enabled:
+            return fn(*args, **kwargs)
+        with _SpanContext(_tracer, name, {}):
+            return fn(*args, **kwargs)
+    return wrapper
@@ -1,32 +1,313 @@
 import os
 import sys
+import json
+import time
+import asyncio
 import httpx
 import logging
-from fastapi import HTTPException
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .errors import CapsuleAPIError
 from typing import Optional
+from .client import ClientManager
+from .config import env_int, env_bool
+from .ratelimit import RateLimiter, IDEMPOTENT_METHODS, RETRY_STATUS_CODES, parse_retry_after, backoff_delay
+from .singleflight import SingleFlight
+from .disk_cache import DiskCache, CachedResponse
+from .tenants import Tenant, TenantRegistry, current_tenant
+from .metrics import get_metrics, route
+from .tracing import span
 
 logger = logging.getLogger("capsulecrm-mcp.api")
 
-# Get API token from environment
+# Get API token from environment; checked on the first request rather than at import
 CAPSULECRM_ACCESS_TOKEN = os.getenv("CAPSULECRM_ACCESS_TOKEN")
-if not CAPSULECRM_ACCESS_TOKEN:
-    logger.error("CAPSULECRM_ACCESS_TOKEN environment variable not set")
-    raise RuntimeError("CAPSULECRM_ACCESS_TOKEN environment variable not set")
 
-BASE_URL = "https://api.capsulecrm.com/api/v2"
+BASE_URL = os.getenv("CAPSULECRM_API_URL", "https://api.capsulecrm.com/api/v2")
+
+# Built once at import; the shared client sends these with every request.
+_HEADERS = {
+    "Authorization": f"Bearer {CAPSULECRM_ACCESS_TOKEN}",
+    "Content-Type": "application/json",
+    "User-Agent": "CapsuleCRM-MCP/1.0"
+}
+
+_client_manager = ClientManager.from_env(BASE_URL, _HEADERS)
+_rate_limiter = RateLimiter.from_env()
+_metrics = get_metrics()
+
+# Identical reads in flight at the same time share one upstream request
+COALESCED_METHODS = {"GET", "HEAD"}
+_singleflight = SingleFlight(enabled=env_bool("CAPSULECRM_COALESCE_REQUESTS", True))
+
+# The process's own account; tool calls may name others when CAPSULECRM_MULTI_TENANT is set
+_default_tenant = Tenant(CAPSULECRM_ACCESS_TOKEN, _client_manager, _rate_limiter, _singleflight)
+_ssl_context = None
+
+def _new_tenant(token: str) -> Tenant:
+    """Another account, with its own pool, budget and coalescing; all of them share one SSL context."""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = httpx.create_ssl_context()
+    headers = {**_HEADERS, "Authorization": f"Bearer {token}"}
+    return Tenant(token, ClientManager.from_env(BASE_URL, headers, verify=_ssl_context), RateLimiter.from_env(),
+                  SingleFlight(enabled=env_bool("CAPSULECRM_COALESCE_REQUESTS", True)))
+
+_tenants = TenantRegistry.from_env(_new_tenant)
+
+# GET responses kept across restarts when CAPSULECRM_DISK_CACHE_PATH is set
+_disk_cache = DiskCache.from_env()
+# How GETs made by the current call use it: "default", "only-if-cached" or "no-store"
+_disk_cache_mode: ContextVar[str] = ContextVar("capsulecrm_disk_cache_mode", default="default")
+
+# Retries for 429 responses and for 5xx responses to idempotent requests
+MAX_RETRIES = env_int("CAPSULECRM_MAX_RETRIES", 3)
+
+# Set by callers that report retries per operation (see count_retries)
+_retry_counter: ContextVar[Optional[list]] = ContextVar("capsulecrm_retry_counter", default=None)
+
+# Set by callers that report how many HTTP requests an operation cost (see count_requests)
+_request_counter: ContextVar[Optional[list]] = ContextVar("capsulecrm_request_counter", default=None)
+
+def _tenant() -> Tenant:
+    return current_tenant() or _default_tenant
 
 def get_headers():
     """Get HTTP headers for CapsuleCRM API requests."""
-    return {
-        "Authorization": f"Bearer {CAPSULECRM_ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-        "User-Agent": "CapsuleCRM-MCP/1.0"
-    }
+    return dict(_tenant().client_manager.headers)
+
+def get_client_manager() -> ClientManager:
+    """Get the client manager holding the current account's connection pool."""
+    return _tenant().client_manager
+
+def get_tenants() -> TenantRegistry:
+    """Get the registry of accounts other than the process's own."""
+    return _tenants
+
+def use_tenant(token: Optional[str]):
+    """Context manager making the calls within it work on the account `token` belongs to (see TenantRegistry.use)."""
+    return _tenants.use(token)
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """Get the on-disk response cache, or None if CAPSULECRM_DISK_CACHE_PATH is not set."""
+    return _disk_cache
+
+def invalidate_disk_cache(endpoint: Optional[str] = None) -> int:
+    """Drop the current account's stored responses for an endpoint (any query parameters), or all of them."""
+    if _disk_cache is None:
+        return 0
+    return _disk_cache.invalidate(_tenant().key, endpoint)
+
+@contextmanager
+def only_if_cached():
+    """
+    Answer the GETs made within this block from the disk cache, without asking the API
+    even to revalidate; a response that is not stored raises CapsuleAPIError 504. For
+    data that may be served stale while it is refreshed, such as reference data.
+    """
+    reset = _disk_cache_mode.set("only-if-cached")
+    try:
+        yield
+    finally:
+        _disk_cache_mode.reset(reset)
+
+@contextmanager
+def no_store():
+    """Neither read nor store the disk cache for the GETs made within this block, e.g. pages of a full sync."""
+    reset = _disk_cache_mode.set("no-store")
+    try:
+        yield
+    finally:
+        _disk_cache_mode.reset(reset)
+
+def close_clients():
+    """Close the shared connection pool and every other account's. Called once when the server shuts down."""
+    _client_manager.close()
+    _tenants.close()
+
+async def aclose_clients():
+    """Close the shared async connection pool and every other account's. Awaited from the server lifespan on shutdown."""
+    await _client_manager.aclose()
+    await _tenants.aclose()
+
+def get_rate_limit_budget() -> dict:
+    """Get the current account's CapsuleCRM request budget as last reported by the API."""
+    return _tenant().rate_limiter.budget()
+
+def get_coalescing_stats() -> dict:
+    """Get how many of the current account's reads were sent upstream and how many shared an identical one already in flight."""
+    return _tenant().singleflight.stats()
+
+def _flight_key(kind: str, method: str, endpoint: str, params, etag: Optional[str] = None) -> tuple:
+    """Key identifying a request independently of the order its params were given in."""
+    items = params.items() if isinstance(params, dict) else (params or ())
+    normalized = tuple(sorted((str(k), tuple(v) if isinstance(v, list) else str(v)) for k, v in items))
+    return kind, method.upper(), endpoint, normalized, etag
+
+def count_retries() -> list:
+    """
+    Start counting retries of requests made from the current thread or task.
+
+    Returns a one-element list whose value is incremented on every retry, so a caller
+    can tell whether an operation needed more than one attempt.
+    """
+    counter = [0]
+    _retry_counter.set(counter)
+    return counter
+
+def count_requests() -> list:
+    """
+    Start counting HTTP requests sent from the current thread or task, retries included.
+
+    Returns a one-element list incremented on every attempt. Reads answered by an
+    identical request already in flight are not counted, as they cost nothing upstream.
+    """
+    counter = [0]
+    _request_counter.set(counter)
+    return counter
+
+def _budget_exhausted(rate_limiter: RateLimiter) -> CapsuleAPIError:
+    budget = rate_limiter.budget()
+    logger.error(f"CapsuleCRM request budget exhausted: {budget}")
+    return CapsuleAPIError(
+        status_code=429,
+        detail=f"CapsuleCRM rate limit exceeded - budget resets in {budget['seconds_until_reset']} seconds"
+    )
+
+def _missing_token() -> CapsuleAPIError:
+    logger.error("CAPSULECRM_ACCESS_TOKEN environment variable not set")
+    return CapsuleAPIError(status_code=401, detail="CAPSULECRM_ACCESS_TOKEN environment variable not set")
+
+def _retry_delay(rate_limiter: RateLimiter, method: str, resp: httpx.Response, attempt: int) -> Optional[float]:
+    """
+    Record rate-limit headers from a response and decide whether to retry it.
+
+    Returns the number of seconds to wait before the next attempt, or None if the
+    response should be returned (or raised) as is.
+    """
+    rate_limiter.update(resp.headers)
+    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+    if resp.status_code == 429 and retry_after is not None:
+        # Pause every caller of this account, not just this one, until the server accepts requests again
+        rate_limiter.block_for(retry_after)
+    # A 429 was never processed, so even a POST can be sent again
+    retryable = resp.status_code == 429 or method.upper() in IDEMPOTENT_METHODS
+    if resp.status_code not in RETRY_STATUS_CODES or not retryable or attempt >= MAX_RETRIES:
+        return None
+    counter = _retry_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    delay = retry_after if retry_after is not None else backoff_delay(attempt)
+    logger.warning(f"CapsuleCRM returned {resp.status_code} for {method} {resp.url}, retrying in {delay:.2f}s (attempt {attempt + 1}/{MAX_RETRIES})")
+    return delay
+
+def _handle_response(method: str, url: str, resp: httpx.Response):
+    """Return the decoded JSON body of a successful response, or raise CapsuleAPIError."""
+    # Log response for debugging
+    logger.debug(f"Response status: {resp.status_code}")
+    
+    if not (200 <= resp.status_code < 300):
+        error_detail = f"CapsuleCRM API error: {resp.status_code}"
+        try:
+            error_data = resp.json()
+            if "message" in error_data:
+                error_detail = f"CapsuleCRM API error: {error_data['message']}"
+        except:
+            error_detail = f"CapsuleCRM API error: {resp.text}"
+        
+        logger.error(f"API request failed: {error_detail}")
+        raise CapsuleAPIError(status_code=resp.status_code, detail=error_detail)
+    
+    with span("decode json", bytes=len(resp.content)):
+        return resp.json()
+
+def _request_error(method: str, url: str, e: Exception) -> CapsuleAPIError:
+    """Translate a failure raised while performing a request into an CapsuleAPIError."""
+    if isinstance(e, CapsuleAPIError):
+        return e
+    if isinstance(e, httpx.TimeoutException):
+        logger.error(f"Request timeout for {method} {url}")
+        return CapsuleAPIError(status_code=408, detail="Request timeout - CapsuleCRM API is not responding")
+    if isinstance(e, httpx.NetworkError):
+        logger.error(f"Network error for {method} {url}: {e}")
+        return CapsuleAPIError(status_code=503, detail="Network error - Unable to connect to CapsuleCRM API")
+    logger.error(f"Unexpected error for {method} {url}: {e}")
+    return CapsuleAPIError(status_code=500, detail=f"Internal error: {str(e)}")
+
+def _send(method: str, endpoint: str, *, params=None, json=None, headers=None, timeout: int = 30) -> httpx.Response:
+    """Send a request through the current account's pool, pacing and retrying it; returns the final response."""
+    tenant = _tenant()
+    if not tenant.token:
+        raise _missing_token()
+    client = tenant.client_manager.client
+    attempt = 0
+    while True:
+        with span("rate limit wait"):
+            if not tenant.rate_limiter.acquire():
+                raise _budget_exhausted(tenant.rate_limiter)
+        logger.debug(f"Making {method} request to {BASE_URL}{endpoint}")
+        counter = _request_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        start = time.perf_counter()
+        with span("http", method=method, attempt=attempt) as attempt_span:
+            try:
+                resp = client.request(method, endpoint, params=params, json=json, headers=headers, timeout=timeout)
+            except httpx.HTTPError:
+                _metrics.record_request(method, endpoint, None, time.perf_counter() - start)
+                raise
+            attempt_span.set(status=resp.status_code, bytes=len(resp.content))
+        _metrics.record_request(method, endpoint, resp.status_code, time.perf_counter() - start, len(resp.content))
+        delay = _retry_delay(tenant.rate_limiter, method, resp, attempt)
+        if delay is None:
+            return resp
+        _metrics.record_retry(method, endpoint)
+        time.sleep(delay)
+        attempt += 1
+
+async def _send_async(method: str, endpoint: str, *, params=None, json=None, headers=None, timeout: int = 30) -> httpx.Response:
+    """Async variant of _send()."""
+    tenant = _tenant()
+    if not tenant.token:
+        raise _missing_token()
+    client = tenant.client_manager.async_client
+    attempt = 0
+    while True:
+        with span("rate limit wait"):
+            if not await tenant.rate_limiter.acquire_async():
+                raise _budget_exhausted(tenant.rate_limiter)
+        logger.debug(f"Making async {method} request to {BASE_URL}{endpoint}")
+        counter = _request_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        start = time.perf_counter()
+        with span("http", method=method, attempt=attempt) as attempt_span:
+            try:
+                resp = await client.request(method, endpoint, params=params, json=json, headers=headers, timeout=timeout)
+            except httpx.HTTPError:
+                _metrics.record_request(method, endpoint, None, time.perf_counter() - start)
+                raise
+            attempt_span.set(status=resp.status_code, bytes=len(resp.content))
+        _metrics.record_request(method, endpoint, resp.status_code, time.perf_counter() - start, len(resp.content))
+        delay = _retry_delay(tenant.rate_limiter, method, resp, attempt)
+        if delay is None:
+            return resp
+        _metrics.record_retry(method, endpoint)
+        await asyncio.sleep(delay)
+        attempt += 1
 
 def request(method: str, endpoint: str, *, params=None, json=None, timeout: int = 30):
     """
     Make authenticated HTTP request to CapsuleCRM API.
     
+    Requests are paced by the account's rate limiter. Requests answered with 429, and
+    idempotent requests answered with 5xx, are retried, honouring Retry-After or
+    using jittered exponential backoff. A GET issued while an identical one is in
+    flight waits for it and returns the same decoded result, which callers must
+    therefore not modify. With CAPSULECRM_DISK_CACHE_PATH set, GETs go through the
+    on-disk response cache: a stored response is revalidated rather than downloaded
+    again (see only_if_cached and no_store).
+    
     Args:
         method: HTTP method (GET, POST, PUT, DELETE)
         endpoint: API endpoint path
@@ -38,42 +319,168 @@ def request(method: str, endpoint: str, *, params=None, json=None, timeout: int
         JSON response data
         
     Raises:
-        HTTPException: On API errors or network issues
+        CapsuleAPIError: On API errors or network issues, 429 when the request budget is exhausted,
+            or 401 when CAPSULECRM_ACCESS_TOKEN is not set
     """
+    with span("request", method=method, endpoint=route(endpoint)):
+        if json is None and method.upper() in COALESCED_METHODS:
+            return _tenant().singleflight.do(_flight_key("json", method, endpoint, params),
+                                    lambda: _request(method, endpoint, params=params, timeout=timeout))
+        return _request(method, endpoint, params=params, json=json, timeout=timeout)
+
+def _request(method: str, endpoint: str, *, params=None, json=None, timeout: int = 30):
     url = f"{BASE_URL}{endpoint}"
-    headers = get_headers()
     
     try:
-        with httpx.Client(timeout=timeout) as client:
-            logger.debug(f"Making {method} request to {url}")
-            resp = client.request(method, url, headers=headers, params=params, json=json)
-            
-            # Log response for debugging
-            logger.debug(f"Response status: {resp.status_code}")
-            
-            if not (200 <= resp.status_code < 300):
-                error_detail = f"CapsuleCRM API error: {resp.status_code}"
-                try:
-                    error_data = resp.json()
-                    if "message" in error_data:
-                        error_detail = f"CapsuleCRM API error: {error_data['message']}"
-                except:
-                    error_detail = f"CapsuleCRM API error: {resp.text}"
-                
-                logger.error(f"API request failed: {error_detail}")
-                raise HTTPException(status_code=resp.status_code, detail=error_detail)
-            
-            return resp.json()
-            
-    except httpx.TimeoutException:
-        logger.error(f"Request timeout for {method} {url}")
-        raise HTTPException(status_code=408, detail="Request timeout - CapsuleCRM API is not responding")
-    except httpx.NetworkError as e:
-        logger.error(f"Network error for {method} {url}: {e}")
-        raise HTTPException(status_code=503, detail="Network error - Unable to connect to CapsuleCRM API")
+        if json is None and method.upper() == "GET" and _uses_disk_cache():
+            key, entry, offline = _disk_lookup(endpoint, params)
+            if offline:
+                return entry.json()
+            resp = _send("GET", endpoint, params=params, headers=entry.validators() if entry else None, timeout=timeout)
+            return _disk_result(key, endpoint, entry, resp)
+        resp = _send(method, endpoint, params=params, json=json, timeout=timeout)
+        return _handle_response(method, url, resp)
+    except Exception as e:
+        raise _request_error(method, url, e)
+
+async def request_async(method: str, endpoint: str, *, params=None, json=None, timeout: int = 30):
+    """
+    Make authenticated HTTP request to CapsuleCRM API without blocking the event loop.
+    
+    Same arguments, return value and errors as request(), but uses the shared async
+    connection pool so concurrent tool calls can have requests in flight at once.
+    """
+    with span("request", method=method, endpoint=route(endpoint)):
+        if json is None and method.upper() in COALESCED_METHODS:
+            return await _tenant().singleflight.do_async(_flight_key("json", method, endpoint, params),
+                                                lambda: _request_async(method, endpoint, params=params, timeout=timeout))
+        return await _request_async(method, endpoint, params=params, json=json, timeout=timeout)
+
+async def _request_async(method: str, endpoint: str, *, params=None, json=None, timeout: int = 30):
+    url = f"{BASE_URL}{endpoint}"
+    
+    try:
+        if json is None and method.upper() == "GET" and _uses_disk_cache():
+            # SQLite reads and writes and (de)compression run in a worker thread, off the event loop
+            key, entry, offline = await asyncio.to_thread(_disk_lookup, endpoint, params)
+            if offline:
+                return await asyncio.to_thread(entry.json)
+            resp = await _send_async("GET", endpoint, params=params, headers=entry.validators() if entry else None, timeout=timeout)
+            return await asyncio.to_thread(_disk_result, key, endpoint, entry, resp)
+        resp = await _send_async(method, endpoint, params=params, json=json, timeout=timeout)
+        return _handle_response(method, url, resp)
     except Exception as e:
-        logger.error(f"Unexpected error for {method} {url}: {e}")
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+        raise _request_error(method, url, e)
+
+def _uses_disk_cache() -> bool:
+    return _disk_cache is not None and _disk_cache_mode.get() != "no-store"
+
+def _disk_key(endpoint: str, params) -> str:
+    return json.dumps([_tenant().key, endpoint, _flight_key("disk", "GET", endpoint, params)[3]])
+
+def _disk_lookup(endpoint: str, params) -> tuple:
+    """(key, stored response or None, whether to answer from the stored response without asking the API)."""
+    key = _disk_key(endpoint, params)
+    entry = _disk_cache.get(key)
+    offline = _disk_cache_mode.get() == "only-if-cached"
+    if offline:
+        if entry is None:
+            raise CapsuleAPIError(status_code=504, detail=f"{endpoint} is not in the disk cache")
+        _disk_cache.touch(key)
+    return key, entry, offline
+
+def _disk_store(key: str, endpoint: str, resp: httpx.Response):
+    _disk_cache.put(key, _tenant().key, endpoint, resp.content, resp.headers.get("ETag"),
+                    resp.headers.get("Last-Modified") or resp.headers.get("Date"))
+
+def _disk_result(key: str, endpoint: str, entry: Optional[CachedResponse], resp: httpx.Response):
+    """The decoded body of a GET sent with the stored response's validators, storing it unless the API answered 304."""
+    if resp.status_code == 304 and entry is not None:
+        _disk_cache.touch(key, revalidated=True)
+        return entry.json()
+    data = _handle_response("GET", f"{BASE_URL}{endpoint}", resp)
+    _disk_store(key, endpoint, resp)
+    return data
+
+def _conditional_headers(etag: Optional[str], entry: Optional[CachedResponse]) -> Optional[dict]:
+    # The caller's ETag decides whether a 304 means "keep what you have"; without one the stored response's validators do
+    if etag:
+        return {"If-None-Match": etag}
+    return entry.validators() if entry is not None else None
+
+def _conditional_disk_result(key: str, endpoint: str, etag: Optional[str], entry: Optional[CachedResponse],
+                             resp: httpx.Response) -> tuple:
+    """_conditional_result() for a GET that went through the disk cache."""
+    if resp.status_code != 304:
+        result = _conditional_result(f"{BASE_URL}{endpoint}", resp, etag)
+        _disk_store(key, endpoint, resp)
+        return result
+    if entry is not None and (etag is None or etag == entry.etag):
+        _disk_cache.touch(key, revalidated=True)
+    if etag is None:
+        return entry.json(), resp.headers.get("ETag", entry.etag), entry.size
+    return None, resp.headers.get("ETag", etag), 0
+
+def _conditional_offline(etag: Optional[str], entry: CachedResponse) -> tuple:
+    return (None if etag is not None and etag == entry.etag else entry.json()), entry.etag, entry.size
+
+def _conditional_result(url: str, resp: httpx.Response, etag: Optional[str]) -> tuple:
+    if resp.status_code == 304:
+        logger.debug(f"{url} not modified")
+        return None, resp.headers.get("ETag", etag), 0
+    return _handle_response("GET", url, resp), resp.headers.get("ETag"), len(resp.content)
+
+def request_conditional(endpoint: str, etag: Optional[str] = None, *, params=None, timeout: int = 30) -> tuple:
+    """
+    GET a resource, sending If-None-Match when an ETag from an earlier response is known.
+    
+    Returns:
+        (data, etag, size): data is None when the server answered 304 Not Modified;
+        etag is the validator to send next time (None if the API sent none) and size
+        the length of the response body in bytes. Identical requests in flight at the
+        same time share one result, as with request().
+    """
+    with span("request", method="GET", endpoint=route(endpoint), conditional=etag is not None):
+        return _tenant().singleflight.do(_flight_key("conditional", "GET", endpoint, params, etag),
+                                lambda: _request_conditional(endpoint, etag, params=params, timeout=timeout))
+
+def _request_conditional(endpoint: str, etag: Optional[str] = None, *, params=None, timeout: int = 30) -> tuple:
+    url = f"{BASE_URL}{endpoint}"
+    headers = {"If-None-Match": etag} if etag else None
+    
+    try:
+        if _uses_disk_cache():
+            key, entry, offline = _disk_lookup(endpoint, params)
+            if offline:
+                return _conditional_offline(etag, entry)
+            resp = _send("GET", endpoint, params=params, headers=_conditional_headers(etag, entry), timeout=timeout)
+            return _conditional_disk_result(key, endpoint, etag, entry, resp)
+        resp = _send("GET", endpoint, params=params, headers=headers, timeout=timeout)
+        return _conditional_result(url, resp, etag)
+    except Exception as e:
+        raise _request_error("GET", url, e)
+
+async def request_conditional_async(endpoint: str, etag: Optional[str] = None, *, params=None, timeout: int = 30) -> tuple:
+    """Async variant of request_conditional()."""
+    with span("request", method="GET", endpoint=route(endpoint), conditional=etag is not None):
+        return await _tenant().singleflight.do_async(_flight_key("conditional", "GET", endpoint, params, etag),
+                                            lambda: _request_conditional_async(endpoint, etag, params=params, timeout=timeout))
+
+async def _request_conditional_async(endpoint: str, etag: Optional[str] = None, *, params=None, timeout: int = 30) -> tuple:
+    url = f"{BASE_URL}{endpoint}"
+    headers = {"If-None-Match": etag} if etag else None
+    
+    try:
+        if _uses_disk_cache():
+            key, entry, offline = await asyncio.to_thread(_disk_lookup, endpoint, params)
+            if offline:
+                return await asyncio.to_thread(_conditional_offline, etag, entry)
+            resp = await _send_async("GET", endpoint, params=params, headers=_conditional_headers(etag, entry), timeout=timeout)
+            return await asyncio.to_thread(_conditional_disk_result, key, endpoint, etag, entry, resp)
+        resp = await _send_async("GET", endpoint, params=params, headers=headers, timeout=timeout)
+        return _conditional_result(url, resp, etag)
+    except Exception as e:
+        raise _request_error("GET", url, e)
 
 def filter_entities(entity: str, filter_obj, page: int = 1, per_page: int = 50, embed: Optional[str] = None):
     """
@@ -102,4 +509,21 @@ def filter_entities(entity: str, filter_obj, page: int = 1, per_page: int = 50,
         
     except Exception as e:
         logger.error(f"Filter operation failed for {entity}: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+async def filter_entities_async(entity: str, filter_obj, page: int = 1, per_page: int = 50, embed: Optional[str] = None):
+    """Async variant of filter_entities()."""
+    params = {"page": page, "perPage": per_page}
+    if embed:
+        params["embed"] = embed
+    
+    try:
+        data = {"filter": filter_obj.dict(exclude_none=True)}
+        endpoint = f"/{entity}/filters/results"
+        
+        logger.debug(f"Filtering {entity} with conditions: {filter_obj.conditions}")
+        return await request_async("POST", endpoint, params=params, json=data)
+        
+    except Exception as e:
+        logger.error(f"Filter operation failed for {entity}: {e}")
+        raise
@@ -0,0 +1,364 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from .config import env_int, env_float
+from .decode import decode
+from .models import Task
+from .entity_cache import get_entity_cache
+from .mirror import get_mirror
+from .parties import _to_party
+from .search_index import index_parties, unindex_parties
+from .tracing import span
+
+logger = logging.getLogger("capsulecrm-mcp.api")
+
+# Header carrying the hex HMAC-SHA256 of the request body, keyed with the shared secret
+SIGNATURE_HEADER = "X-Capsule-Signature"
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def _parse_task(record: dict):
+    return decode(Task, record)
+
+
+# Event type prefix -> (entity, turns a pushed record into the value the entity cache holds)
+HOOK_ENTITIES: Dict[str, tuple] = {
+    "party": ("parties", _to_party),
+    "opportunity": ("opportunities", lambda record: record),
+    "task": ("tasks", _parse_task),
+}
+
+
+def _record_id(record) -> Optional[int]:
+    """The id of a pushed record, or None if it has none a CapsuleCRM record could have."""
+    value = record.get("id") if isinstance(record, dict) else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        return int(value)
+    return None
+
+
+class _Change:
+    __slots__ = ("deleted", "record", "verified")
+
+    def __init__(self, deleted: bool, record: Optional[dict], verified: bool):
+        self.deleted = deleted
+        self.record = record
+        self.verified = verified
+
+    def supersedes(self, other: "_Change") -> bool:
+        """Whether this change should replace an earlier pending one for the same record."""
+        if other.deleted and other.verified:
+            return False
+        if self.deleted or other.deleted or self.record is None or other.record is None:
+            return True
+        return str(self.record.get("updatedAt") or "") >= str(other.record.get("updatedAt") or "")
+
+
+class WebhookReceiver:
+    """
+    Embedded HTTP listener for CapsuleCRM REST hook events that keeps in-process state
+    current when records change elsewhere, e.g. in the Capsule web UI.
+
+    Register a REST hook for party, opportunity and task events with a target URL
+    pointing at `path` on this listener. Each POST carries {"event": "party/updated",
+    "payload": [records]} (a list of such objects is accepted too). An event is verified
+    if it is signed (an HMAC-SHA256 hex digest of the body keyed with `secret`, in the
+    X-Capsule-Signature header) or was posted to `path`/<secret>, for hook target URLs
+    that embed the secret. Unsigned events are rejected while a secret is set.
+
+    Events are not applied one by one: they are collected for `batch_window` seconds,
+    later events for the same record replace earlier ones, and each batch is applied in
+    one go. Verified events update records in place: cached records are replaced by
+    newer versions, the mirror stores changed records and drops deleted ones, and the
+    party search index follows. Nothing is refetched. Without a secret, events cannot
+    be trusted with record contents, so they only drop the records from the entity
+    cache and the next read fetches them. When more than `max_pending` records of one
+    entity are waiting, that entity's cache is dropped as a whole instead.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, path: str = "/capsule/hooks",
+                 secret: Optional[str] = None, batch_window: float = 0.5, max_pending: int = 10000):
+        self.host = host
+        self.port = port
+        self.path = "/" + path.strip("/")
+        self.secret = secret or None
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[int, _Change]] = {}
+        self._overflowed = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._server = None
+        self._threads = []
+        self.counts = {"received": 0, "rejected": 0, "ignored": 0, "coalesced": 0, "batches": 0,
+                       "updated": 0, "deleted": 0, "invalidated": 0, "overflows": 0}
+        self.last_batch_ms = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["WebhookReceiver"]:
+        """
+        Build the receiver from the environment, or return None if it is not enabled.
+
+        Environment variables:
+            CAPSULECRM_WEBHOOK_PORT: Port to listen on for REST hook events; unset disables the receiver.
+            CAPSULECRM_WEBHOOK_HOST: Interface to listen on (default: 127.0.0.1).
+            CAPSULECRM_WEBHOOK_PATH: Path events are posted to (default: /capsule/hooks).
+            CAPSULECRM_WEBHOOK_SECRET: Shared secret events are verified with.
+            CAPSULECRM_WEBHOOK_BATCH_WINDOW: Seconds events are collected before being applied (default: 0.5).
+            CAPSULECRM_WEBHOOK_MAX_PENDING: Waiting records per entity above which its cache is dropped instead (default: 10000).
+        """
+        if not os.getenv("CAPSULECRM_WEBHOOK_PORT"):
+            return None
+        return cls(
+            host=os.getenv("CAPSULECRM_WEBHOOK_HOST", "127.0.0.1"),
+            port=env_int("CAPSULECRM_WEBHOOK_PORT", 0),
+            path=os.getenv("CAPSULECRM_WEBHOOK_PATH", "/capsule/hooks"),
+            secret=os.getenv("CAPSULECRM_WEBHOOK_SECRET"),
+            batch_window=env_float("CAPSULECRM_WEBHOOK_BATCH_WINDOW", 0.5),
+            max_pending=env_int("CAPSULECRM_WEBHOOK_MAX_PENDING", 10000),
+        )
+
+    def _count(self, counter: str, n: int = 1):
+        with self._lock:
+            self.counts[counter] += n
+
+    # Receiving
+
+    def _verified(self, body: bytes, path: str, signature: Optional[str]) -> bool:
+        if self.secret is None:
+            return False
+        if signature:
+            expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            return hmac.compare_digest(signature.strip().lower().removeprefix("sha256="), expected)
+        return hmac.compare_digest(path.rstrip("/"), f"{self.path}/{self.secret}")
+
+    def receive(self, body: bytes, path: str, signature: Optional[str] = None) -> tuple:
+        """Check and queue one POSTed body; returns (HTTP status, message)."""
+        path = path.split("?", 1)[0]
+        if path.rstrip("/") != self.path and not path.startswith(self.path + "/"):
+            return 404, "Not found"
+        verified = self._verified(body, path, signature)
+        if self.secret is not None and not verified:
+            self._count("rejected")
+            logger.warning("Rejected a webhook event with a missing or wrong signature")
+            return 401, "Invalid signature"
+        try:
+            events = json.loads(body)
+        except ValueError:
+            self._count("rejected")
+            return 400, "Body is not JSON"
+        for event in events if isinstance(events, list) else [events]:
+            self._queue(event, verified)
+        return 202, "Accepted"
+
+    def _queue(self, event, verified: bool):
+        self._count("received")
+        kind, _, action = str(event.get("event", "") if isinstance(event, dict) else "").partition("/")
+        if kind not in HOOK_ENTITIES:
+            self._count("ignored")
+            logger.debug(f"Ignoring webhook event {event.get('event') if isinstance(event, dict) else event!r}")
+            return
+        entity = HOOK_ENTITIES[kind][0]
+        payload = event.get("payload")
+        records = payload if isinstance(payload, list) else [payload]
+        with self._lock:
+            if entity in self._overflowed:
+                return
+            pending = self._pending.setdefault(entity, {})
+            for record in records:
+                record_id = _record_id(record)
+                if record_id is None:
+                    self.counts["ignored"] += 1
+                    continue
+                change = _Change(action == "deleted", record if action != "deleted" else None, verified)
+                earlier = pending.get(record_id)
+                if earlier is not None:
+                    self.counts["coalesced"] += 1
+                    if not change.supersedes(earlier):
+                        continue
+                pending[record_id] = change
+            if len(pending) > self.max_pending:
+                # Too many distinct records to track: forget them and drop the entity as a whole
+                self._overflowed.add(entity)
+                del self._pending[entity]
+                self.counts["overflows"] += 1
+        self._wake.set()
+
+    # Applying
+
+    def flush(self):
+        """Apply every queued change now."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            overflowed, self._overflowed = self._overflowed, set()
+        records = sum(len(changes) for changes in pending.values())
+        if not records and not overflowed:
+            return
+        start = time.perf_counter()
+        cache = get_entity_cache()
+        mirror = get_mirror()
+        with span("webhook batch", records=records):
+            for entity in overflowed:
+                cache.invalidate(entity)
+                self._count("invalidated")
+                logger.info(f"Webhook events for too many {entity}; dropped their cached records")
+            for entity, parse in HOOK_ENTITIES.values():
+                if pending.get(entity):
+                    self._apply(entity, parse, pending[entity], cache, mirror)
+        self._count("batches")
+        self.last_batch_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.debug(f"Applied webhook batch of {records} records in {self.last_batch_ms} ms")
+
+    def _apply(self, entity: str, parse: Callable[[dict], object], changes: Dict[int, _Change], cache, mirror):
+        updated, deleted, parties = [], [], []
+        for record_id, change in changes.items():
+            if not change.verified or (change.record is not None and change.record.get("updatedAt") is None):
+                # Untrusted or incomplete: let the next read fetch the record
+                cache.invalidate(entity, record_id)
+                self._count("invalidated")
+            elif change.deleted:
+                cache.invalidate(entity, record_id)
+                deleted.append(record_id)
+            else:
+                try:
+                    value = parse(change.record)
+                except Exception as e:
+                    logger.warning(f"Could not apply webhook record {entity}/{record_id}: {e}")
+                    cache.invalidate(entity, record_id)
+                    self._count("invalidated")
+                    continue
+                if value is None:
+                    cache.invalidate(entity, record_id)
+                    self._count("invalidated")
+                    continue
+                cache.refresh(entity, change.record, lambda record: value)
+                updated.append(change.record)
+                if entity == "parties":
+                    parties.append(value)
+        if parties:
+            index_parties(parties)
+        if deleted and entity == "parties":
+            unindex_parties(deleted)
+        if mirror is not None and (updated or deleted):
+            try:
+                mirror.apply_changes(entity, updated, deleted)
+            except Exception as e:
+                logger.warning(f"Could not apply webhook events to the mirror: {e}")
+        self._count("updated", len(updated))
+        self._count("deleted", len(deleted))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            # Let a burst of events accumulate, then apply it as one batch
+            self._stop.wait(self.batch_window)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Applying webhook events failed: {e}")
+
+    # Serving
+
+    def start(self):
+        """Start listening and applying batches in background threads."""
+        if self._server is not None:
+            return
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, message: str):
+                data = json.dumps({"message": message}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = self.headers.get("Content-Length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    # Reading an unknown length would wait for the client to close the connection
+                    self.close_connection = True
+                    return self._reply(400, "Invalid Content-Length")
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    self.close_connection = True
+                    return self._reply(413, "Body too large")
+                body = self.rfile.read(length)
+                self._reply(*receiver.receive(body, self.path, self.headers.get(SIGNATURE_HEADER)))
+
+            def do_GET(self):
+                self._reply(405, "Use POST")
+
+        if self.secret is None:
+            logger.warning("CAPSULECRM_WEBHOOK_SECRET is not set: webhook events are not verified and only invalidate cached records")
+        self._stop.clear()
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="capsulecrm-webhooks", daemon=True),
+            threading.Thread(target=self._run, name="capsulecrm-webhook-batches", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Listening for CapsuleCRM webhook events on {self.url}")
+
+    def stop(self):
+        """Stop listening and apply what is still queued."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self.flush()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(len(changes) for changes in self._pending.values())
+            return {"url": self.url, "verified": self.secret is not None, "batch_window_seconds": self.batch_window,
+                    "pending": pending, "last_batch_ms": self.last_batch_ms, **self.counts}
+
+
+_receiver = WebhookReceiver.from_env()
+
+
+def get_webhook_receiver() -> Optional[WebhookReceiver]:
+    """Get the process-wide webhook receiver, or None if CAPSULECRM_WEBHOOK_PORT is not set."""
+    return _receiver
+
+
+def start_webhooks():
+    """Start the webhook listener if it is enabled. Called once at server startup."""
+    if _receiver is not None:
+        _receiver.start()
+
+
+def stop_webhooks():
+    """Stop the webhook listener and apply queued events. Called once when the server shuts down."""
+    if _receiver is not None:
+        _receiver.stop()
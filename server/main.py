@@ -6,8 +6,12 @@ A Model Context Protocol server for CapsuleCRM integration with Claude Desktop.
 
 import os
 import sys
+import asyncio
 import logging
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 # Add server directory to Python path
 server_dir = Path(__file__).parent
@@ -24,12 +28,9 @@ logger = logging.getLogger("capsulecrm-mcp")
 
 try:
     from fastmcp import FastMCP
-    
-    # Import tool registration functions
-    from tools.parties import register_party_tools
-    from tools.opportunities import register_opportunity_tools
-    from tools.tasks import register_task_tools
-    from tools.milestones import register_milestone_tools
+    from api.config import env_bool, env_int
+    from tools.registry import LazyTools, ToolMetrics, ToolTracing, ToolProfiler, ToolDrain, ToolTenant
+    from transport import transport_from_env, run_http
     
     logger.info("Starting CapsuleCRM MCP Server...")
     
@@ -38,19 +39,79 @@ try:
         logger.error("CAPSULECRM_ACCESS_TOKEN environment variable not set")
         sys.exit(1)
     
+    def start_background_work():
+        """Register the tools (if deferred), warm caches, start the mirror and the webhook listener and build the search index."""
+        lazy_tools.load()
+        from api.reference import warm_reference_cache
+        from api.mirror import start_mirror
+        from api.search_index import build_party_index
+        from api.webhooks import start_webhooks
+        warm_reference_cache()
+        start_mirror()
+        start_webhooks()
+        build_party_index()
+    
+    @asynccontextmanager
+    async def serve():
+        """
+        Process-wide startup and shutdown. Start background work without delaying the MCP
+        handshake; on shutdown, let running tool calls finish, stop syncing and listening
+        and close the shared async connection pool.
+        """
+        # Blocking work (mirror queries, tool loading) runs in this pool via asyncio.to_thread
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=env_int("CAPSULECRM_WORKER_THREADS", 32), thread_name_prefix="capsulecrm-worker"))
+        startup = threading.Thread(target=start_background_work, name="capsulecrm-startup", daemon=True)
+        startup.start()
+        try:
+            yield
+        finally:
+            await tool_drain.drain(env_int("CAPSULECRM_DRAIN_TIMEOUT", 30))
+            await asyncio.to_thread(startup.join)
+            from api.mirror import stop_mirror
+            from api.webhooks import stop_webhooks
+            from api.utils import aclose_clients
+            stop_mirror()
+            stop_webhooks()
+            await aclose_clients()
+    
+    transport = transport_from_env()
+    
+    @asynccontextmanager
+    async def lifespan(server):
+        """
+        Runs once per MCP session. Over stdio the session is the whole process; over HTTP
+        the sessions share one process, so serve() is tied to the web app instead (see transport.py).
+        """
+        if transport != "stdio":
+            yield
+            return
+        async with serve():
+            yield
+    
     # Create MCP server instance
     mcp = FastMCP(
         name="capsulecrm-mcp",
         instructions="Use these tools to manage opportunities, parties (customers), and tasks in CapsuleCRM. Support both simple queries and advanced filtering.",
-        dependencies=["fastapi", "httpx", "pydantic", "fastmcp"]
+        dependencies=["httpx", "pydantic", "fastmcp"],
+        lifespan=lifespan
     )
     
-    # Register all tools by entity
-    logger.info("Registering MCP tools...")
-    register_party_tools(mcp)
-    register_opportunity_tools(mcp)
-    register_task_tools(mcp)
-    register_milestone_tools(mcp)
+    # Outermost, so calls refused while shutting down do not load tools or count as errors
+    tool_drain = ToolDrain()
+    mcp.add_middleware(tool_drain)
+    mcp.add_middleware(ToolTenant())
+    
+    # Register all tools by entity, by default on first use (see tools.registry)
+    lazy_tools = LazyTools(mcp)
+    if env_bool("CAPSULECRM_LAZY_TOOLS", True):
+        mcp.add_middleware(lazy_tools)
+    else:
+        logger.info("Registering MCP tools...")
+        lazy_tools.load()
+    mcp.add_middleware(ToolMetrics())
+    mcp.add_middleware(ToolTracing())
+    mcp.add_middleware(ToolProfiler())
     
     logger.info("CapsuleCRM MCP Server initialized successfully")
     
@@ -63,10 +124,17 @@ except Exception as e:
 
 if __name__ == "__main__":
     try:
-        # FastMCP automatically uses stdio transport for MCP protocol
-        mcp.run()
+        # stdio serves the one client that started this process; HTTP and SSE serve many clients at once (see transport.py)
+        if transport == "stdio":
+            mcp.run()
+        else:
+            run_http(mcp, transport, serve, tool_drain.drain)
     except KeyboardInterrupt:
         logger.info("Server shutdown requested")
     except Exception as e:
         logger.error(f"Server error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        # Release pooled keep-alive connections to CapsuleCRM
+        from api.utils import close_clients
+        close_clients()
\ No newline at end of file
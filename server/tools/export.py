@@ -0,0 +1,36 @@
+"""Export MCP Tools"""
+
+from typing import Optional
+from fastmcp import Context
+from api.export import export_records_async
+
+
+def register_export_tools(mcp):
+    """Register all export-related MCP tools"""
+
+    @mcp.tool()
+    async def export_records_tool(ctx: Context, entity: str, format: str = "ndjson", user_input: Optional[dict] = None,
+                                  filename: Optional[str] = None, max_items: Optional[int] = None, overwrite: bool = False) -> dict:
+        """
+        Export parties, opportunities or tasks to a local file, however many there are, without returning the records themselves.
+        Pages are written to the file as they arrive, so memory stays constant; progress is reported while it runs.
+
+        Args:
+            entity (str): 'parties', 'opportunities' or 'tasks'.
+            format (str): 'ndjson' (one record per line, nested as returned by the other tools), 'csv' or 'parquet' (flat columns: addresses, emails, phone numbers, tags and custom fields flattened, e.g. 'address.city', 'emailAddresses', 'field.Industry') (default: 'ndjson').
+            user_input (dict, optional): Search and/or filter parameters as for the find_* tools, e.g. {'tag': 'VIP'} or {'q': 'Acme'}; omit to export everything (open tasks for tasks).
+            filename (str, optional): File name in the export directory (CAPSULECRM_EXPORT_DIR, one subdirectory per account when several are served); default: entity and current time.
+            max_items (int, optional): Stop after this many records (default: all).
+            overwrite (bool): Replace an existing file of the same name instead of failing (default: False).
+        Returns:
+            dict: The file's path, format, number of records and columns, size in bytes and the seconds the export took.
+        """
+        async def progress(records: int):
+            await ctx.report_progress(progress=records, total=max_items)
+
+        try:
+            ctx.request_context
+        except ValueError:
+            # Called directly rather than by an MCP client, e.g. by the benchmarks
+            progress = None
+        return await export_records_async(entity, user_input, format, filename, max_items, progress, overwrite)
@@ -1,14 +1,14 @@
 """Milestone & Pipeline MCP Tools"""
 
 from api.models import Milestone
-from api.milestones import list_milestones
+from api.milestones import list_milestones_async
 
 
 def register_milestone_tools(mcp):
     """Register all milestone-related MCP tools"""
     
     @mcp.tool()
-    def list_milestones_tool(page: int = 1, per_page: int = 50) -> list[Milestone]:
+    async def list_milestones_tool(page: int = 1, per_page: int = 50) -> list[Milestone]:
         """
         List all pipeline milestones used for tracking opportunity progress.
         
@@ -18,4 +18,4 @@ def register_milestone_tools(mcp):
         Returns:
             List[Milestone]: A list of Milestone objects with all details.
         """
-        return list_milestones(page=page, per_page=per_page)
\ No newline at end of file
+        return await list_milestones_async(page=page, per_page=per_page)
\ No newline at end of file
@@ -1,40 +1,60 @@
 """Opportunity (Sales) MCP Tools"""
 
-from typing import Optional
-from api.models import OpportunityCreate
-from api.opportunities import list_opportunities, get_opportunity, create_opportunity, update_opportunity, search_opportunities, find_opportunities
+from typing import List, Optional
+from api.models import OpportunityCreate, OpportunityUpdate
+from api.projection import Projection
+from api.rollup import rollup_opportunities_async
+from api.opportunities import list_opportunities_async, get_opportunity_async, get_opportunities_async, create_opportunity_async, update_opportunity_async, bulk_create_opportunities_async, bulk_update_opportunities_async, search_opportunities_async, find_opportunities_async, iter_opportunities_async, iter_find_opportunities_async
 
 
 def register_opportunity_tools(mcp):
     """Register all opportunity-related MCP tools"""
     
     @mcp.tool()
-    def list_opportunities_tool(page: int = 1, per_page: int = 50) -> list[dict]:
+    async def list_opportunities_tool(page: int = 1, per_page: int = 50, fields: Optional[List[str]] = None, compact: bool = False) -> list[dict]:
         """
         List all sales opportunities from CapsuleCRM with pagination.
         
         Args:
             page (int): The page of results to return (default: 1).
             per_page (int): The number of entities per page (default: 50).
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[dict]: A list of opportunity dictionaries. For reporting and value queries, use the 'current_value' attribute if present, as it reflects the probability-weighted value of the opportunity.
         """
-        return list_opportunities(page=page, per_page=per_page)
+        return await list_opportunities_async(page=page, per_page=per_page, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def get_opportunity_tool(opportunity_id: int) -> dict:
+    async def get_opportunity_tool(opportunity_id: int, fields: Optional[List[str]] = None, compact: bool = False) -> dict:
         """
         Get a specific sales opportunity by ID with full details.
         
         Args:
             opportunity_id (int): The unique ID of the opportunity.
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             dict: The opportunity details, including value, probability, and calculated fields. For reporting and value queries, use the 'current_value' attribute if present.
         """
-        return get_opportunity(opportunity_id)
+        return await get_opportunity_async(opportunity_id, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def create_opportunity_tool(opportunity: OpportunityCreate) -> dict:
+    async def get_opportunities_tool(opportunity_ids: List[int], fields: Optional[List[str]] = None, compact: bool = False) -> dict:
+        """
+        Get several sales opportunities by ID in one call; much faster than calling get_opportunity_tool repeatedly.
+        
+        Args:
+            opportunity_ids (List[int]): The IDs of the opportunities to fetch.
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            dict: 'opportunities' with the found opportunities in the order of opportunity_ids, and 'missing' with the IDs that do not exist.
+        """
+        return await get_opportunities_async(opportunity_ids, projection=Projection.of(fields, compact))
+
+    @mcp.tool()
+    async def create_opportunity_tool(opportunity: OpportunityCreate) -> dict:
         """
         Create a new sales opportunity with name, party, milestone, and value.
         
@@ -43,10 +63,10 @@ def register_opportunity_tools(mcp):
         Returns:
             dict: The created opportunity with assigned ID and calculated fields. For reporting and value queries, use the 'current_value' attribute if present.
         """
-        return create_opportunity(opportunity)
+        return await create_opportunity_async(opportunity)
 
     @mcp.tool()
-    def update_opportunity_tool(opportunity_id: int, opportunity: OpportunityCreate) -> dict:
+    async def update_opportunity_tool(opportunity_id: int, opportunity: OpportunityCreate) -> dict:
         """
         Update an existing sales opportunity by ID.
         
@@ -56,10 +76,36 @@ def register_opportunity_tools(mcp):
         Returns:
             dict: The updated opportunity with new details and calculated fields. For reporting and value queries, use the 'current_value' attribute if present.
         """
-        return update_opportunity(opportunity_id, opportunity)
+        return await update_opportunity_async(opportunity_id, opportunity)
+
+    @mcp.tool()
+    async def bulk_create_opportunities_tool(opportunities: List[OpportunityCreate], stop_on_error: bool = False) -> dict:
+        """
+        Create many opportunities in one call, several at a time; much faster than calling create_opportunity_tool repeatedly. value_type is applied per opportunity as in create_opportunity_tool.
+        
+        Args:
+            opportunities (List[OpportunityCreate]): The opportunities to create.
+            stop_on_error (bool): Stop starting new items after the first failure (default: False).
+        Returns:
+            dict: Counts per status and one entry per item in input order with status 'success', 'retried' (succeeded after a rate-limit or server-error retry), 'error' (with the error message) or 'skipped' (not attempted after stop_on_error).
+        """
+        return await bulk_create_opportunities_async(opportunities, stop_on_error=stop_on_error)
+
+    @mcp.tool()
+    async def bulk_update_opportunities_tool(updates: List[OpportunityUpdate], stop_on_error: bool = False) -> dict:
+        """
+        Update many opportunities in one call, several at a time; much faster than calling update_opportunity_tool repeatedly.
+        
+        Args:
+            updates (List[OpportunityUpdate]): The opportunity ID and new values for each opportunity to update.
+            stop_on_error (bool): Stop starting new items after the first failure (default: False).
+        Returns:
+            dict: Counts per status and one entry per item in input order with status 'success', 'retried' (succeeded after a rate-limit or server-error retry), 'error' (with the error message) or 'skipped' (not attempted after stop_on_error).
+        """
+        return await bulk_update_opportunities_async(updates, stop_on_error=stop_on_error)
 
     @mcp.tool()
-    def search_opportunities_tool(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None):
+    async def search_opportunities_tool(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False):
         """
         Search opportunities by name, description, or associated party details.
         
@@ -68,19 +114,66 @@ def register_opportunity_tools(mcp):
             page (int): The page of results to return (default: 1).
             per_page (int): The number of entities per page (default: 50).
             embed (str, optional): Comma-separated list of extra fields to include (e.g. 'tags,fields').
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[dict]: A list of matching opportunities with calculated fields. For reporting and value queries, use the 'current_value' attribute if present.
         """
-        return search_opportunities(q, page, per_page, embed)
+        return await search_opportunities_async(q, page, per_page, embed, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def find_opportunities_tool(user_input: dict):
+    async def find_opportunities_tool(user_input: dict, fields: Optional[List[str]] = None, compact: bool = False, explain: bool = False):
         """
         Find opportunities with structured filters or free text search.
         
         Args:
-            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'status', 'tag', 'owner', etc.
+            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'status', 'tag', 'owner', etc. Filter values may be a list (any of them matches), use an operator suffix ('addedOn_after', 'name_contains', '_before', '_starts', '_ends', '_gt', '_lt', '_within', '_not') or {'operator': ..., 'value': ...}; 'any' takes a list of filter dicts of which one must match; 'order_by' sorts ('-addedOn' for descending); 'page' and 'per_page' (above 100 is fetched in several requests) and 'embed' are passed on.
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+            explain (bool): Return {'results': [...], 'explain': {...}} where explain tells which plan answered the query (mirror, search_index, filter, filter_union, search or list), which plans were passed over and why, and how many API requests it cost (default: False).
         Returns:
             List[dict]: A list of matching opportunities with calculated fields. For reporting and value queries, use the 'current_value' attribute if present.
         """
-        return find_opportunities(user_input)
\ No newline at end of file
+        return await find_opportunities_async(user_input, projection=Projection.of(fields, compact), explain=explain)
+
+    @mcp.tool()
+    async def list_opportunities_all_tool(max_items: int = 1000, fields: Optional[List[str]] = None, compact: bool = False) -> list[dict]:
+        """
+        List all sales opportunities in one call, following pagination automatically.
+        
+        Args:
+            max_items (int): The maximum number of opportunities to return (default: 1000).
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            List[dict]: A list of opportunity dictionaries. For reporting and value queries, use the 'current_value' attribute if present.
+        """
+        return [opportunity async for opportunity in iter_opportunities_async(max_items=max_items, projection=Projection.of(fields, compact))]
+
+    @mcp.tool()
+    async def find_opportunities_all_tool(user_input: dict, max_items: int = 1000, fields: Optional[List[str]] = None, compact: bool = False) -> list[dict]:
+        """
+        Find all matching opportunities in one call (e.g. all open opportunities), following pagination automatically.
+        
+        Args:
+            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'status', 'tag', 'owner', etc. Filter values may be a list (any of them matches), use an operator suffix ('addedOn_after', 'name_contains', '_before', '_starts', '_ends', '_gt', '_lt', '_within', '_not') or {'operator': ..., 'value': ...}; 'any' takes a list of filter dicts of which one must match; 'order_by' sorts ('-addedOn' for descending); 'page' and 'per_page' (above 100 is fetched in several requests) and 'embed' are passed on.
+            max_items (int): The maximum number of opportunities to return (default: 1000).
+            fields (List[str], optional): Only return these fields, e.g. ['name', 'value', 'milestone.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            List[dict]: A list of matching opportunities. For reporting and value queries, use the 'current_value' attribute if present.
+        """
+        return [opportunity async for opportunity in iter_find_opportunities_async(user_input, max_items=max_items, projection=Projection.of(fields, compact))]
+
+    @mcp.tool()
+    async def pipeline_value_rollup_tool(group_by: Optional[List[str]] = None, include_closed: bool = False) -> dict:
+        """
+        Total and probability-weighted value of the whole sales pipeline, grouped server-side in one call. Use this instead of listing opportunities and adding up values for questions like "weighted pipeline by milestone" or "expected revenue per month".
+        
+        Args:
+            group_by (List[str], optional): Any of 'milestone', 'owner', 'currency', 'close_month' (month of expectedCloseOn, e.g. '2025-03'). Defaults to ['milestone', 'currency']; pass [] for a single grand total.
+            include_closed (bool): Also include won and lost opportunities (default: False).
+        Returns:
+            dict: One entry per group with count, total_value (amount times duration for non-FIXED durations) and weighted_value (total_value times probability / 100, the same as 'current_value'), ordered by weighted_value. Values in different currencies are only kept apart when grouping by currency.
+        """
+        return await rollup_opportunities_async(["milestone", "currency"] if group_by is None else group_by, include_closed)
@@ -1,40 +1,60 @@
 """Party (People & Organizations) MCP Tools"""
 
-from typing import Optional
+from typing import List, Optional, Union
 from api.models import Party
-from api.parties import list_parties, get_party, create_party, update_party, search_parties, find_parties
+from api.projection import Projection
+from api.parties import list_parties_async, get_party_async, get_parties_async, create_party_async, update_party_async, bulk_create_parties_async, bulk_update_parties_async, search_parties_async, find_parties_async, iter_parties_async, iter_find_parties_async
+from api.party360 import party_360_async
 
 
 def register_party_tools(mcp):
     """Register all party-related MCP tools"""
     
     @mcp.tool()
-    def list_parties_tool(page: int = 1, per_page: int = 50) -> list[Party]:
+    async def list_parties_tool(page: int = 1, per_page: int = 50, fields: Optional[List[str]] = None, compact: bool = False) -> list[Union[Party, dict]]:
         """
         List all parties (people and organizations) from CapsuleCRM with pagination.
         
         Args:
             page (int): The page of results to return (default: 1).
             per_page (int): The number of entities per page (default: 50).
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[Party]: A list of Party objects (Person or Organisation) with all available details.
         """
-        return list_parties(page=page, per_page=per_page)
+        return await list_parties_async(page=page, per_page=per_page, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def get_party_tool(party_id: int) -> Party:
+    async def get_party_tool(party_id: int, fields: Optional[List[str]] = None, compact: bool = False) -> Union[Party, dict]:
         """
         Get a specific party (person or organization) by ID.
         
         Args:
             party_id (int): The unique ID of the party.
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             Party: The requested Party object (Person or Organisation) with all details.
         """
-        return get_party(party_id)
+        return await get_party_async(party_id, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def create_party_tool(party: Party) -> Party:
+    async def get_parties_tool(party_ids: List[int], fields: Optional[List[str]] = None, compact: bool = False) -> dict:
+        """
+        Get several parties by ID in one call; much faster than calling get_party_tool repeatedly.
+        
+        Args:
+            party_ids (List[int]): The IDs of the parties to fetch.
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            dict: 'parties' with the found Party objects in the order of party_ids, and 'missing' with the IDs that do not exist.
+        """
+        return await get_parties_async(party_ids, projection=Projection.of(fields, compact))
+
+    @mcp.tool()
+    async def create_party_tool(party: Party) -> Party:
         """
         Create a new party (person or organization) in CapsuleCRM.
         
@@ -43,10 +63,10 @@ def register_party_tools(mcp):
         Returns:
             Party: The created Party object with assigned ID and details.
         """
-        return create_party(party)
+        return await create_party_async(party)
 
     @mcp.tool()
-    def update_party_tool(party_id: int, party: Party) -> Party:
+    async def update_party_tool(party_id: int, party: Party) -> Party:
         """
         Update an existing party by ID.
         
@@ -56,10 +76,36 @@ def register_party_tools(mcp):
         Returns:
             Party: The updated Party object with new details.
         """
-        return update_party(party_id, party)
+        return await update_party_async(party_id, party)
+
+    @mcp.tool()
+    async def bulk_create_parties_tool(parties: List[Party], stop_on_error: bool = False) -> dict:
+        """
+        Create many parties in one call, several at a time; much faster than calling create_party_tool repeatedly.
+        
+        Args:
+            parties (List[Party]): The parties to create.
+            stop_on_error (bool): Stop starting new items after the first failure (default: False).
+        Returns:
+            dict: Counts per status and one entry per item in input order with status 'success', 'retried' (succeeded after a rate-limit or server-error retry), 'error' (with the error message) or 'skipped' (not attempted after stop_on_error).
+        """
+        return await bulk_create_parties_async(parties, stop_on_error=stop_on_error)
 
     @mcp.tool()
-    def search_parties_tool(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None):
+    async def bulk_update_parties_tool(parties: List[Party], stop_on_error: bool = False) -> dict:
+        """
+        Update many parties in one call, several at a time; much faster than calling update_party_tool repeatedly.
+        
+        Args:
+            parties (List[Party]): The updated Party objects; each is matched by its id.
+            stop_on_error (bool): Stop starting new items after the first failure (default: False).
+        Returns:
+            dict: Counts per status and one entry per item in input order with status 'success', 'retried' (succeeded after a rate-limit or server-error retry), 'error' (with the error message) or 'skipped' (not attempted after stop_on_error).
+        """
+        return await bulk_update_parties_async(parties, stop_on_error=stop_on_error)
+
+    @mcp.tool()
+    async def search_parties_tool(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False):
         """
         Search parties by name, address, phone number, or email address.
         
@@ -68,19 +114,69 @@ def register_party_tools(mcp):
             page (int): The page of results to return (default: 1).
             per_page (int): The number of entities per page (default: 50).
             embed (str, optional): Comma-separated list of extra fields to include (e.g. 'tags,fields').
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[Party]: A list of matching Party objects.
         """
-        return search_parties(q, page, per_page, embed)
+        return await search_parties_async(q, page, per_page, embed, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def find_parties_tool(user_input: dict):
+    async def find_parties_tool(user_input: dict, fields: Optional[List[str]] = None, compact: bool = False, explain: bool = False):
         """
         Find parties (people/organizations) with structured filters or free text search.
         
         Args:
-            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'tag', 'type', 'owner', etc.
+            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'tag', 'type', 'owner', etc. Filter values may be a list (any of them matches), use an operator suffix ('addedOn_after', 'name_contains', '_before', '_starts', '_ends', '_gt', '_lt', '_within', '_not') or {'operator': ..., 'value': ...}; 'any' takes a list of filter dicts of which one must match; 'order_by' sorts ('-addedOn' for descending); 'page' and 'per_page' (above 100 is fetched in several requests) and 'embed' are passed on.
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+            explain (bool): Return {'results': [...], 'explain': {...}} where explain tells which plan answered the query (mirror, search_index, filter, filter_union, search or list), which plans were passed over and why, and how many API requests it cost (default: False).
+        Returns:
+            List[Party]: A list of matching Party objects.
+        """
+        return await find_parties_async(user_input, projection=Projection.of(fields, compact), explain=explain)
+
+    @mcp.tool()
+    async def list_parties_all_tool(max_items: int = 1000, fields: Optional[List[str]] = None, compact: bool = False) -> list[Union[Party, dict]]:
+        """
+        List all parties (people and organizations) in one call, following pagination automatically.
+        
+        Args:
+            max_items (int): The maximum number of parties to return (default: 1000).
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            List[Party]: A list of Party objects (Person or Organisation) with all available details.
+        """
+        return [party async for party in iter_parties_async(max_items=max_items, projection=Projection.of(fields, compact))]
+
+    @mcp.tool()
+    async def find_parties_all_tool(user_input: dict, max_items: int = 1000, fields: Optional[List[str]] = None, compact: bool = False) -> list[Union[Party, dict]]:
+        """
+        Find all matching parties in one call, following pagination automatically. Prefer this over repeated find_parties_tool calls with increasing pages.
+        
+        Args:
+            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'tag', 'type', 'owner', etc. Filter values may be a list (any of them matches), use an operator suffix ('addedOn_after', 'name_contains', '_before', '_starts', '_ends', '_gt', '_lt', '_within', '_not') or {'operator': ..., 'value': ...}; 'any' takes a list of filter dicts of which one must match; 'order_by' sorts ('-addedOn' for descending); 'page' and 'per_page' (above 100 is fetched in several requests) and 'embed' are passed on.
+            max_items (int): The maximum number of parties to return (default: 1000).
+            fields (List[str], optional): Only return these fields, e.g. ['firstName', 'lastName', 'name', 'emailAddresses.address']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[Party]: A list of matching Party objects.
         """
-        return find_parties(user_input)
\ No newline at end of file
+        return [party async for party in iter_find_parties_async(user_input, max_items=max_items, projection=Projection.of(fields, compact))]
+
+    @mcp.tool()
+    async def party_360_tool(party: Union[int, str], max_opportunities: int = 50, max_tasks: int = 50, max_people: int = 50, compact: bool = True) -> dict:
+        """
+        Get everything about one party in a single call: the party with its tags and custom fields, its people (for an organization) or its organization (for a person), its opportunities and its open tasks, fetched concurrently. Prefer this over separate get_party, find_opportunities and find_tasks calls.
+        
+        Args:
+            party (int | str): The party ID, or a name to search for; an exact name match is preferred over the first search result.
+            max_opportunities (int): The maximum number of opportunities to return (default: 50).
+            max_tasks (int): The maximum number of open tasks to return (default: 50).
+            max_people (int): The maximum number of people of an organization to return (default: 50).
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: True).
+        Returns:
+            dict: {'party', 'people' or 'organisation', 'opportunities', 'open_tasks', 'summary' (counts, open value per currency, overdue tasks, lists cut off at their maximum), 'matched_by' ('id' or 'name'), 'other_matches' (other parties the name matched), 'upstream_requests'}. The party is not repeated inside its opportunities and tasks.
+        """
+        return await party_360_async(party, max_opportunities=max_opportunities, max_tasks=max_tasks, max_people=max_people, compact=compact)
@@ -0,0 +1,186 @@
+"""Tool registration, eager or on first use, and the middleware timing, tracing, profiling, draining and routing tool calls"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from fastmcp.exceptions import ToolError
+from fastmcp.server.middleware import Middleware
+from api.metrics import get_metrics
+from api.tracing import span
+from api.profiling import get_profiler
+from api.utils import use_tenant
+
+logger = logging.getLogger("capsulecrm-mcp")
+
+
+def register_all_tools(mcp):
+    """
+    Import every tool module and register its tools.
+
+    Generating the JSON schemas of the tools' arguments and results takes most of
+    the server's startup time, so this is deferred by LazyTools unless
+    CAPSULECRM_LAZY_TOOLS=0.
+    """
+    from tools.parties import register_party_tools
+    from tools.opportunities import register_opportunity_tools
+    from tools.tasks import register_task_tools
+    from tools.milestones import register_milestone_tools
+    from tools.status import register_status_tools
+    from tools.export import register_export_tools
+
+    register_party_tools(mcp)
+    register_opportunity_tools(mcp)
+    register_task_tools(mcp)
+    register_milestone_tools(mcp)
+    register_status_tools(mcp)
+    register_export_tools(mcp)
+
+
+class LazyTools(Middleware):
+    """
+    Registers the tools when they are first listed or called instead of at import.
+
+    The server can then answer the MCP handshake before the tool modules are
+    imported and their schemas built. load() is also started in the background
+    once the server runs, so the tools are usually ready by the time the client
+    asks for them.
+    """
+
+    def __init__(self, mcp):
+        self.mcp = mcp
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Register the tools unless already done. Safe to call from any thread."""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            start = time.perf_counter()
+            register_all_tools(self.mcp)
+            self.loaded = True
+        logger.info(f"Registered MCP tools in {time.perf_counter() - start:.2f}s")
+
+    async def _ensure_loaded(self):
+        if not self.loaded:
+            await asyncio.to_thread(self.load)
+
+    async def on_list_tools(self, context, call_next):
+        await self._ensure_loaded()
+        return await call_next(context)
+
+    async def on_call_tool(self, context, call_next):
+        await self._ensure_loaded()
+        return await call_next(context)
+
+    async def on_list_resources(self, context, call_next):
+        await self._ensure_loaded()
+        return await call_next(context)
+
+    async def on_read_resource(self, context, call_next):
+        await self._ensure_loaded()
+        return await call_next(context)
+
+
+class ToolMetrics(Middleware):
+    """Records the latency and errors of every tool call in the metrics registry (see server_stats_tool)."""
+
+    def __init__(self):
+        self.metrics = get_metrics()
+
+    async def on_call_tool(self, context, call_next):
+        start = time.perf_counter()
+        try:
+            result = await call_next(context)
+        except Exception:
+            self.metrics.record_tool(context.message.name, time.perf_counter() - start, error=True)
+            raise
+        self.metrics.record_tool(context.message.name, time.perf_counter() - start)
+        return result
+
+
+class ToolTracing(Middleware):
+    """Opens the root span of each tool call, under which the api functions and HTTP attempts nest (see api.tracing)."""
+
+    async def on_call_tool(self, context, call_next):
+        with span(f"tool {context.message.name}", tool=context.message.name):
+            return await call_next(context)
+
+
+class ToolProfiler(Middleware):
+    """Profiles tool calls while the profiler is armed (see profile_next_calls_tool)."""
+
+    def __init__(self):
+        self.profiler = get_profiler()
+
+    async def on_call_tool(self, context, call_next):
+        if not self.profiler.remaining:
+            return await call_next(context)
+        with self.profiler.profile(context.message.name):
+            return await call_next(context)
+
+
+class ToolDrain(Middleware):
+    """
+    Tracks running tool calls so shutdown can wait for them (see drain()); once
+    draining, new calls are refused instead of being cut off halfway.
+    """
+
+    def __init__(self):
+        self.running = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def on_call_tool(self, context, call_next):
+        if self.draining:
+            raise ToolError("The server is shutting down; retry the call in a moment")
+        self.running += 1
+        self._idle.clear()
+        try:
+            return await call_next(context)
+        finally:
+            self.running -= 1
+            if not self.running:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """Refuse new tool calls and wait up to `timeout` seconds for running ones; returns how many are still running."""
+        self.draining = True
+        if self.running:
+            logger.info(f"Waiting for {self.running} running tool calls to finish")
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.running} tool calls still running after {timeout:.0f}s, shutting down anyway")
+        return self.running
+
+
+class ToolTenant(Middleware):
+    """
+    Runs each tool call on the CapsuleCRM account whose access token the client sent
+    in the CAPSULECRM_TENANT_HEADER header (default: X-Capsule-Token), with that
+    account's own connection pool, request budget and caches (see api.tenants).
+    Calls without the header, over stdio, or with CAPSULECRM_MULTI_TENANT unset use
+    CAPSULECRM_ACCESS_TOKEN.
+    """
+
+    def __init__(self):
+        self.header = os.getenv("CAPSULECRM_TENANT_HEADER", "X-Capsule-Token")
+
+    def _token(self, context):
+        try:
+            # The HTTP request this message arrived with; None over stdio
+            request = context.fastmcp_context.request_context.request
+        except (AttributeError, LookupError, ValueError):
+            return None
+        return request.headers.get(self.header) if request is not None else None
+
+    async def on_call_tool(self, context, call_next):
+        with use_tenant(self._token(context)):
+            return await call_next(context)
+
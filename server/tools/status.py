@@ -0,0 +1,180 @@
+"""Server Status MCP Tools"""
+
+import asyncio
+from typing import Optional
+from api.utils import get_rate_limit_budget, get_coalescing_stats, get_tenants, get_disk_cache, invalidate_disk_cache
+from api.tenants import current_tenant
+from api.reference import invalidate_reference_data
+from api.entity_cache import get_entity_cache
+from api.mirror import get_mirror
+from api.metrics import get_metrics
+from api.profiling import get_profiler
+from api.tracing import get_tracer
+from api.webhooks import get_webhook_receiver
+
+
+def _gauges() -> dict:
+    """Point-in-time figures owned by other components, as Prometheus gauges."""
+    budget = get_rate_limit_budget()
+    cache = get_entity_cache().stats()
+    coalescing = get_coalescing_stats()
+    return {
+        "rate_limit_remaining": budget["remaining"],
+        "rate_limit_limit": budget["limit"],
+        "rate_limit_tokens_available": budget["tokens_available"],
+        "entity_cache_hits": cache["hits"],
+        "entity_cache_revalidated": cache["revalidated"],
+        "entity_cache_misses": cache["misses"],
+        "entity_cache_entries": cache["entries"],
+        "entity_cache_bytes": cache["bytes"],
+        "coalescing_requests": coalescing["requests"],
+        "coalescing_deduplicated": coalescing["deduplicated"],
+        "tenants_open": get_tenants().stats(detail=False)["open"],
+        **_webhook_gauges(),
+    }
+
+
+def _disk_cache_stats() -> dict:
+    cache = get_disk_cache()
+    return {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+
+
+def _webhook_stats() -> dict:
+    receiver = get_webhook_receiver()
+    return {"enabled": False} if receiver is None else {"enabled": True, **receiver.stats()}
+
+
+def _webhook_gauges() -> dict:
+    stats = _webhook_stats()
+    if not stats["enabled"]:
+        return {}
+    return {f"webhook_events_{key}": stats[key] for key in ("received", "rejected", "coalesced", "pending")}
+
+
+def register_status_tools(mcp):
+    """Register all server status MCP tools"""
+    
+    @mcp.tool()
+    async def get_rate_limit_tool() -> dict:
+        """
+        Get the remaining CapsuleCRM API request budget.
+        
+        Returns:
+            dict: The request limit, remaining requests and seconds until the budget resets as last reported by CapsuleCRM, plus how fast requests are currently being paced. 'coalescing' counts reads sent upstream and identical concurrent reads that shared them instead of using budget. Use this before large list or search jobs to decide whether to narrow the query.
+        """
+        return {**get_rate_limit_budget(), "coalescing": get_coalescing_stats()}
+
+    @mcp.tool()
+    async def refresh_reference_data_tool(kind: Optional[str] = None) -> dict:
+        """
+        Discard cached milestones, pipelines, task categories or users so they are fetched fresh on next use. Use this after pipeline or user settings were changed in CapsuleCRM.
+        
+        Args:
+            kind (str, optional): One of 'milestones', 'pipelines', 'categories', 'users'. Omit to refresh everything.
+        Returns:
+            dict: The kinds that were invalidated.
+        """
+        invalidate_reference_data(kind)
+        return {"invalidated": kind or "all"}
+
+    @mcp.tool()
+    async def get_entity_cache_stats_tool() -> dict:
+        """
+        Get hit and miss counters of the cache used by get_party_tool, get_opportunity_tool and get_task_tool.
+        
+        Returns:
+            dict: Number and size of cached records, the configured limits, and how many lookups were served from cache (hits), confirmed unchanged with the API (revalidated) or fetched in full (misses).
+        """
+        return get_entity_cache().stats()
+
+    @mcp.tool()
+    async def wipe_disk_cache_tool() -> dict:
+        """
+        Delete the CapsuleCRM responses stored on disk (CAPSULECRM_DISK_CACHE_PATH) so that nothing fetched before is reused after a restart. Use this when the stored data must go, e.g. after switching accounts or when asked to forget cached CRM data.
+        
+        Returns:
+            dict: How many stored responses were deleted and the cache's figures afterwards, or enabled=False if the disk cache is not configured.
+        """
+        cache = get_disk_cache()
+        if cache is None:
+            return {"enabled": False}
+        # Another account's call only removes that account's responses
+        wiped = await asyncio.to_thread(cache.wipe) if current_tenant() is None else invalidate_disk_cache()
+        return {"wiped": wiped, **_disk_cache_stats()}
+
+    @mcp.tool()
+    async def server_stats_tool(format: str = "json", reset: bool = False) -> dict:
+        """
+        Get where time goes in this server: latency per CapsuleCRM endpoint and per tool, plus cache, coalescing and rate-limit figures.
+        
+        Args:
+            format (str, optional): 'json' (default) for a summary, or 'prometheus' for the Prometheus text exposition format.
+            reset (bool, optional): Clear the endpoint and tool figures after reading them. Defaults to False.
+        Returns:
+            dict: For 'json', per endpoint (method and path with ids as {id}) the request count, latency percentiles in ms, status codes, errors, retries, 429s and response bytes; per tool the call count, latency and errors; the rate-limit budget, coalescing and entity cache stats of the account the call works on; the on-disk response cache; the webhook events received, rejected, coalesced and applied; and the accounts open in multi-tenant mode. For 'prometheus', {"prometheus": text}.
+        """
+        metrics = get_metrics()
+        if format == "prometheus":
+            result = {"prometheus": metrics.prometheus(_gauges())}
+        elif format == "json":
+            result = {
+                **metrics.snapshot(),
+                "rate_limit": get_rate_limit_budget(),
+                "coalescing": get_coalescing_stats(),
+                "entity_cache": get_entity_cache().stats(),
+                "disk_cache": _disk_cache_stats(),
+                "webhooks": _webhook_stats(),
+                # Other accounts' figures are only shown to the process's own
+                "tenants": get_tenants().stats(detail=current_tenant() is None),
+            }
+        else:
+            raise ValueError(f"Unknown format: {format} - use 'json' or 'prometheus'")
+        if reset:
+            metrics.reset()
+        return result
+
+    @mcp.resource("capsulecrm://metrics", mime_type="text/plain")
+    def metrics_resource() -> str:
+        """Server metrics in the Prometheus text exposition format."""
+        return get_metrics().prometheus(_gauges())
+
+    @mcp.tool()
+    async def profile_next_calls_tool(calls: int = 1, mode: str = "cprofile") -> dict:
+        """
+        Profile the next tool calls and write one profile per call to disk, to find out where a slow tool spends its time.
+        
+        Args:
+            calls (int, optional): Number of upcoming tool calls to profile; 0 cancels profiling. Defaults to 1.
+            mode (str, optional): 'cprofile' (default) for exact call counts and times in a .prof file (pstats, snakeviz), or 'sampling' for low-overhead folded stacks in a .folded file (flamegraph.pl, speedscope).
+        Returns:
+            dict: Calls left to profile, the mode, the directory the profiles are written to and the most recent profile files; 'tracing' tells whether span tracing (CAPSULECRM_TRACE_FILE) is on and where traces go.
+        """
+        return {**get_profiler().arm(calls, mode), "tracing": get_tracer().stats()}
+
+    @mcp.tool()
+    async def get_mirror_status_tool() -> dict:
+        """
+        Get the state of the local CRM mirror that find_parties_tool, find_opportunities_tool and find_tasks_tool answer from when it is fresh.
+        
+        Returns:
+            dict: Record counts and time since the last sync per entity, or enabled=False if CAPSULECRM_MIRROR_PATH is not set.
+        """
+        mirror = get_mirror()
+        if mirror is None:
+            return {"enabled": False}
+        return {"enabled": True, **await asyncio.to_thread(mirror.status)}
+
+    @mcp.tool()
+    async def sync_mirror_tool(full: bool = False) -> dict:
+        """
+        Sync the local CRM mirror with CapsuleCRM now instead of waiting for the next scheduled sync.
+        
+        Args:
+            full (bool, optional): Re-download every record instead of only changes since the last sync. Defaults to False.
+        Returns:
+            dict: Number of records received per entity.
+        """
+        mirror = get_mirror()
+        if mirror is None:
+            raise ValueError("The CRM mirror is not enabled - set CAPSULECRM_MIRROR_PATH to use it")
+        return await asyncio.to_thread(mirror.sync, full)
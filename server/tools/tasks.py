@@ -1,15 +1,16 @@
 """Task Management MCP Tools"""
 
-from typing import Optional
+from typing import List, Optional, Union
 from api.models import Task
-from api.tasks import list_tasks, get_task, create_task, update_task, search_tasks, find_tasks
+from api.projection import Projection
+from api.tasks import list_tasks_async, get_task_async, get_tasks_async, create_task_async, update_task_async, bulk_create_tasks_async, bulk_update_tasks_async, search_tasks_async, find_tasks_async, iter_tasks_async, iter_find_tasks_async
 
 
 def register_task_tools(mcp):
     """Register all task-related MCP tools"""
     
     @mcp.tool()
-    def list_tasks_tool(page: int = 1, per_page: int = 50, status: str = "open") -> list[Task]:
+    async def list_tasks_tool(page: int = 1, per_page: int = 50, status: str = "open", fields: Optional[List[str]] = None, compact: bool = False) -> list[Union[Task, dict]]:
         """
         List tasks with filtering by status: 'open', 'completed', or 'pending'.
         
@@ -17,25 +18,43 @@ def register_task_tools(mcp):
             page (int): The page of results to return (default: 1).
             per_page (int): The number of entities per page (default: 50).
             status (str): Filter by task status ('open', 'completed', 'pending').
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[Task]: A list of Task objects with all details.
         """
-        return list_tasks(page=page, per_page=per_page, status=status)
+        return await list_tasks_async(page=page, per_page=per_page, status=status, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def get_task_tool(task_id: int) -> Task:
+    async def get_task_tool(task_id: int, fields: Optional[List[str]] = None, compact: bool = False) -> Union[Task, dict]:
         """
         Get a specific task by ID with full details including due date and owner.
         
         Args:
             task_id (int): The unique ID of the task.
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             Task: The requested Task object with all details.
         """
-        return get_task(task_id)
+        return await get_task_async(task_id, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def create_task_tool(task: Task) -> Task:
+    async def get_tasks_tool(task_ids: List[int], fields: Optional[List[str]] = None, compact: bool = False) -> dict:
+        """
+        Get several tasks by ID in one call; much faster than calling get_task_tool repeatedly.
+        
+        Args:
+            task_ids (List[int]): The IDs of the tasks to fetch.
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            dict: 'tasks' with the found Task objects in the order of task_ids, and 'missing' with the IDs that do not exist.
+        """
+        return await get_tasks_async(task_ids, projection=Projection.of(fields, compact))
+
+    @mcp.tool()
+    async def create_task_tool(task: Task) -> Task:
         """
         Create a new task with description, due date, and assignment details.
         
@@ -44,10 +63,10 @@ def register_task_tools(mcp):
         Returns:
             Task: The created Task object with assigned ID and details.
         """
-        return create_task(task)
+        return await create_task_async(task)
 
     @mcp.tool()
-    def update_task_tool(task_id: int, task: Task) -> Task:
+    async def update_task_tool(task_id: int, task: Task) -> Task:
         """
         Update an existing task by ID, including status, due date, or assignment.
         
@@ -57,10 +76,36 @@ def register_task_tools(mcp):
         Returns:
             Task: The updated Task object with new details.
         """
-        return update_task(task_id, task)
+        return await update_task_async(task_id, task)
+
+    @mcp.tool()
+    async def bulk_create_tasks_tool(tasks: List[Task], stop_on_error: bool = False) -> dict:
+        """
+        Create many tasks in one call, several at a time; much faster than calling create_task_tool repeatedly.
+        
+        Args:
+            tasks (List[Task]): The tasks to create.
+            stop_on_error (bool): Stop starting new items after the first failure (default: False).
+        Returns:
+            dict: Counts per status and one entry per item in input order with status 'success', 'retried' (succeeded after a rate-limit or server-error retry), 'error' (with the error message) or 'skipped' (not attempted after stop_on_error).
+        """
+        return await bulk_create_tasks_async(tasks, stop_on_error=stop_on_error)
+
+    @mcp.tool()
+    async def bulk_update_tasks_tool(tasks: List[Task], stop_on_error: bool = False) -> dict:
+        """
+        Update many tasks in one call, several at a time; much faster than calling update_task_tool repeatedly.
+        
+        Args:
+            tasks (List[Task]): The updated Task objects; each is matched by its id.
+            stop_on_error (bool): Stop starting new items after the first failure (default: False).
+        Returns:
+            dict: Counts per status and one entry per item in input order with status 'success', 'retried' (succeeded after a rate-limit or server-error retry), 'error' (with the error message) or 'skipped' (not attempted after stop_on_error).
+        """
+        return await bulk_update_tasks_async(tasks, stop_on_error=stop_on_error)
 
     @mcp.tool()
-    def search_tasks_tool(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None):
+    async def search_tasks_tool(q: str, page: int = 1, per_page: int = 50, embed: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False):
         """
         Search tasks by description, status, or associated party/opportunity.
         
@@ -69,19 +114,54 @@ def register_task_tools(mcp):
             page (int): The page of results to return (default: 1).
             per_page (int): The number of entities per page (default: 50).
             embed (str, optional): Comma-separated list of extra fields to include (e.g. 'party,opportunity').
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[Task]: A list of matching Task objects.
         """
-        return search_tasks(q, page, per_page, embed)
+        return await search_tasks_async(q, page, per_page, embed, projection=Projection.of(fields, compact))
 
     @mcp.tool()
-    def find_tasks_tool(user_input: dict):
+    async def find_tasks_tool(user_input: dict, fields: Optional[List[str]] = None, compact: bool = False, explain: bool = False):
         """
         Find tasks with structured filters or free text search.
         
         Args:
-            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'status', 'tag', 'owner', etc.
+            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'status', 'tag', 'owner', etc. Filter values may be a list (any of them matches), use an operator suffix ('addedOn_after', 'name_contains', '_before', '_starts', '_ends', '_gt', '_lt', '_within', '_not') or {'operator': ..., 'value': ...}; 'any' takes a list of filter dicts of which one must match; 'order_by' sorts ('-addedOn' for descending); 'page' and 'per_page' (above 100 is fetched in several requests) and 'embed' are passed on.
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+            explain (bool): Return {'results': [...], 'explain': {...}} where explain tells which plan answered the query (mirror, search_index, filter, filter_union, search or list), which plans were passed over and why, and how many API requests it cost (default: False).
+        Returns:
+            List[Task]: A list of matching Task objects.
+        """
+        return await find_tasks_async(user_input, projection=Projection.of(fields, compact), explain=explain)
+
+    @mcp.tool()
+    async def list_tasks_all_tool(status: str = "open", max_items: int = 1000, fields: Optional[List[str]] = None, compact: bool = False) -> list[Union[Task, dict]]:
+        """
+        List all tasks with the given status in one call, following pagination automatically.
+        
+        Args:
+            status (str): Filter by task status ('open', 'completed', 'pending').
+            max_items (int): The maximum number of tasks to return (default: 1000).
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
+        Returns:
+            List[Task]: A list of Task objects with all details.
+        """
+        return [task async for task in iter_tasks_async(status=status, max_items=max_items, projection=Projection.of(fields, compact))]
+
+    @mcp.tool()
+    async def find_tasks_all_tool(user_input: dict, max_items: int = 1000, fields: Optional[List[str]] = None, compact: bool = False) -> list[Union[Task, dict]]:
+        """
+        Find all matching tasks in one call, following pagination automatically.
+        
+        Args:
+            user_input (dict): Dictionary of search and/or filter parameters. Use 'q' for free text, or filterable fields like 'status', 'tag', 'owner', etc. Filter values may be a list (any of them matches), use an operator suffix ('addedOn_after', 'name_contains', '_before', '_starts', '_ends', '_gt', '_lt', '_within', '_not') or {'operator': ..., 'value': ...}; 'any' takes a list of filter dicts of which one must match; 'order_by' sorts ('-addedOn' for descending); 'page' and 'per_page' (above 100 is fetched in several requests) and 'embed' are passed on.
+            max_items (int): The maximum number of tasks to return (default: 1000).
+            fields (List[str], optional): Only return these fields, e.g. ['description', 'dueOn', 'party.name']; nested fields with dots. 'id' is always returned.
+            compact (bool): Drop empty values and reduce nested owner, party and milestone objects to id and name (default: False).
         Returns:
             List[Task]: A list of matching Task objects.
         """
-        return find_tasks(user_input)
\ No newline at end of file
+        return [task async for task in iter_find_tasks_async(user_input, max_items=max_items, projection=Projection.of(fields, compact))]
@@ -0,0 +1,176 @@
+"""Serving the MCP server to many clients over HTTP (streamable HTTP or SSE) instead of stdio"""
+
+import os
+import hmac
+import json
+import signal
+import asyncio
+import logging
+from contextlib import asynccontextmanager, AbstractAsyncContextManager
+from typing import Callable, Awaitable
+import uvicorn
+from starlette.middleware import Middleware as ASGIMiddleware
+from api.config import env_int
+
+logger = logging.getLogger("capsulecrm-mcp")
+
+TRANSPORTS = ("stdio", "http", "streamable-http", "sse")
+
+
+class BearerToken:
+    """ASGI middleware rejecting HTTP requests that do not carry `Authorization: Bearer <token>`."""
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.expected = f"Bearer {token}".encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            authorization = dict(scope["headers"]).get(b"authorization", b"")
+            if not hmac.compare_digest(authorization, self.expected):
+                body = json.dumps({"error": "unauthorized"}).encode()
+                await send({"type": "http.response.start", "status": 401, "headers": [
+                    (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    (b"www-authenticate", b"Bearer")]})
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
+
+
+class _Requests:
+    """
+    ASGI wrapper counting the requests whose response is not complete yet: tool calls
+    and every other message a session sends. Long-lived GET event streams are not
+    counted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.running = 0
+        self.finished = 0.0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "GET":
+            return await self.app(scope, receive, send)
+        self.running += 1
+        self._idle.clear()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.running -= 1
+            self.finished = asyncio.get_running_loop().time()
+            if not self.running:
+                self._idle.set()
+
+    async def wait(self, timeout: float, quiet: float = 0.0):
+        """Wait up to `timeout` seconds until no request has been running for `quiet` seconds, counted from now at the earliest."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + max(timeout, 0)
+        while True:
+            try:
+                await asyncio.wait_for(self._idle.wait(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.running} responses still being sent, shutting down anyway")
+                return
+            remaining = min(max(self.finished, start) + quiet, deadline) - loop.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+
+class _DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that lets running tool calls finish before shutting down. SSE
+    responses (every streamable HTTP tool call and every SSE session) end as soon as
+    uvicorn sees the signal, so the first SIGTERM/SIGINT only starts drain() and keeps
+    serving until the responses in flight are sent and the sessions have been quiet
+    for `settle` seconds; the server is told to exit after that. A second signal
+    exits right away.
+    """
+
+    def __init__(self, config: uvicorn.Config, requests: _Requests, drain: Callable[[float], Awaitable[int]],
+                 timeout: float, settle: float = 0.0):
+        super().__init__(config)
+        self.requests = requests
+        self.drain = drain
+        self.timeout = timeout
+        self.settle = settle
+        self.draining = None
+
+    async def startup(self, sockets=None):
+        self.loop = asyncio.get_running_loop()
+        await super().startup(sockets)
+
+    def handle_exit(self, sig, frame):
+        if self.draining is not None or not hasattr(self, "loop"):
+            return super().handle_exit(sig, frame)
+        logger.info(f"Received {signal.Signals(sig).name}, finishing running tool calls")
+        self.draining = self.loop.create_task(self._drain_and_exit(sig, frame))
+
+    async def _drain_and_exit(self, sig, frame):
+        deadline = self.loop.time() + self.timeout
+        try:
+            await self.drain(self.timeout)
+            # A tool's result still has to pass through the session to its response (over SSE,
+            # to the session's event stream), and a client that got its result may send more
+            # before it is done with the call, e.g. list the tools to check the result's schema
+            await self.requests.wait(deadline - self.loop.time(), self.settle)
+        finally:
+            super().handle_exit(sig, frame)
+
+
+def transport_from_env() -> str:
+    """
+    The transport to serve, from CAPSULECRM_TRANSPORT: 'stdio' (default, one client
+    per process), 'http' (streamable HTTP) or 'sse'.
+    """
+    transport = os.getenv("CAPSULECRM_TRANSPORT", "stdio").lower()
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown CAPSULECRM_TRANSPORT: {transport} - use one of {', '.join(TRANSPORTS)}")
+    return transport
+
+
+def run_http(mcp, transport: str, serve: Callable[[], AbstractAsyncContextManager],
+             drain: Callable[[float], Awaitable[int]]):
+    """
+    Serve the MCP server over streamable HTTP or SSE until SIGTERM or Ctrl-C.
+
+    Every session is served by this one process, its event loop and its worker thread
+    pool, so the CapsuleCRM connection pool, rate limiter, caches, mirror and search
+    index are shared by all clients. serve() starts and stops them once for the
+    process rather than once per session. On SIGTERM or Ctrl-C, drain() refuses new
+    tool calls and gives running ones CAPSULECRM_DRAIN_TIMEOUT seconds to finish;
+    then the server closes its connections and shuts serve() down.
+
+    Environment variables:
+        CAPSULECRM_HTTP_HOST: Interface to listen on (default: 127.0.0.1).
+        CAPSULECRM_HTTP_PORT: Port to listen on (default: 8000).
+        CAPSULECRM_HTTP_PATH: Path of the MCP endpoint (default: /mcp, or /sse for SSE).
+        CAPSULECRM_HTTP_AUTH_TOKEN: Bearer token clients must send; unset accepts every client.
+        CAPSULECRM_DRAIN_TIMEOUT: Seconds running requests get to finish on shutdown (default: 30).
+    """
+    token = os.getenv("CAPSULECRM_HTTP_AUTH_TOKEN")
+    host = os.getenv("CAPSULECRM_HTTP_HOST", "127.0.0.1")
+    port = env_int("CAPSULECRM_HTTP_PORT", 8000)
+    if not token and host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning(f"Serving on {host} without CAPSULECRM_HTTP_AUTH_TOKEN: anyone who can connect can use the CapsuleCRM account")
+
+    app = mcp.http_app(path=os.getenv("CAPSULECRM_HTTP_PATH") or None, transport=transport,
+                       middleware=[ASGIMiddleware(BearerToken, token=token)] if token else None)
+    sessions = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with sessions(app), serve():
+            yield
+
+    app.router.lifespan_context = lifespan
+    timeout = env_int("CAPSULECRM_DRAIN_TIMEOUT", 30)
+    requests = _Requests(app)
+    config = uvicorn.Config(requests, host=host, port=port, log_level="warning", lifespan="on",
+                            timeout_graceful_shutdown=timeout)
+    logger.info(f"Serving MCP over {transport} on http://{host}:{port}{app.state.path}")
+    _DrainingServer(config, requests, drain, timeout, settle=1.0).run()